@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+"""
+Benchmarks for core analysis kernels.
+
+Times batched or accelerated implementations against the reference
+implementations they replace, on a real image or a synthetic one, and
+reports speedups and the largest deviation from the reference.
+
+Usage:
+    python scripts/benchmark_core.py                 # all benchmarks, synthetic image
+    python scripts/benchmark_core.py circularity --image test_images/scale.tif
+    python scripts/benchmark_core.py fft             # pick the FFT crossover
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+from rich.console import Console
+from rich.table import Table
+
+# Add parent to path for imports
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from fish_scale_analysis.core import preprocessing
+from fish_scale_analysis.core.preprocessing import apply_tophat, load_image, preprocess_pipeline
+from fish_scale_analysis.core.calibration import calibrate_manual
+from fish_scale_analysis.core import detection
+from fish_scale_analysis.core.detection import (
+    LogScaleSpace,
+    blobs_to_tubercles,
+    calculate_circularities,
+    calculate_circularity,
+    detect_blobs_log,
+    detect_blobs_pyramid,
+    detect_blobs_template,
+    fit_ellipse_to_blob,
+    fit_ellipses_to_blobs,
+    get_log_cache,
+)
+from fish_scale_analysis.core.lattice import estimate_lattice_vectors
+
+console = Console()
+
+
+def best_time(func: Callable, repeat: int = 3) -> float:
+    """Return the best wall-clock time of several runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def synthetic_image(size: int = 1024, spacing: int = 24, seed: int = 0) -> np.ndarray:
+    """
+    Create a noisy hexagonal lattice of Gaussian tubercles.
+
+    Args:
+        size: Image width and height in pixels
+        spacing: Distance between neighboring tubercles in pixels
+        seed: Random seed for jitter and noise
+
+    Returns:
+        Grayscale float image in range [0, 1]
+    """
+    rng = np.random.default_rng(seed)
+    image = np.zeros((size, size))
+    y, x = np.mgrid[:size, :size]
+    row_height = spacing * np.sqrt(3) / 2
+    for row in range(int(size / row_height) + 1):
+        offset = spacing / 2 if row % 2 else 0
+        for col in range(int(size / spacing) + 1):
+            cy = row * row_height + rng.normal(0, 1)
+            cx = col * spacing + offset + rng.normal(0, 1)
+            sigma = spacing / 6 * rng.uniform(0.8, 1.2)
+            y0, y1 = max(0, int(cy - 4 * sigma)), min(size, int(cy + 4 * sigma) + 1)
+            x0, x1 = max(0, int(cx - 4 * sigma)), min(size, int(cx + 4 * sigma) + 1)
+            image[y0:y1, x0:x1] += np.exp(
+                -((y[y0:y1, x0:x1] - cy) ** 2 + (x[y0:y1, x0:x1] - cx) ** 2)
+                / (2 * sigma**2)
+            )
+    image += rng.normal(0, 0.05, image.shape)
+    return np.clip(image / image.max(), 0, 1)
+
+
+def benchmark_circularity(image: np.ndarray, repeat: int) -> Table:
+    """Per-blob calculate_circularity against calculate_circularities."""
+    blobs = detect_blobs_log(image, min_sigma=2, max_sigma=10, threshold=0.02)
+    centers, radii = blobs[:, :2], np.sqrt(2) * blobs[:, 2]
+
+    def per_blob():
+        return np.array([
+            calculate_circularity(image, tuple(c), r) for c, r in zip(centers, radii)
+        ])
+
+    reference = per_blob()
+    batched = calculate_circularities(image, centers, radii)
+    t_ref = best_time(per_blob, repeat)
+    t_new = best_time(lambda: calculate_circularities(image, centers, radii), repeat)
+
+    table = Table(title=f"Circularity ({len(blobs)} blobs)")
+    table.add_column("Implementation")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("µs / blob", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Max |Δ|", justify="right")
+    n = max(len(blobs), 1)
+    table.add_row("per-blob", f"{t_ref * 1e3:.1f}", f"{t_ref / n * 1e6:.0f}", "1.0x", "-")
+    table.add_row(
+        "batched",
+        f"{t_new * 1e3:.1f}",
+        f"{t_new / n * 1e6:.0f}",
+        f"{t_ref / t_new:.1f}x",
+        f"{np.max(np.abs(batched - reference), initial=0):.1e}",
+    )
+    return table
+
+
+def benchmark_ellipse(image: np.ndarray, repeat: int) -> Table:
+    """Per-blob fit_ellipse_to_blob against fit_ellipses_to_blobs."""
+    blobs = detect_blobs_log(image, min_sigma=2, max_sigma=10, threshold=0.02)
+    centers, radii = blobs[:, :2], np.sqrt(2) * blobs[:, 2]
+
+    def per_blob():
+        return [fit_ellipse_to_blob(image, tuple(c), r) for c, r in zip(centers, radii)]
+
+    reference = per_blob()
+    batched = fit_ellipses_to_blobs(image, centers, radii)
+    t_ref = best_time(per_blob, repeat)
+    t_new = best_time(lambda: fit_ellipses_to_blobs(image, centers, radii), repeat)
+
+    same_fits = all((a is None) == (b is None) for a, b in zip(reference, batched))
+    max_diff = max(
+        (abs(a[key] - b[key])
+         for a, b in zip(reference, batched) if a is not None and b is not None
+         for key in ("major_axis", "minor_axis", "orientation", "eccentricity", "area")),
+        default=0.0,
+    )
+
+    n_fit = sum(fit is not None for fit in reference)
+    table = Table(title=f"Ellipse fitting ({len(blobs)} blobs, {n_fit} fitted)")
+    table.add_column("Implementation")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("µs / blob", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Same fits", justify="center")
+    table.add_column("Max |Δ|", justify="right")
+    n = max(len(blobs), 1)
+    table.add_row("per-blob", f"{t_ref * 1e3:.1f}", f"{t_ref / n * 1e6:.0f}", "1.0x", "-", "-")
+    table.add_row(
+        "batched",
+        f"{t_new * 1e3:.1f}",
+        f"{t_new / n * 1e6:.0f}",
+        f"{t_ref / t_new:.1f}x",
+        "yes" if same_fits else "[red]no[/red]",
+        f"{max_diff:.1e}",
+    )
+    return table
+
+
+def benchmark_refine_threads(image: np.ndarray, repeat: int) -> Table:
+    """blobs_to_tubercles with ellipse refinement across thread counts."""
+    blobs = detect_blobs_log(image, min_sigma=2, max_sigma=10, threshold=0.02)
+    calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+
+    def refine(workers):
+        return blobs_to_tubercles(
+            blobs, image, calibration, refine_ellipse=True, workers=workers
+        )
+
+    reference = refine(1)
+    cores = os.cpu_count() or 1
+    table = Table(title=f"Threaded refinement ({len(blobs)} blobs, {cores} cores)")
+    table.add_column("Workers", justify="right")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Identical", justify="center")
+    t_ref = None
+    for workers in sorted({1, 2, 4, cores}):
+        t = best_time(lambda: refine(workers), repeat)
+        t_ref = t_ref or t
+        table.add_row(
+            str(workers),
+            f"{t * 1e3:.1f}",
+            f"{t_ref / t:.1f}x",
+            "yes" if refine(workers) == reference else "[red]no[/red]",
+        )
+    return table
+
+
+def benchmark_fft(image: np.ndarray, repeat: int) -> Table:
+    """Direct against FFT LoG scale spaces, to pick the auto crossover."""
+    sizes = [n for n in (128, 256, 512, 1024) if n <= min(image.shape)]
+    max_sigmas = [1, 2, 4, 8, 16, 32]
+
+    speedups = {}
+    for size in sizes:
+        crop = np.ascontiguousarray(image[:size, :size])
+        for max_sigma in max_sigmas:
+            times = {
+                backend: best_time(
+                    lambda: LogScaleSpace(crop, max_sigma / 4, max_sigma, backend=backend),
+                    repeat,
+                )
+                for backend in ("direct", "fft")
+            }
+            speedups[size, max_sigma] = times["direct"] / times["fft"]
+
+    # Per size, the smallest sigma from which FFT wins at every larger sigma
+    crossover = {}
+    for size in sizes:
+        wins = [speedups[size, s] > 1 for s in max_sigmas]
+        crossover[size] = next(
+            (s for i, s in enumerate(max_sigmas) if all(wins[i:])), None
+        )
+    fft_sizes = [
+        size for i, size in enumerate(sizes)
+        if all(crossover[s] is not None for s in sizes[i:])
+    ]
+    if fft_sizes:
+        recommendation = (
+            f"FFT_MIN_SIGMA = {max(crossover[s] for s in fft_sizes):.1f}, "
+            f"FFT_MIN_PIXELS = {fft_sizes[0]} * {fft_sizes[0]}"
+        )
+    else:
+        recommendation = "FFT never wins consistently; keep the direct backend"
+
+    table = Table(
+        title="LoG scale space: FFT speedup over direct (10 scales, max_sigma / 4 to max_sigma)",
+        caption=(
+            f"Current: FFT_MIN_SIGMA = {detection.FFT_MIN_SIGMA}, "
+            f"FFT_MIN_PIXELS = {detection.FFT_MIN_PIXELS}\n"
+            f"Recommended for this host: {recommendation}"
+        ),
+    )
+    table.add_column("Image")
+    for max_sigma in max_sigmas:
+        table.add_column(f"σ≤{max_sigma}", justify="right")
+    for size in sizes:
+        table.add_row(
+            f"{size}x{size}",
+            *(
+                f"{speedups[size, s]:.2f}x" if speedups[size, s] > 1
+                else f"[red]{speedups[size, s]:.2f}x[/red]"
+                for s in max_sigmas
+            ),
+        )
+    return table
+
+
+def benchmark_pyramid(image: np.ndarray, repeat: int) -> Table:
+    """Whole-image LoG against coarse-to-fine pyramid detection."""
+    kwargs = dict(min_sigma=3, max_sigma=12, threshold=0.05)
+
+    def uncached(func, **extra):
+        def run():
+            get_log_cache().clear()
+            return func(image, **kwargs, **extra)
+        return run
+
+    reference = detect_blobs_log(image, **kwargs)
+    t_ref = best_time(uncached(detect_blobs_log), repeat)
+
+    table = Table(title=f"Pyramid detection ({len(reference)} LoG blobs)")
+    table.add_column("Implementation")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Blobs", justify="right")
+    table.add_column("Exact", justify="right")
+    table.add_column("Found ≤1.5 px", justify="right")
+    table.add_row("LoG", f"{t_ref * 1e3:.1f}", "1.0x", str(len(reference)), "-", "-")
+    for downscale in (2, 3, 4):
+        result = detect_blobs_pyramid(image, downscale=downscale, **kwargs)
+        t = best_time(uncached(detect_blobs_pyramid, downscale=downscale), repeat)
+        if len(result):
+            dist, _ = cKDTree(result[:, :2]).query(reference[:, :2])
+        else:
+            dist = np.full(len(reference), np.inf)
+        exact = {tuple(b) for b in reference} & {tuple(b) for b in result}
+        n = max(len(reference), 1)
+        table.add_row(
+            f"pyramid /{downscale}",
+            f"{t * 1e3:.1f}",
+            f"{t_ref / t:.1f}x",
+            str(len(result)),
+            f"{len(exact) / n:.1%}",
+            f"{np.mean(dist <= 1.5) if len(reference) else 1:.1%}",
+        )
+    return table
+
+
+def benchmark_tophat(image: np.ndarray, repeat: int) -> Table:
+    """skimage's disk top-hat against the rectangle-decomposed one, by radius."""
+    table = Table(
+        title="Top-hat by disk radius",
+        caption=f"auto decomposes from radius "
+                f"{preprocessing.TOPHAT_DECOMPOSE_MIN_RADIUS}",
+    )
+    table.add_column("Radius", justify="right")
+    table.add_column("Direct (ms)", justify="right")
+    table.add_column("Decomposed (ms)", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Max |Δ|", justify="right")
+    for radius in (3, 5, 10, 20, 30, 40):
+        direct = apply_tophat(image, radius, method="direct")
+        decomposed = apply_tophat(image, radius, method="decomposed")
+        t_ref = best_time(lambda: apply_tophat(image, radius, method="direct"), repeat)
+        t_new = best_time(lambda: apply_tophat(image, radius, method="decomposed"), repeat)
+        table.add_row(
+            str(radius),
+            f"{t_ref * 1e3:.1f}",
+            f"{t_new * 1e3:.1f}",
+            f"{t_ref / t_new:.1f}x",
+            f"{np.max(np.abs(decomposed - direct)):.1e}",
+        )
+    return table
+
+
+def benchmark_template(image: np.ndarray, repeat: int) -> Table:
+    """Whole-image LoG against normalized cross-correlation template matching."""
+    kwargs = dict(min_sigma=3, max_sigma=12)
+
+    def run_log():
+        get_log_cache().clear()
+        return detect_blobs_log(image, threshold=0.05, **kwargs)
+
+    reference = run_log()
+    t_ref = best_time(run_log, repeat)
+
+    table = Table(title=f"Template detection ({len(reference)} LoG blobs)")
+    table.add_column("Implementation")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Blobs", justify="right")
+    table.add_column("LoG blobs found ≤1.5 px", justify="right")
+    table.add_row("LoG", f"{t_ref * 1e3:.1f}", "1.0x", str(len(reference)), "-")
+    for learn in (True, False):
+        result = detect_blobs_template(image, learn_template=learn, **kwargs)
+        t = best_time(lambda: detect_blobs_template(image, learn_template=learn, **kwargs), repeat)
+        if len(result) and len(reference):
+            dist, _ = cKDTree(result[:, :2]).query(reference[:, :2])
+            found = f"{np.mean(dist <= 1.5):.1%}"
+        else:
+            found = "-"
+        table.add_row(
+            "template (learned)" if learn else "template (synthetic)",
+            f"{t * 1e3:.1f}",
+            f"{t_ref / t:.1f}x",
+            str(len(result)),
+            found,
+        )
+    return table
+
+
+def synthetic_lattice_points(n: int, spacing: float = 24.0, seed: int = 0) -> np.ndarray:
+    """
+    Positions of a jittered hexagonal lattice with about n points.
+
+    Args:
+        n: Approximate number of points (a square patch of the lattice)
+        spacing: Distance between neighboring points in pixels
+        seed: Random seed for the jitter and the dropped points
+
+    Returns:
+        Array of (x, y) positions, about 5% of lattice sites left empty
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n / 0.95)))
+    rows, cols = np.mgrid[:side, :side]
+    x = cols * spacing + (rows % 2) * spacing / 2
+    y = rows * spacing * np.sqrt(3) / 2
+    points = np.column_stack([x.ravel(), y.ravel()])
+    points += rng.normal(0, spacing * 0.05, points.shape)
+    return points[rng.random(len(points)) > 0.05]
+
+
+def _lattice_vectors_loop(positions: np.ndarray, expected_spacing_px: float):
+    """Per-simplex and per-position loops replaced by estimate_lattice_vectors."""
+    tri = Delaunay(positions)
+    edge_vectors = []
+    for simplex in tri.simplices:
+        for i in range(3):
+            for j in range(i + 1, 3):
+                vec = positions[simplex[j]] - positions[simplex[i]]
+                if 0.5 * expected_spacing_px < np.linalg.norm(vec) < 2.0 * expected_spacing_px:
+                    edge_vectors.append(vec)
+                    edge_vectors.append(-vec)
+    edge_vectors = np.array(edge_vectors)
+
+    angles = np.mod(np.arctan2(edge_vectors[:, 1], edge_vectors[:, 0]), np.pi)
+    hist, bin_edges = np.histogram(angles, bins=36, range=(0, np.pi))
+    hist_smooth = np.convolve(hist, [0.25, 0.5, 0.25], mode="same")
+    peaks = []
+    for i in range(1, 35):
+        if hist_smooth[i] > hist_smooth[i - 1] and hist_smooth[i] > hist_smooth[i + 1]:
+            if hist_smooth[i] > np.mean(hist_smooth):
+                peaks.append((hist_smooth[i], (bin_edges[i] + bin_edges[i + 1]) / 2))
+    peaks.sort(reverse=True)
+    angle1, angle2 = peaks[0][1], peaks[1][1]
+    median_spacing = np.median(np.linalg.norm(edge_vectors, axis=1))
+    v1 = np.array([np.cos(angle1), np.sin(angle1)]) * median_spacing
+    v2 = np.array([np.cos(angle2), np.sin(angle2)]) * median_spacing
+
+    origin = np.mean(positions, axis=0)
+    deviations = []
+    for pos in positions:
+        coeffs = np.linalg.solve(np.column_stack([v1, v2]), pos - origin)
+        nearest = origin + int(round(coeffs[0])) * v1 + int(round(coeffs[1])) * v2
+        deviations.append(np.linalg.norm(pos - nearest) / median_spacing)
+    return v1, v2, float(np.mean(np.array(deviations) < 0.35))
+
+
+def benchmark_lattice_vectors(image: np.ndarray, repeat: int) -> Table:
+    """Looped against vectorized lattice vector estimation on synthetic lattices."""
+    table = Table(title="Lattice vector estimation (synthetic point lattices)")
+    table.add_column("Points", justify="right")
+    table.add_column("Looped (ms)", justify="right")
+    table.add_column("Vectorized (ms)", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Max |Δ|", justify="right")
+    for n in (1_000, 10_000, 40_000):
+        positions = synthetic_lattice_points(n)
+        reference = _lattice_vectors_loop(positions, 24.0)
+        result = estimate_lattice_vectors(positions, 24.0)
+        t_ref = best_time(lambda: _lattice_vectors_loop(positions, 24.0), repeat)
+        t_new = best_time(lambda: estimate_lattice_vectors(positions, 24.0), repeat)
+        max_diff = max(
+            np.max(np.abs(result[0] - reference[0])),
+            np.max(np.abs(result[1] - reference[1])),
+            abs(result[2] - reference[2]),
+        )
+        table.add_row(
+            str(len(positions)),
+            f"{t_ref * 1e3:.1f}",
+            f"{t_new * 1e3:.1f}",
+            f"{t_ref / t_new:.1f}x",
+            f"{max_diff:.1e}",
+        )
+    return table
+
+
+BENCHMARKS = {
+    "circularity": benchmark_circularity,
+    "ellipse": benchmark_ellipse,
+    "refine-threads": benchmark_refine_threads,
+    "fft": benchmark_fft,
+    "pyramid": benchmark_pyramid,
+    "tophat": benchmark_tophat,
+    "template": benchmark_template,
+    "lattice-vectors": benchmark_lattice_vectors,
+}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark core analysis kernels")
+    parser.add_argument(
+        "benchmarks", nargs="*", metavar="BENCHMARK",
+        help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})",
+    )
+    parser.add_argument("--image", type=Path, default=None,
+                        help="Image to benchmark on (default: synthetic lattice)")
+    parser.add_argument("--size", type=int, default=1024,
+                        help="Synthetic image size in pixels (default: 1024)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per measurement; the best is reported (default: 3)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        console.print(f"[red]Unknown benchmark:[/red] {', '.join(unknown)}")
+        return 1
+
+    if args.image is not None:
+        if not args.image.exists():
+            console.print(f"[red]Image not found:[/red] {args.image}")
+            return 1
+        image, _ = preprocess_pipeline(load_image(args.image), keep_intermediates=False)
+        source = args.image.name
+    else:
+        image = synthetic_image(args.size)
+        source = "synthetic lattice"
+
+    console.print(f"\n[bold]Benchmarking on:[/bold] {source} "
+                  f"({image.shape[1]}x{image.shape[0]} pixels)\n")
+    for name in args.benchmarks or BENCHMARKS:
+        console.print(BENCHMARKS[name](image, args.repeat))
+        console.print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,8 +22,16 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from fish_scale_analysis.core.calibration import estimate_calibration_700x, calibrate_manual
-from fish_scale_analysis.core.preprocessing import load_image, preprocess_pipeline
-from fish_scale_analysis.core.detection import detect_tubercles
+from fish_scale_analysis.core.preprocessing import (
+    get_preprocess_cache,
+    load_image,
+    preprocess_cached,
+)
+from fish_scale_analysis.core.detection import (
+    get_blob_catalogue,
+    get_catalogue_cache,
+    get_log_cache,
+)
 from fish_scale_analysis.core.measurement import measure_metrics
 
 console = Console()
@@ -92,8 +100,9 @@ def run_detection_with_params(
     params = {**preprocess_params, **detection_params}
 
     try:
-        # Preprocess
-        preprocessed, _ = preprocess_pipeline(
+        # Preprocess (memoized: each preprocessing combo is computed once
+        # and reused across all detection parameter combos)
+        preprocessed = preprocess_cached(
             image,
             clahe_clip=preprocess_params.get("clahe_clip", 0.03),
             clahe_kernel=preprocess_params.get("clahe_kernel", 8),
@@ -102,12 +111,18 @@ def run_detection_with_params(
             tophat_radius=preprocess_params.get("tophat_radius", 10),
         )
 
-        # Detect
-        tubercles = detect_tubercles(
+        # Detect (the catalogue measures every candidate once per
+        # preprocessed image and diameter range; each threshold,
+        # circularity and edge combo is then a cheap query)
+        catalogue = get_blob_catalogue(
             preprocessed,
             calibration,
             min_diameter_um=detection_params.get("min_diameter_um", 2.0),
             max_diameter_um=detection_params.get("max_diameter_um", 10.0),
+            min_threshold=min(0.01, detection_params.get("threshold", 0.05)),
+            fit_ellipses=False,
+        )
+        tubercles = catalogue.query(
             threshold=detection_params.get("threshold", 0.05),
             min_circularity=detection_params.get("min_circularity", 0.5),
             edge_margin_px=detection_params.get("edge_margin_px", 10),
@@ -462,6 +477,22 @@ def main():
 
     print_results(results, args.top)
 
+    stats = get_preprocess_cache().stats()
+    console.print(
+        f"\n[cyan]Preprocessing stage cache:[/cyan] {stats.hits} hits, "
+        f"{stats.misses} misses, {stats.evictions} evictions"
+    )
+    stats = get_log_cache().stats()
+    console.print(
+        f"[cyan]LoG scale-space cache:[/cyan] {stats.hits} hits, "
+        f"{stats.misses} misses, {stats.evictions} evictions"
+    )
+    stats = get_catalogue_cache().stats()
+    console.print(
+        f"[cyan]Blob catalogue cache:[/cyan] {stats.hits} hits, "
+        f"{stats.misses} misses, {stats.evictions} evictions"
+    )
+
     # Print best result details
     if results and results[0].error is None:
         best = results[0]
@@ -1,5 +1,6 @@
 """Command-line interface for fish scale analysis."""
 
+import json
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -13,9 +14,11 @@ from rich_argparse import RichHelpFormatter
 import argparse
 
 from .core.calibration import calibrate_manual, estimate_calibration_700x
-from .core.preprocessing import load_image, preprocess_pipeline
-from .core.detection import detect_tubercles
+from .core.preprocessing import AUTO_ROI, estimate_foreground_mask, load_image, preprocess_pipeline
+from .core.tiling import TileScheduler, preprocess_tiled, roi_preprocess_margin
+from .core.detection import detect_tubercles, sigma_range_for_diameters
 from .core.measurement import measure_metrics, process_image
+from .core.profiling import StageProfiler, profile_stage
 from .output.csv_writer import write_all_outputs, append_to_batch_csv
 from .output.logger import (
     setup_logger,
@@ -138,9 +141,15 @@ def create_parser() -> argparse.ArgumentParser:
     process_parser.add_argument(
         "--method",
         type=str,
-        choices=["log", "dog", "ellipse", "lattice"],
+        choices=["log", "dog", "pyramid", "template", "ellipse", "lattice"],
         default="log",
-        help="Detection method: log (Laplacian of Gaussian), dog (Difference of Gaussian), ellipse (threshold + ellipse fitting), lattice (hexagonal lattice-aware detection)",
+        help="Detection method: log (Laplacian of Gaussian), dog (Difference of Gaussian), pyramid (coarse-to-fine LoG for large images), template (normalized cross-correlation with a learned tubercle template), ellipse (threshold + ellipse fitting), lattice (hexagonal lattice-aware detection)",
+    )
+    process_parser.add_argument(
+        "--pyramid-downscale",
+        type=int,
+        default=2,
+        help="Downsampling factor of the coarse level for --method pyramid (default: 2)",
     )
     process_parser.add_argument(
         "--refine-ellipse",
@@ -197,6 +206,12 @@ def create_parser() -> argparse.ArgumentParser:
         default=None,
         help="Minimum lattice regularity score 0-1 (default: 0.5)",
     )
+    process_parser.add_argument(
+        "--lattice-estimator",
+        choices=["seeds", "fft"],
+        default=None,
+        help="Lattice estimator: seeds (Delaunay edges between strict seeds), fft (image autocorrelation, needs a single seed) (default: seeds)",
+    )
     process_parser.add_argument(
         "--max-edge-factor",
         type=float,
@@ -215,6 +230,46 @@ def create_parser() -> argparse.ArgumentParser:
         default=None,
         help="Use preset parameter profile (e.g., paralepidosteus, polypterus, scanned-pdf)",
     )
+    process_parser.add_argument(
+        "--dtype",
+        type=str,
+        choices=["float32", "float64"],
+        default="float32",
+        help="Float precision for preprocessing and detection (default: float32, half the memory of float64)",
+    )
+    process_parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=None,
+        help="Preprocess and detect in tiles of this many pixels (bounded memory for very large images; LoG only)",
+    )
+    process_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for tiled detection and threads for blob refinement (0 = all cores)",
+    )
+    process_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1,
+        help="Tiles handed to a worker per task (default: 1)",
+    )
+    process_parser.add_argument(
+        "--auto-roi",
+        action="store_true",
+        help="Estimate the scale surface from local variance; preprocessing covers only its bounding box and detection skips background tiles",
+    )
+    process_parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Time each analysis stage, print a table and save it as <image>_timing.json",
+    )
+    process_parser.add_argument(
+        "--timing-memory",
+        action="store_true",
+        help="With --timing, also record each stage's peak memory (tracemalloc; slows some stages)",
+    )
     process_parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -298,6 +353,46 @@ def create_parser() -> argparse.ArgumentParser:
         default=0.5,
         help="Minimum circularity filter",
     )
+    batch_parser.add_argument(
+        "--dtype",
+        type=str,
+        choices=["float32", "float64"],
+        default="float32",
+        help="Float precision for preprocessing and detection (default: float32)",
+    )
+    batch_parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=None,
+        help="Preprocess and detect in tiles of this many pixels (bounded memory for very large images; LoG only)",
+    )
+    batch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for tiled detection and threads for blob refinement (0 = all cores)",
+    )
+    batch_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1,
+        help="Tiles handed to a worker per task (default: 1)",
+    )
+    batch_parser.add_argument(
+        "--auto-roi",
+        action="store_true",
+        help="Estimate the scale surface from local variance; preprocessing covers only its bounding box and detection skips background tiles",
+    )
+    batch_parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Time each analysis stage, print a table and save it as <image>_timing.json",
+    )
+    batch_parser.add_argument(
+        "--timing-memory",
+        action="store_true",
+        help="With --timing, also record each stage's peak memory (tracemalloc; slows some stages)",
+    )
     batch_parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -358,6 +453,47 @@ TEST_IMAGE_ALIASES = {
 }
 
 
+def save_timing(timing: dict, path: Path) -> None:
+    """Write a StageProfiler summary as JSON."""
+    path.write_text(json.dumps(timing, indent=2))
+
+
+def timing_table(timings: List[dict], title: str) -> Table:
+    """
+    Table of per-stage times and memory peaks over one or more runs.
+
+    Args:
+        timings: StageProfiler summaries, one per image
+        title: Table title
+
+    Returns:
+        Rich table with mean and max seconds and max peak memory per stage
+    """
+    stages = {}
+    for timing in timings:
+        for stage in timing["stages"]:
+            stages.setdefault(stage["name"], []).append(stage)
+
+    table = Table(title=title)
+    table.add_column("Stage", style="cyan")
+    table.add_column("Mean (s)", justify="right", style="green")
+    table.add_column("Max (s)", justify="right", style="green")
+    table.add_column("Peak (MB)", justify="right", style="yellow")
+    for name, runs in stages.items():
+        seconds = [run["seconds"] for run in runs]
+        peaks = [run["peak_mb"] for run in runs if run["peak_mb"] is not None]
+        depth = name.count("/")
+        table.add_row(
+            "  " * depth + name.rsplit("/", 1)[-1],
+            f"{sum(seconds) / len(seconds):.3f}",
+            f"{max(seconds):.3f}",
+            f"{max(peaks):.1f}" if peaks else "-",
+        )
+    totals = [timing["total_seconds"] for timing in timings]
+    table.add_row("total", f"{sum(totals) / len(totals):.3f}", f"{max(totals):.3f}", "", style="bold")
+    return table
+
+
 def resolve_image_path(image_arg: str) -> Path:
     """Resolve image argument to a path, handling aliases (case-insensitive)."""
     # Try exact match first
@@ -396,9 +532,14 @@ def process_single_image(args: argparse.Namespace) -> int:
             log_error(logger, str(e))
             return 1
 
+    profiler = None
+    if args.timing or args.timing_memory:
+        profiler = StageProfiler(track_memory=args.timing_memory)
+
     try:
         # Load image
-        image = load_image(image_path)
+        with profile_stage(profiler, "load"):
+            image = load_image(image_path, dtype=args.dtype)
 
         # Calibration (profile < CLI args < explicit calibration)
         calibration_um = args.calibration
@@ -443,14 +584,47 @@ def process_single_image(args: argparse.Namespace) -> int:
         use_tophat = args.use_tophat or (profile and profile.use_tophat)
         tophat_radius = get_param("tophat_radius", args.tophat_radius, 10)
 
-        preprocessed, intermediates = preprocess_pipeline(
-            image,
-            clahe_clip=clahe_clip,
-            clahe_kernel=clahe_kernel,
-            blur_sigma=blur_sigma,
-            use_tophat=use_tophat,
-            tophat_radius=tophat_radius,
+        preprocess_kwargs = {
+            "clahe_clip": clahe_clip,
+            "clahe_kernel": clahe_kernel,
+            "blur_sigma": blur_sigma,
+            "use_tophat": use_tophat,
+            "tophat_radius": tophat_radius,
+        }
+
+        # Detection size range (CLI, then profile sigma overrides); an ROI is
+        # preprocessed with the context detection reads around it
+        min_diameter = get_param("min_diameter_um", args.min_diameter, 2.0)
+        max_diameter = get_param("max_diameter_um", args.max_diameter, 10.0)
+        min_sigma = args.min_sigma
+        max_sigma = args.max_sigma
+        if min_sigma is None and profile and profile.min_sigma:
+            min_sigma = profile.min_sigma
+        if max_sigma is None and profile and profile.max_sigma:
+            max_sigma = profile.max_sigma
+        _, detect_max_sigma = sigma_range_for_diameters(
+            calibration, min_diameter, max_diameter,
+            min_sigma_override=min_sigma, max_sigma_override=max_sigma,
         )
+        roi_margin = roi_preprocess_margin(detect_max_sigma)
+
+        roi = None
+        with profile_stage(profiler, "preprocess"):
+            if args.tile_size:
+                if args.auto_roi:
+                    roi = estimate_foreground_mask(image)
+                preprocessed = preprocess_tiled(
+                    image, tile_size=args.tile_size, roi=roi, roi_margin=roi_margin,
+                    **preprocess_kwargs,
+                )
+                intermediates = {"original": image, "final": preprocessed}
+            else:
+                preprocessed, intermediates = preprocess_pipeline(
+                    image, roi=AUTO_ROI if args.auto_roi else None, roi_margin=roi_margin,
+                    profiler=profiler, keep_intermediates=args.show_preprocessing,
+                    **preprocess_kwargs,
+                )
+                roi = intermediates.get("roi")
         preprocess_desc = f"CLAHE(clip={clahe_clip}, kernel={clahe_kernel}) + blur(σ={blur_sigma})"
         if use_tophat:
             preprocess_desc += f" + tophat(r={tophat_radius})"
@@ -459,8 +633,6 @@ def process_single_image(args: argparse.Namespace) -> int:
         # Detect tubercles with configurable parameters
         threshold = get_param("threshold", args.threshold, 0.05)
         min_circularity = get_param("min_circularity", args.circularity, 0.5)
-        min_diameter = get_param("min_diameter_um", args.min_diameter, 2.0)
-        max_diameter = get_param("max_diameter_um", args.max_diameter, 10.0)
         edge_margin = get_param("edge_margin_px", args.edge_margin, 10)
 
         detect_kwargs = {
@@ -472,14 +644,17 @@ def process_single_image(args: argparse.Namespace) -> int:
             "method": args.method,
             "refine_ellipse": args.refine_ellipse,
             "max_eccentricity": args.max_eccentricity,
+            "tile_size": args.tile_size,
+            "refine_workers": args.workers or None,
+            "pyramid_downscale": args.pyramid_downscale,
+            "roi": roi,
+            "profiler": profiler,
         }
+        scheduler = None
+        if args.tile_size:
+            scheduler = TileScheduler(workers=args.workers or None, chunk_size=args.chunk_size)
+            detect_kwargs["scheduler"] = scheduler
         # Add optional sigma overrides (from CLI or profile)
-        min_sigma = args.min_sigma
-        max_sigma = args.max_sigma
-        if min_sigma is None and profile and profile.min_sigma:
-            min_sigma = profile.min_sigma
-        if max_sigma is None and profile and profile.max_sigma:
-            max_sigma = profile.max_sigma
         if min_sigma is not None:
             detect_kwargs["min_sigma_override"] = min_sigma
         if max_sigma is not None:
@@ -494,6 +669,8 @@ def process_single_image(args: argparse.Namespace) -> int:
                 lattice_params["min_seeds"] = args.min_seeds
             if args.lattice_regularity is not None:
                 lattice_params["min_regularity"] = args.lattice_regularity
+            if args.lattice_estimator is not None:
+                lattice_params["lattice_estimator"] = args.lattice_estimator
             if lattice_params:
                 detect_kwargs["lattice_params"] = lattice_params
 
@@ -503,17 +680,25 @@ def process_single_image(args: argparse.Namespace) -> int:
             **detect_kwargs,
         )
         log_detection(logger, len(tubercles))
+        if scheduler is not None and args.verbose:
+            summary = scheduler.summary()
+            console.print(
+                f"[cyan]Tiled detection:[/cyan] {summary['n_tiles']} tiles on "
+                f"{summary['workers']} workers in {summary['wall_seconds']:.2f}s "
+                f"(slowest tile {summary['tile_seconds_max']:.2f}s)"
+            )
 
         if len(tubercles) < 10:
             log_warning(logger, f"Few tubercles detected ({len(tubercles)}) - results may be unreliable")
 
         # Measure metrics
-        result = measure_metrics(
-            tubercles, calibration, str(image_path),
-            graph_type=args.neighbor_graph,
-            max_distance_factor=args.max_edge_factor,
-            spacing_method=args.spacing_method,
-        )
+        with profile_stage(profiler, "measurement"):
+            result = measure_metrics(
+                tubercles, calibration, str(image_path),
+                graph_type=args.neighbor_graph,
+                max_distance_factor=args.max_edge_factor,
+                spacing_method=args.spacing_method,
+            )
         log_measurement(
             logger,
             result.mean_diameter_um,
@@ -556,6 +741,11 @@ def process_single_image(args: argparse.Namespace) -> int:
 
         console.print(table)
 
+        if profiler is not None:
+            timing = profiler.summary()
+            save_timing(timing, session_dir / f"{base_name}_timing.json")
+            console.print(timing_table([timing], title="Stage Timing"))
+
         return 0
 
     except Exception as e:
@@ -585,14 +775,19 @@ def process_batch(args: argparse.Namespace) -> int:
     console.print(f"[bold]Found {len(image_files)} images to process[/bold]")
 
     results = []
+    timings = []
     batch_csv = session_dir / "batch_results.csv"
 
     for image_path in image_files:
         log_image_start(logger, str(image_path))
+        profiler = None
+        if args.timing or args.timing_memory:
+            profiler = StageProfiler(track_memory=args.timing_memory)
 
         try:
             # Load image
-            image = load_image(image_path)
+            with profile_stage(profiler, "load"):
+                image = load_image(image_path, dtype=args.dtype)
 
             # Calibration
             if args.scale_bar_um and args.scale_bar_px:
@@ -600,8 +795,28 @@ def process_batch(args: argparse.Namespace) -> int:
             else:
                 calibration = estimate_calibration_700x(image.shape[1])
 
-            # Preprocess
-            preprocessed, intermediates = preprocess_pipeline(image)
+            # Preprocess (the auto ROI is estimated once and reused by detection)
+            roi = None
+            _, max_sigma = sigma_range_for_diameters(
+                calibration, args.min_diameter, args.max_diameter
+            )
+            roi_margin = roi_preprocess_margin(max_sigma)
+            with profile_stage(profiler, "preprocess"):
+                if args.tile_size:
+                    if args.auto_roi:
+                        roi = estimate_foreground_mask(image)
+                    preprocessed = preprocess_tiled(
+                        image, tile_size=args.tile_size, roi=roi, roi_margin=roi_margin
+                    )
+                else:
+                    preprocessed, intermediates = preprocess_pipeline(
+                        image,
+                        roi=AUTO_ROI if args.auto_roi else None,
+                        roi_margin=roi_margin,
+                        profiler=profiler,
+                        keep_intermediates=False,
+                    )
+                    roi = intermediates.get("roi")
 
             # Detect tubercles
             tubercles = detect_tubercles(
@@ -611,11 +826,24 @@ def process_batch(args: argparse.Namespace) -> int:
                 max_diameter_um=args.max_diameter,
                 threshold=args.threshold,
                 min_circularity=args.circularity,
+                tile_size=args.tile_size,
+                scheduler=(
+                    TileScheduler(workers=args.workers or None, chunk_size=args.chunk_size)
+                    if args.tile_size else None
+                ),
+                refine_workers=args.workers or None,
+                roi=roi,
+                profiler=profiler,
             )
 
             # Measure metrics
-            result = measure_metrics(tubercles, calibration, str(image_path))
+            with profile_stage(profiler, "measurement"):
+                result = measure_metrics(tubercles, calibration, str(image_path))
             results.append(result)
+            if profiler is not None:
+                timing = profiler.summary()
+                save_timing(timing, session_dir / f"{image_path.stem}_timing.json")
+                timings.append(timing)
 
             log_detection(logger, len(tubercles))
             log_measurement(
@@ -667,6 +895,8 @@ def process_batch(args: argparse.Namespace) -> int:
         )
 
     console.print(table)
+    if timings:
+        console.print(timing_table(timings, title=f"Stage Timing ({len(timings)} images)"))
     console.print(f"\n[bold]Results saved to:[/bold] {session_dir}")
 
     return 0
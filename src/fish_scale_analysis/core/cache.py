@@ -0,0 +1,214 @@
+"""In-memory caches shared by the analysis core.
+
+The optimizer, the tuning grid and the UI re-run the same expensive image
+operations many times with only downstream parameters changing. The caches
+here are keyed by the *content* of the input image, so a cached result is
+reused no matter which code path (or thread) produced it.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+
+def image_digest(image: np.ndarray) -> str:
+    """
+    Compute a content hash for an image array.
+
+    The digest covers shape, dtype and pixel data, so two arrays with the
+    same digest are interchangeable inputs to any deterministic stage.
+
+    Args:
+        image: Input array
+
+    Returns:
+        Hex digest string
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(str(image.shape).encode())
+    hasher.update(image.dtype.str.encode())
+    hasher.update(np.ascontiguousarray(image).data)
+    return hasher.hexdigest()
+
+
+def _nbytes(value: Any) -> int:
+    """Approximate memory footprint of a cached value."""
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return 0
+
+
+def _freeze(value: Any) -> Any:
+    """Mark cached arrays read-only so callers cannot corrupt the cache."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    return value
+
+
+@dataclass
+class CacheStats:
+    """Counters describing cache effectiveness."""
+
+    hits: int
+    misses: int
+    evictions: int
+    n_entries: int
+    size_bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "n_entries": self.n_entries,
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+
+class ByteLRUCache:
+    """Thread-safe LRU cache bounded by the total size of its values in bytes.
+
+    Concurrent misses on the same key are collapsed: the first caller computes
+    the value while the others wait for it, so parallel optimizer trials on
+    one image do not all redo the same work.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Upper bound on the summed size of cached values
+        """
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key (counting a hit or miss), or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key without counting or reordering."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting least-recently-used entries as needed.
+
+        Values larger than the whole budget are not stored.
+        """
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        _freeze(value)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._size += nbytes
+            while self._size > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._size -= evicted_bytes
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+
+        Returns:
+            Cached or freshly computed value
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                event = self._pending.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = threading.Event()
+                    self._pending[key] = event
+                    break
+            # Another thread is computing this key; wait and re-check
+            event.wait()
+
+        try:
+            value = compute()
+            self.put(key, value)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
+        return value
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> CacheStats:
+        """Snapshot of the cache counters."""
+        with self._lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                n_entries=len(self._entries),
+                size_bytes=self._size,
+                max_bytes=self.max_bytes,
+            )
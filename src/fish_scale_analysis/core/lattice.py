@@ -6,7 +6,8 @@ detection accuracy compared to local-only blob detection.
 
 Algorithm overview:
 1. Seed Detection: Find high-confidence tubercles with strict thresholds
-2. Lattice Estimation: Fit hexagonal lattice model to seeds
+2. Lattice Estimation: Fit hexagonal lattice model to seeds, or read it
+   from the image's autocorrelation (LatticeParams.lattice_estimator="fft")
 3. Propagation: Use lattice to predict and validate additional tubercles
 4. Refinement: Prune outliers and fill gaps based on lattice consistency
 """
@@ -14,13 +15,17 @@ Algorithm overview:
 from dataclasses import dataclass, field
 from typing import List, Optional, Tuple, Set
 import heapq
+import math
 
 import numpy as np
-from scipy.spatial import Delaunay, cKDTree
+from scipy.spatial import Delaunay
+from scipy import fft as sfft
 from scipy import ndimage
-from skimage.feature import blob_log, peak_local_max
+from skimage.feature import peak_local_max
 
 from ..models import CalibrationData, Tubercle
+from .detection import detect_blobs_log
+from .profiling import StageProfiler, profile_stage
 
 
 @dataclass
@@ -59,6 +64,10 @@ class LatticeModel:
         nearest = self.nearest_lattice_position(position)
         return float(np.linalg.norm(position - nearest))
 
+    def deviations_from_lattice(self, positions: np.ndarray) -> np.ndarray:
+        """Deviations of many (x, y) positions from the lattice (see lattice_deviations)."""
+        return lattice_deviations(positions, self.v1, self.v2, self.origin)
+
     def get_neighbor_directions(self) -> List[np.ndarray]:
         """Get the 6 hexagonal neighbor direction vectors."""
         return [
@@ -71,15 +80,30 @@ class LatticeModel:
         ]
 
 
+# Lattice estimators: "seeds" fits Delaunay edges between strict seeds;
+# "fft" reads the basis from the autocorrelation of the image
+LATTICE_ESTIMATORS = ("seeds", "fft")
+
+# Autocorrelation peaks at least this fraction of the strongest one (within
+# the spacing range) are lattice candidates for the "fft" estimator
+FFT_PEAK_RELATIVE = 0.5
+
+# Low-pass width of the "fft" estimator, as a fraction of the mean diameter
+FFT_LOWPASS_DIAMETERS = 0.25
+
+
 @dataclass
 class LatticeParams:
     """Parameters for lattice-aware detection."""
 
+    # Lattice estimation ("seeds" or "fft", see LATTICE_ESTIMATORS)
+    lattice_estimator: str = "seeds"
+
     # Seed detection (strict thresholds)
     seed_threshold: float = 0.08
     seed_circularity: float = 0.6
     seed_min_contrast: float = 1.3  # Peak vs surrounding annulus
-    min_seeds: int = 5
+    min_seeds: int = 5  # The "fft" estimator needs one seed to start propagation
 
     # Lattice validation
     min_regularity: float = 0.25  # Lowered - real images have some irregularity
@@ -114,6 +138,68 @@ class SeedCandidate:
         return self.confidence > other.confidence
 
 
+class SpatialHashGrid:
+    """Uniform hash grid of 2D points for fixed-radius neighbourhood queries.
+
+    Points are bucketed by the square cell of side cell_size they fall in,
+    so inserts are O(1) and a query for radius r only visits the cells its
+    disk overlaps (3x3 when r equals the cell size). The grid grows with
+    the detections, unlike a KD-tree, which must be rebuilt to add points.
+    """
+
+    def __init__(self, cell_size: float, points: Optional[np.ndarray] = None):
+        """
+        Args:
+            cell_size: Cell side in pixels, ideally the usual query radius
+            points: Optional initial (x, y) points, shape (n, 2)
+        """
+        if not cell_size > 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+        self.cell_size = float(cell_size)
+        self._cells = {}
+        self._count = 0
+        if points is not None:
+            for point in np.asarray(points, dtype=float).reshape(-1, 2):
+                self.insert(point)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, point) -> None:
+        """Add an (x, y) point."""
+        x, y = float(point[0]), float(point[1])
+        self._cells.setdefault(self._cell(x, y), []).append((x, y))
+        self._count += 1
+
+    def _distances_within(self, point, radius: float):
+        """Distances to the points closer than radius."""
+        x, y = float(point[0]), float(point[1])
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for px, py in self._cells.get((cx, cy), ()):
+                    dist = math.sqrt((px - x) ** 2 + (py - y) ** 2)
+                    if dist < radius:
+                        yield dist
+
+    def any_within(self, point, radius: float) -> bool:
+        """Whether any point lies closer than radius to the (x, y) point."""
+        return next(self._distances_within(point, radius), None) is not None
+
+    def count_within(self, point, radius: float) -> int:
+        """Number of points closer than radius to the (x, y) point."""
+        return sum(1 for _ in self._distances_within(point, radius))
+
+
+# Upper bound on the number of footprint pixels gathered at once by
+# compute_local_contrasts (candidates x footprint), about 32 MB per float64 array
+CONTRAST_BATCH_PIXELS = 2**22
+
+
 def compute_local_contrast(
     image: np.ndarray,
     position: Tuple[float, float],
@@ -130,29 +216,82 @@ def compute_local_contrast(
     Returns:
         Ratio of center intensity to annulus intensity
     """
-    x, y = position
+    return float(compute_local_contrasts(image, np.array([position]), radius)[0])
+
+
+def compute_local_contrasts(
+    image: np.ndarray,
+    positions: np.ndarray,
+    radii,
+) -> np.ndarray:
+    """
+    Contrast ratio between peak and surrounding annulus for many candidates.
+
+    The inner disk (radius max(1, 0.7r)) and annulus (out to 1.5r) of each
+    candidate are read from a window around it only: candidates sharing a
+    radius are scored together, with one gather of their windows and the
+    same distance tests as a whole-image mask, so pixel sets are identical
+    and results agree with per-candidate means up to summation order.
+
+    Args:
+        image: Grayscale image
+        positions: Array of (x, y) center positions, shape (n, 2)
+        radii: Estimated blob radii, shape (n,), or one radius for all
+
+    Returns:
+        Array of inner/annulus mean ratios (1.0 where either region is
+        empty or the annulus is dark)
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(positions),))
+    contrasts = np.ones(len(positions))
     h, w = image.shape[:2]
 
-    # Define regions
-    inner_radius = max(1, radius * 0.7)
-    outer_radius = radius * 1.5
+    for radius in np.unique(radii):
+        inner_sq = max(1, radius * 0.7) ** 2
+        outer_sq = (radius * 1.5) ** 2
+        half = int(np.ceil(radius * 1.5)) + 1
+        offsets = np.arange(-half, half + 1)
+        chunk = max(1, CONTRAST_BATCH_PIXELS // len(offsets) ** 2)
+
+        group = np.flatnonzero(radii == radius)
+        for start in range(0, len(group), chunk):
+            idx = group[start:start + chunk]
+            x = positions[idx, 0]
+            y = positions[idx, 1]
+            xs = np.floor(x).astype(np.intp)[:, None] + offsets  # (m, k)
+            ys = np.floor(y).astype(np.intp)[:, None] + offsets
+
+            dist_sq = (
+                ((ys - y[:, None]) ** 2)[:, :, None]
+                + ((xs - x[:, None]) ** 2)[:, None, :]
+            )
+            on_image = (
+                ((ys >= 0) & (ys < h))[:, :, None]
+                & ((xs >= 0) & (xs < w))[:, None, :]
+            )
+            values = image[
+                np.clip(ys, 0, h - 1)[:, :, None], np.clip(xs, 0, w - 1)[:, None, :]
+            ]
+
+            inner = on_image & (dist_sq <= inner_sq)
+            annulus = on_image & (dist_sq > inner_sq) & (dist_sq <= outer_sq)
+            n_inner = inner.sum(axis=(1, 2))
+            n_annulus = annulus.sum(axis=(1, 2))
+            inner_sum = np.where(inner, values, 0).sum(axis=(1, 2))
+            annulus_sum = np.where(annulus, values, 0).sum(axis=(1, 2))
 
-    # Create coordinate grids
-    y_coords, x_coords = np.ogrid[:h, :w]
-    dist_sq = (x_coords - x)**2 + (y_coords - y)**2
+            valid = (n_inner > 0) & (n_annulus > 0)
+            inner_mean = inner_sum / np.maximum(n_inner, 1)
+            annulus_mean = annulus_sum / np.maximum(n_annulus, 1)
+            valid &= annulus_mean > 1e-10
+            contrasts[idx[valid]] = inner_mean[valid] / annulus_mean[valid]
 
-    # Masks for inner circle and annulus
-    inner_mask = dist_sq <= inner_radius**2
-    annulus_mask = (dist_sq > inner_radius**2) & (dist_sq <= outer_radius**2)
+    return contrasts
 
-    # Calculate mean intensities
-    if np.any(inner_mask) and np.any(annulus_mask):
-        inner_mean = np.mean(image[inner_mask])
-        annulus_mean = np.mean(image[annulus_mask])
-        if annulus_mean > 1e-10:
-            return inner_mean / annulus_mean
 
-    return 1.0
+# Perimeter samples of the radial-profile circularity estimate
+CIRCULARITY_SAMPLES = 16
 
 
 def compute_circularity_fast(
@@ -171,31 +310,51 @@ def compute_circularity_fast(
     Returns:
         Circularity score 0-1 (1 = perfectly circular intensity profile)
     """
-    x, y = position
-    h, w = image.shape[:2]
+    return float(compute_circularities_fast(image, np.array([position]), radius)[0])
+
+
+def compute_circularities_fast(
+    image: np.ndarray,
+    positions: np.ndarray,
+    radii,
+) -> np.ndarray:
+    """
+    Radial-profile circularity of many candidates at once.
 
-    # Sample points around the perimeter
-    n_samples = 16
-    angles = np.linspace(0, 2 * np.pi, n_samples, endpoint=False)
-    sample_radius = radius * 0.8
+    Samples CIRCULARITY_SAMPLES points on a circle of 0.8 times each
+    radius, rounded to the nearest pixel, for all candidates in one
+    gather. Circularity is 1 minus the coefficient of variation of the
+    samples that fall on the image; candidates with fewer than half their
+    samples on the image score 0.
 
-    intensities = []
-    for angle in angles:
-        sx = int(round(x + sample_radius * np.cos(angle)))
-        sy = int(round(y + sample_radius * np.sin(angle)))
-        if 0 <= sx < w and 0 <= sy < h:
-            intensities.append(image[sy, sx])
+    Args:
+        image: Grayscale image
+        positions: Array of (x, y) center positions, shape (n, 2)
+        radii: Estimated blob radii, shape (n,), or one radius for all
+
+    Returns:
+        Array of circularity scores 0-1 (1 = perfectly circular intensity profile)
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(positions),))
+    h, w = image.shape[:2]
 
-    if len(intensities) < n_samples // 2:
-        return 0.0
+    angles = np.linspace(0, 2 * np.pi, CIRCULARITY_SAMPLES, endpoint=False)
+    sample_radii = radii[:, None] * 0.8
+    xs = np.round(positions[:, :1] + sample_radii * np.cos(angles)).astype(np.intp)
+    ys = np.round(positions[:, 1:] + sample_radii * np.sin(angles)).astype(np.intp)
+    on_image = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+    values = image[np.clip(ys, 0, h - 1), np.clip(xs, 0, w - 1)]
 
-    # Circularity = 1 - coefficient of variation of perimeter intensities
-    intensities = np.array(intensities)
-    mean_int = np.mean(intensities)
-    if mean_int > 1e-10:
-        cv = np.std(intensities) / mean_int
-        return max(0, 1 - cv)
-    return 0.0
+    counts = on_image.sum(axis=1)
+    n = np.maximum(counts, 1)
+    means = np.where(on_image, values, 0).sum(axis=1) / n
+    stds = np.sqrt(np.where(on_image, (values - means[:, None]) ** 2, 0).sum(axis=1) / n)
+
+    circularities = np.zeros(len(positions))
+    valid = (counts >= CIRCULARITY_SAMPLES // 2) & (means > 1e-10)
+    circularities[valid] = np.maximum(0, 1 - stds[valid] / means[valid])
+    return circularities
 
 
 def detect_seeds(
@@ -230,8 +389,8 @@ def detect_seeds(
     min_sigma = max(1.0, min_sigma)
     max_sigma = max(min_sigma + 1, max_sigma)
 
-    # Detect blobs with strict threshold
-    blobs = blob_log(
+    # Detect blobs with strict threshold (LoG stack shared with other calls)
+    blobs = detect_blobs_log(
         image,
         min_sigma=min_sigma,
         max_sigma=max_sigma,
@@ -243,30 +402,26 @@ def detect_seeds(
     if len(blobs) == 0:
         return []
 
-    seeds = []
     h, w = image.shape[:2]
     edge_margin = int(max_diameter_px)
 
-    for blob in blobs:
-        y, x, sigma = blob
+    # Skip edge detections
+    y, x, sigma = blobs[:, 0], blobs[:, 1], blobs[:, 2]
+    keep = (x >= edge_margin) & (x <= w - edge_margin)
+    keep &= (y >= edge_margin) & (y <= h - edge_margin)
 
-        # Skip edge detections
-        if x < edge_margin or x > w - edge_margin:
-            continue
-        if y < edge_margin or y > h - edge_margin:
-            continue
-
-        radius = np.sqrt(2) * sigma
-        diameter_px = 2 * radius
-        diameter_um = diameter_px * calibration.um_per_pixel
+    # Size filter
+    radii = np.sqrt(2) * sigma
+    diameter_um = 2 * radii * calibration.um_per_pixel
+    keep &= (diameter_um >= min_diameter_um) & (diameter_um <= max_diameter_um)
+    blobs, radii = blobs[keep], radii[keep]
 
-        # Size filter
-        if diameter_um < min_diameter_um or diameter_um > max_diameter_um:
-            continue
+    # Quality metrics, scored for all candidates at once
+    contrasts = compute_local_contrasts(image, blobs[:, [1, 0]], radii)
+    circularities = compute_circularities_fast(image, blobs[:, [1, 0]], radii)
 
-        # Quality metrics
-        contrast = compute_local_contrast(image, (x, y), radius)
-        circularity = compute_circularity_fast(image, (x, y), radius)
+    seeds = []
+    for (y, x, sigma), contrast, circularity in zip(blobs, contrasts, circularities):
         intensity = image[int(y), int(x)]
 
         # Filter by quality
@@ -296,6 +451,38 @@ def detect_seeds(
     return seeds
 
 
+def lattice_deviations(
+    positions: np.ndarray,
+    v1: np.ndarray,
+    v2: np.ndarray,
+    origin: np.ndarray,
+) -> np.ndarray:
+    """
+    Distance from each position to its nearest lattice position.
+
+    Lattice coordinates of all positions come from one batched solve of
+    origin + i*v1 + j*v2 = position, rounded to the nearest integers.
+
+    Args:
+        positions: Array of shape (n, 2) with (x, y) positions
+        v1: First basis vector
+        v2: Second basis vector
+        origin: Reference lattice point
+
+    Returns:
+        Array of n deviations in pixels (inf for a degenerate basis)
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    M = np.column_stack([v1, v2])
+    try:
+        coeffs = np.linalg.solve(M, (positions - origin).T).T
+    except np.linalg.LinAlgError:
+        return np.full(len(positions), np.inf)
+    ij = np.round(coeffs)
+    nearest = origin + ij[:, :1] * v1 + ij[:, 1:] * v2
+    return np.sqrt(((positions - nearest) ** 2).sum(axis=1))
+
+
 def estimate_lattice_vectors(
     positions: np.ndarray,
     expected_spacing_px: float,
@@ -322,25 +509,20 @@ def estimate_lattice_vectors(
     except Exception:
         return None, None, 0.0
 
-    # Collect all edge vectors
-    edge_vectors = []
-    for simplex in tri.simplices:
-        for i in range(3):
-            for j in range(i + 1, 3):
-                p1 = positions[simplex[i]]
-                p2 = positions[simplex[j]]
-                vec = p2 - p1
-                dist = np.linalg.norm(vec)
-
-                # Filter by expected spacing (0.5x to 2x expected)
-                if 0.5 * expected_spacing_px < dist < 2.0 * expected_spacing_px:
-                    edge_vectors.append(vec)
-                    edge_vectors.append(-vec)  # Include both directions
-
-    if len(edge_vectors) < 6:
+    # Edge vectors of every triangle, in both directions. An interior edge
+    # is listed by both of its triangles, which weights the histogram below
+    # toward the lattice's interior.
+    start = tri.simplices[:, [0, 0, 1]].ravel()
+    end = tri.simplices[:, [1, 2, 2]].ravel()
+    vectors = positions[end] - positions[start]
+    dists = np.sqrt((vectors**2).sum(axis=1))
+
+    # Filter by expected spacing (0.5x to 2x expected)
+    in_range = (dists > 0.5 * expected_spacing_px) & (dists < 2.0 * expected_spacing_px)
+    vectors = vectors[in_range]
+    if 2 * len(vectors) < 6:
         return None, None, 0.0
-
-    edge_vectors = np.array(edge_vectors)
+    edge_vectors = np.stack([vectors, -vectors], axis=1).reshape(-1, 2)
 
     # Convert to angles (0 to pi, since we included both directions)
     angles = np.arctan2(edge_vectors[:, 1], edge_vectors[:, 0])
@@ -356,12 +538,13 @@ def estimate_lattice_vectors(
     hist_smooth = np.convolve(hist, [0.25, 0.5, 0.25], mode='same')
 
     # Find local maxima
-    peaks = []
-    for i in range(1, n_bins - 1):
-        if hist_smooth[i] > hist_smooth[i-1] and hist_smooth[i] > hist_smooth[i+1]:
-            if hist_smooth[i] > np.mean(hist_smooth):
-                peak_angle = (bin_edges[i] + bin_edges[i+1]) / 2
-                peaks.append((hist_smooth[i], peak_angle))
+    inner = hist_smooth[1:-1]
+    is_peak = (inner > hist_smooth[:-2]) & (inner > hist_smooth[2:])
+    is_peak &= inner > np.mean(hist_smooth)
+    peak_bins = np.flatnonzero(is_peak) + 1
+    peaks = [
+        (hist_smooth[i], (bin_edges[i] + bin_edges[i + 1]) / 2) for i in peak_bins
+    ]
 
     if len(peaks) < 2:
         # Fallback: use PCA on edge vectors
@@ -389,25 +572,13 @@ def estimate_lattice_vectors(
     v1 = v1_dir * median_spacing
     v2 = v2_dir * median_spacing
 
-    # Compute regularity score
-    # For each position, find nearest lattice position and measure deviation
+    # Compute regularity score: deviation of each position from its
+    # nearest lattice position, all solved at once
     origin = np.mean(positions, axis=0)
-    deviations = []
-
-    for pos in positions:
-        # Find nearest lattice point
-        M = np.column_stack([v1, v2])
-        try:
-            coeffs = np.linalg.solve(M, pos - origin)
-            i, j = int(round(coeffs[0])), int(round(coeffs[1]))
-            nearest = origin + i * v1 + j * v2
-            dev = np.linalg.norm(pos - nearest) / median_spacing
-            deviations.append(dev)
-        except Exception:
-            deviations.append(1.0)
+    deviations = lattice_deviations(positions, v1, v2, origin) / median_spacing
 
     # Regularity = fraction of points within tolerance
-    regularity = np.mean(np.array(deviations) < 0.35)
+    regularity = np.mean(deviations < 0.35)
 
     return v1, v2, float(regularity)
 
@@ -452,6 +623,17 @@ def estimate_lattice(
     if regularity < params.min_regularity:
         return None
 
+    return _validated_lattice(v1, v2, np.mean(positions, axis=0), regularity, params)
+
+
+def _validated_lattice(
+    v1: np.ndarray,
+    v2: np.ndarray,
+    origin: np.ndarray,
+    regularity: float,
+    params: LatticeParams,
+) -> Optional[LatticeModel]:
+    """LatticeModel for a basis, or None if its geometry is not near-hexagonal."""
     # Validate lattice geometry
     # Check angle between vectors (should be ~60 degrees for hexagonal)
     cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
@@ -472,7 +654,6 @@ def estimate_lattice(
         return None
 
     spacing = (len_v1 + len_v2) / 2
-    origin = np.mean(positions, axis=0)
 
     return LatticeModel(
         v1=v1,
@@ -484,6 +665,161 @@ def estimate_lattice(
     )
 
 
+def image_autocorrelation(
+    image: np.ndarray,
+    max_lag: int,
+    highpass_sigma: float,
+    lowpass_sigma: float = 0.0,
+) -> np.ndarray:
+    """
+    Normalized autocorrelation of an image for lags up to max_lag.
+
+    The image is Hann-windowed and zero-padded by max_lag, so lags do not
+    wrap around, and transformed once. Its power spectrum is band-passed
+    with Gaussians: the high-pass removes uneven illumination, and the
+    low-pass removes pixel noise and texture finer than a tubercle.
+
+    Args:
+        image: Grayscale image
+        max_lag: Largest lag in pixels along each axis
+        highpass_sigma: Standard deviation in pixels of the removed
+            low-pass component
+        lowpass_sigma: Standard deviation in pixels of the Gaussian
+            smoothing (0 keeps every frequency)
+
+    Returns:
+        Array of shape (2 * max_lag + 1, 2 * max_lag + 1), indexed
+        [max_lag + dy, max_lag + dx], equal to 1 at zero lag (all zeros
+        for a flat image)
+    """
+    h, w = image.shape[:2]
+    windowed = (image - np.mean(image)) * np.outer(np.hanning(h), np.hanning(w))
+    shape = (
+        sfft.next_fast_len(h + max_lag, real=True),
+        sfft.next_fast_len(w + max_lag, real=True),
+    )
+    spectrum = sfft.rfft2(windowed, s=shape)
+
+    fy = sfft.fftfreq(shape[0])[:, None]
+    fx = sfft.rfftfreq(shape[1])[None, :]
+    freq_sq = fx**2 + fy**2
+    bandpass = 1 - np.exp(-2 * np.pi**2 * highpass_sigma**2 * freq_sq)
+    if lowpass_sigma > 0:
+        bandpass = bandpass * np.exp(-2 * np.pi**2 * lowpass_sigma**2 * freq_sq)
+    power = (spectrum.real**2 + spectrum.imag**2) * bandpass**2
+
+    correlation = sfft.irfft2(power, s=shape)
+    correlation = np.roll(correlation, (max_lag, max_lag), axis=(0, 1))
+    correlation = correlation[:2 * max_lag + 1, :2 * max_lag + 1]
+    zero_lag = correlation[max_lag, max_lag]
+    if zero_lag <= 0:
+        return np.zeros_like(correlation)
+    return correlation / zero_lag
+
+
+def _subpixel_peak(correlation: np.ndarray, iy: int, ix: int) -> Tuple[float, float]:
+    """Parabolic refinement of a local maximum, as (dy, dx) offsets."""
+    offsets = []
+    for before, center, after in (
+        (correlation[iy - 1, ix], correlation[iy, ix], correlation[iy + 1, ix]),
+        (correlation[iy, ix - 1], correlation[iy, ix], correlation[iy, ix + 1]),
+    ):
+        curvature = before - 2 * center + after
+        offsets.append(0.5 * (before - after) / curvature if curvature < 0 else 0.0)
+    return offsets[0], offsets[1]
+
+
+def estimate_lattice_fft(
+    image: np.ndarray,
+    calibration: CalibrationData,
+    min_diameter_um: float,
+    max_diameter_um: float,
+    params: LatticeParams,
+    origin: Optional[np.ndarray] = None,
+) -> Optional[LatticeModel]:
+    """
+    Estimate the lattice from the image's autocorrelation.
+
+    A lattice of tubercles correlates with itself shifted by any lattice
+    vector, so the autocorrelation peaks on the lattice. The shortest
+    strong peak within the expected spacing range is v1, and the shortest
+    strong peak not collinear with it is v2 (taken less than 90 degrees
+    from v1). No detections are needed, so a lattice is found even where
+    too few tubercles pass the strict seed thresholds.
+
+    Args:
+        image: Preprocessed grayscale image (float, 0-1)
+        calibration: Calibration data
+        min_diameter_um: Minimum expected diameter
+        max_diameter_um: Maximum expected diameter
+        params: Detection parameters (geometry tolerances, min_regularity)
+        origin: (x, y) position of a known tubercle, anchoring the lattice
+            (defaults to the image center)
+
+    Returns:
+        LatticeModel whose regularity is the mean normalized
+        autocorrelation at v1 and v2, or None if no valid lattice is found
+    """
+    # Same spacing range as the Delaunay edges estimate_lattice accepts
+    mean_diameter_px = (min_diameter_um + max_diameter_um) / 2 / calibration.um_per_pixel
+    expected_spacing_px = mean_diameter_px * 2.0
+    min_spacing = max(2.0, 0.5 * expected_spacing_px)
+    max_spacing = 2.0 * expected_spacing_px
+
+    h, w = image.shape[:2]
+    max_lag = int(min(np.ceil(max_spacing) + 1, min(h, w) // 2))
+    if max_lag <= min_spacing:
+        return None
+    correlation = image_autocorrelation(
+        image, max_lag,
+        highpass_sigma=max_spacing,
+        lowpass_sigma=FFT_LOWPASS_DIAMETERS * mean_diameter_px,
+    )
+
+    # Lattice candidates: strong local maxima in the spacing range. Lags on
+    # the window's edge have no outer neighbours, so they can be neither
+    # confirmed as maxima nor refined (max_lag may be capped by the image)
+    dy, dx = np.mgrid[-max_lag:max_lag + 1, -max_lag:max_lag + 1]
+    lag = np.sqrt(dx**2 + dy**2)
+    is_peak = correlation == ndimage.maximum_filter(correlation, size=3)
+    is_peak &= (lag >= min_spacing) & (lag <= max_spacing) & (correlation > 0)
+    is_peak &= (np.abs(dx) < max_lag) & (np.abs(dy) < max_lag)
+    iy, ix = np.nonzero(is_peak)
+    if len(iy) < 4:
+        return None
+    values = correlation[iy, ix]
+    strong = values >= FFT_PEAK_RELATIVE * values.max()
+    iy, ix, values = iy[strong], ix[strong], values[strong]
+
+    # Shortest first, the stronger of equally long peaks first
+    order = np.lexsort((-values, lag[iy, ix]))
+    vectors = np.column_stack([dx[iy, ix], dy[iy, ix]]).astype(float)[order]
+    iy, ix, values = iy[order], ix[order], values[order]
+
+    first = vectors[0]
+    cos_angles = vectors @ first / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(first))
+    # Not within 30 degrees of v1's line
+    others = np.flatnonzero(np.abs(cos_angles) < np.cos(np.radians(30)))
+    if len(others) == 0:
+        return None
+    second = others[0]
+
+    basis = []
+    for k in (0, second):
+        sub_dy, sub_dx = _subpixel_peak(correlation, iy[k], ix[k])
+        basis.append(vectors[k] + np.array([sub_dx, sub_dy]))
+    v1, v2 = basis
+    if np.dot(v1, v2) < 0:
+        v2 = -v2  # The autocorrelation is symmetric, so -v2 is a peak too
+
+    regularity = float(np.clip((values[0] + values[second]) / 2, 0, 1))
+    if regularity < params.min_regularity:
+        return None
+    if origin is None:
+        origin = np.array([w / 2, h / 2])
+    return _validated_lattice(v1, v2, np.asarray(origin, dtype=float), regularity, params)
+
+
 def validate_candidate_at_position(
     image: np.ndarray,
     predicted_pos: np.ndarray,
@@ -536,23 +872,20 @@ def validate_candidate_at_position(
         max_idx = np.unravel_index(np.argmax(region), region.shape)
         local_max_coords = np.array([max_idx])
 
+    # Keep local maxima within the search radius of the prediction
+    global_xy = local_max_coords[:, ::-1] + np.array([x_min, y_min])
+    dists = np.sqrt((global_xy[:, 0] - x)**2 + (global_xy[:, 1] - y)**2)
+    global_xy, dists = global_xy[dists <= search_radius], dists[dists <= search_radius]
+    contrasts = compute_local_contrasts(image, global_xy, expected_radius)
+    circularities = compute_circularities_fast(image, global_xy, expected_radius)
+
     # Evaluate each local maximum
     best_candidate = None
     best_score = -1
 
-    for local_yx in local_max_coords:
-        local_y, local_x = local_yx
-        global_x = x_min + local_x
-        global_y = y_min + local_y
-
-        # Check distance from predicted position
-        dist = np.sqrt((global_x - x)**2 + (global_y - y)**2)
-        if dist > search_radius:
-            continue
-
-        # Compute quality metrics
-        contrast = compute_local_contrast(image, (global_x, global_y), expected_radius)
-        circularity = compute_circularity_fast(image, (global_x, global_y), expected_radius)
+    for (global_x, global_y), dist, contrast, circularity in zip(
+        global_xy, dists, contrasts, circularities
+    ):
         intensity = image[global_y, global_x]
 
         # Apply more lenient thresholds for propagation
@@ -618,9 +951,9 @@ def propagate_detections(
     search_radius = lattice.spacing * params.search_radius_factor
     min_separation = expected_radius * 1.5
 
-    # Initialize with seeds
+    # Initialize with seeds, indexed for proximity checks
     confirmed = list(seeds)
-    confirmed_positions = {tuple(s.position) for s in seeds}
+    confirmed_grid = SpatialHashGrid(min_separation, [s.position for s in seeds])
 
     # Track processed positions to avoid re-checking
     processed_positions: Set[Tuple[int, int]] = set()
@@ -657,12 +990,7 @@ def propagate_detections(
         processed_positions.add(grid_pos)
 
         # Check if too close to existing detection
-        too_close = False
-        for conf in confirmed:
-            if np.linalg.norm(pred_pos - conf.position) < min_separation:
-                too_close = True
-                break
-        if too_close:
+        if confirmed_grid.any_within(pred_pos, min_separation):
             continue
 
         # Validate candidate at this position
@@ -674,12 +1002,7 @@ def propagate_detections(
             refined_pos, sigma, contrast, circularity = result
 
             # Double-check not too close to existing
-            too_close = False
-            for conf in confirmed:
-                if np.linalg.norm(refined_pos - conf.position) < min_separation:
-                    too_close = True
-                    break
-            if too_close:
+            if confirmed_grid.any_within(refined_pos, min_separation):
                 continue
 
             # Compute confidence
@@ -701,7 +1024,7 @@ def propagate_detections(
             )
 
             confirmed.append(new_detection)
-            confirmed_positions.add(tuple(refined_pos))
+            confirmed_grid.insert(refined_pos)
 
             # Add predictions for neighbors of this new detection
             for direction in neighbor_dirs:
@@ -760,17 +1083,13 @@ def refine_detections(
 
     # Prune outliers
     max_dev = params.max_lattice_deviation * refined_lattice.spacing
-    pruned = []
-    for det in detections:
-        deviation = refined_lattice.deviation_from_lattice(det.position)
-        if deviation <= max_dev:
-            pruned.append(det)
+    deviations = refined_lattice.deviations_from_lattice(positions)
+    pruned = [det for det, deviation in zip(detections, deviations) if deviation <= max_dev]
 
     # Fill gaps
     # Find positions where we expect tubercles but don't have them
     if len(pruned) > 0:
         positions = np.array([d.position for d in pruned])
-        tree = cKDTree(positions)
 
         mean_diameter_um = (min_diameter_um + max_diameter_um) / 2
         expected_radius = (mean_diameter_um / calibration.um_per_pixel) / 2
@@ -779,6 +1098,9 @@ def refine_detections(
 
         h, w = image.shape[:2]
         neighbor_dirs = refined_lattice.get_neighbor_directions()
+        neighbor_radius = refined_lattice.spacing * 1.5
+        # Filled gaps are inserted as they are found, so later gaps see them
+        grid = SpatialHashGrid(max(min_separation, neighbor_radius), positions)
 
         gaps_to_check = []
         for det in pruned:
@@ -790,13 +1112,11 @@ def refine_detections(
                     continue
 
                 # Check if there's already a detection nearby
-                dist, _ = tree.query(gap_pos)
-                if dist < min_separation:
+                if grid.any_within(gap_pos, min_separation):
                     continue
 
-                # Count confirmed neighbors
-                dists, indices = tree.query(gap_pos, k=min(6, len(positions)))
-                n_neighbors = np.sum(dists < refined_lattice.spacing * 1.5)
+                # Count confirmed neighbors (among the nearest six)
+                n_neighbors = min(6, grid.count_within(gap_pos, neighbor_radius))
 
                 if n_neighbors >= params.gap_fill_min_neighbors:
                     gaps_to_check.append(gap_pos)
@@ -817,8 +1137,7 @@ def refine_detections(
                 refined_pos, sigma, contrast, circularity = result
 
                 # Check not too close to existing
-                dist, _ = tree.query(refined_pos)
-                if dist >= min_separation:
+                if not grid.any_within(refined_pos, min_separation):
                     intensity = image[int(refined_pos[1]), int(refined_pos[0])]
                     confidence = 0.3 * min(contrast / 1.5, 1.0) + 0.3 * circularity + 0.4 * intensity
 
@@ -831,10 +1150,7 @@ def refine_detections(
                         confidence=confidence,
                     )
                     pruned.append(new_det)
-
-                    # Update tree for subsequent gap checks
-                    positions = np.array([d.position for d in pruned])
-                    tree = cKDTree(positions)
+                    grid.insert(refined_pos)
 
     return pruned
 
@@ -881,6 +1197,8 @@ def detect_tubercles_lattice(
     max_diameter_um: float = 10.0,
     params: Optional[LatticeParams] = None,
     fallback_to_log: bool = True,
+    dtype=None,
+    profiler: Optional[StageProfiler] = None,
 ) -> Tuple[List[Tubercle], Optional[LatticeModel], dict]:
     """
     Detect tubercles using lattice-aware algorithm.
@@ -894,6 +1212,10 @@ def detect_tubercles_lattice(
         max_diameter_um: Maximum expected tubercle diameter
         params: Detection parameters (uses defaults if None)
         fallback_to_log: If True, fall back to standard LoG if lattice fails
+        dtype: Float dtype for seed detection and candidate validation
+            (None keeps the image dtype)
+        profiler: Optional StageProfiler timing each phase (see
+            core.profiling); its summary is returned as info["profile"]
 
     Returns:
         Tuple of (tubercles, lattice_model, info_dict)
@@ -903,21 +1225,39 @@ def detect_tubercles_lattice(
     if params is None:
         params = LatticeParams()
 
+    if params.lattice_estimator not in LATTICE_ESTIMATORS:
+        raise ValueError(
+            f"lattice_estimator must be one of {LATTICE_ESTIMATORS}, "
+            f"got {params.lattice_estimator!r}"
+        )
+
+    if dtype is not None:
+        image = image.astype(dtype, copy=False)
+
     info = {
         "method": "lattice",
+        "lattice_estimator": params.lattice_estimator,
         "phases_completed": [],
         "fallback_used": False,
     }
 
+    def finish(tubercles, lattice):
+        if profiler is not None:
+            info["profile"] = profiler.summary()
+        return tubercles, lattice, info
+
     # Phase 1: Seed detection
-    seeds = detect_seeds(
-        image, calibration, min_diameter_um, max_diameter_um, params
-    )
+    with profile_stage(profiler, "seed_detection"):
+        seeds = detect_seeds(
+            image, calibration, min_diameter_um, max_diameter_um, params
+        )
     info["n_seeds"] = len(seeds)
     info["phases_completed"].append("seed_detection")
 
-    if len(seeds) < params.min_seeds:
-        info["lattice_failed_reason"] = f"insufficient seeds ({len(seeds)} < {params.min_seeds})"
+    # The fft estimator only needs a seed to anchor and start propagation
+    min_seeds = 1 if params.lattice_estimator == "fft" else params.min_seeds
+    if len(seeds) < min_seeds:
+        info["lattice_failed_reason"] = f"insufficient seeds ({len(seeds)} < {min_seeds})"
         if fallback_to_log:
             info["fallback_used"] = True
             # Import here to avoid circular import
@@ -928,14 +1268,22 @@ def detect_tubercles_lattice(
                 max_diameter_um=max_diameter_um,
                 threshold=0.05,
                 min_circularity=0.5,
+                profiler=profiler,
             )
-            return tubercles, None, info
-        return [], None, info
+            return finish(tubercles, None)
+        return finish([], None)
 
     # Phase 2: Lattice estimation
-    lattice = estimate_lattice(
-        seeds, calibration, min_diameter_um, max_diameter_um, params
-    )
+    with profile_stage(profiler, "lattice_estimation"):
+        if params.lattice_estimator == "fft":
+            lattice = estimate_lattice_fft(
+                image, calibration, min_diameter_um, max_diameter_um, params,
+                origin=seeds[0].position,
+            )
+        else:
+            lattice = estimate_lattice(
+                seeds, calibration, min_diameter_um, max_diameter_um, params
+            )
 
     if lattice is None:
         info["lattice_failed_reason"] = "lattice estimation failed (irregular pattern?)"
@@ -948,9 +1296,10 @@ def detect_tubercles_lattice(
                 max_diameter_um=max_diameter_um,
                 threshold=0.05,
                 min_circularity=0.5,
+                profiler=profiler,
             )
-            return tubercles, None, info
-        return candidates_to_tubercles(seeds, calibration), None, info
+            return finish(tubercles, None)
+        return finish(candidates_to_tubercles(seeds, calibration), None)
 
     info["lattice_spacing_px"] = lattice.spacing
     info["lattice_spacing_um"] = lattice.spacing * calibration.um_per_pixel
@@ -959,20 +1308,22 @@ def detect_tubercles_lattice(
     info["phases_completed"].append("lattice_estimation")
 
     # Phase 3: Propagation
-    propagated = propagate_detections(
-        seeds, image, lattice, calibration, min_diameter_um, max_diameter_um, params
-    )
+    with profile_stage(profiler, "propagation"):
+        propagated = propagate_detections(
+            seeds, image, lattice, calibration, min_diameter_um, max_diameter_um, params
+        )
     info["n_after_propagation"] = len(propagated)
     info["phases_completed"].append("propagation")
 
     # Phase 4: Refinement
-    refined = refine_detections(
-        propagated, lattice, image, calibration, min_diameter_um, max_diameter_um, params
-    )
+    with profile_stage(profiler, "refinement"):
+        refined = refine_detections(
+            propagated, lattice, image, calibration, min_diameter_um, max_diameter_um, params
+        )
     info["n_after_refinement"] = len(refined)
     info["phases_completed"].append("refinement")
 
     # Convert to Tubercle objects
     tubercles = candidates_to_tubercles(refined, calibration)
 
-    return tubercles, lattice, info
+    return finish(tubercles, lattice)
@@ -0,0 +1,331 @@
+"""Lazy, memory-mapped access to large TIFF images.
+
+SEM scans can be large tiled or BigTIFF files. ``LazyImage`` reads the TIFF
+header up front and decodes pixel data only for the regions that are
+requested, so callers that work tile by tile never hold the full decoded
+frame in memory.
+
+Two access strategies are used, chosen per file:
+
+- ``memmap``: uncompressed, contiguous data is memory-mapped; slicing reads
+  only the touched pages from disk.
+- ``tiled``: compressed tiled TIFFs decode only the TIFF tiles that overlap
+  the requested region. Decoded tiles are kept in a small LRU cache.
+
+Files that fit neither strategy (compressed strips, palette images, ...)
+are decoded in full on first access.
+"""
+
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import tifffile
+from skimage.util import img_as_float32, img_as_float64
+
+from .cache import ByteLRUCache
+
+TIFF_SUFFIXES = (".tif", ".tiff")
+
+# Budget for decoded TIFF tiles kept per open image
+TILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Rows converted at a time when materializing the full image, bounding the
+# temporary memory used for grayscale conversion
+_ROW_BLOCK = 512
+
+
+def _rgb_to_gray(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert RGB(A) pixels to grayscale.
+
+    uint8 input uses the same fixed-point ITU-R 601 weights as PIL's
+    ``convert("L")``, so results match ``load_image`` on 8-bit files exactly.
+
+    Args:
+        rgb: Array of shape (..., 3) or (..., 4)
+
+    Returns:
+        Grayscale array (uint8 for uint8 input, float64 otherwise)
+    """
+    if rgb.dtype == np.uint8:
+        r = rgb[..., 0].astype(np.uint32)
+        g = rgb[..., 1].astype(np.uint32)
+        b = rgb[..., 2].astype(np.uint32)
+        return ((r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16).astype(np.uint8)
+    weights = np.array([0.299, 0.587, 0.114])
+    return np.dot(img_as_float64(rgb[..., :3]), weights)
+
+
+def _to_float(image: np.ndarray, dtype) -> np.ndarray:
+    """Convert to float in range [0, 1] with the given dtype."""
+    dtype = np.dtype(dtype)
+    if dtype == np.float32:
+        return img_as_float32(image)
+    if dtype == np.float64:
+        return img_as_float64(image)
+    raise ValueError(f"Unsupported float dtype: {dtype}")
+
+
+class LazyImage:
+    """Grayscale view of an image file that decodes pixels on demand.
+
+    Indexing returns grayscale float data in range [0, 1]::
+
+        with open_lazy_image("scan.tif") as img:
+            patch = img[1000:1512, 2000:2512]
+            full = img.to_array(np.float32)
+
+    Attributes:
+        path: Path to the image file
+        shape: (height, width) of the image
+        source_dtype: Sample dtype stored in the file
+        mode: Access strategy ("memmap", "tiled" or "decoded")
+        tiles_decoded: Number of TIFF tiles decoded so far
+    """
+
+    def __init__(self, path: Union[str, Path], dtype=np.float64):
+        """
+        Open an image file without decoding its pixel data.
+
+        Args:
+            path: Path to image file
+            dtype: Default float dtype for returned arrays
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If the TIFF layout is not supported
+        """
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Image not found: {self.path}")
+        self.dtype = np.dtype(dtype)
+        self.tiles_decoded = 0
+        self._tif: Optional[tifffile.TiffFile] = None
+        self._page = None
+        self._raw: Optional[np.ndarray] = None
+        self._tile_cache = ByteLRUCache(TILE_CACHE_MAX_BYTES)
+
+        self._tif = tifffile.TiffFile(self.path)
+        try:
+            self._open_page()
+        except Exception:
+            self.close()
+            raise
+
+    def _open_page(self) -> None:
+        # Like load_image, only the first page of a multi-page file is used
+        page = self._tif.pages.first
+        if page.photometric not in (
+            tifffile.PHOTOMETRIC.MINISBLACK,
+            tifffile.PHOTOMETRIC.RGB,
+        ):
+            raise ValueError(
+                f"Unsupported TIFF photometric {page.photometric.name}: {self.path}"
+            )
+        spp = page.samplesperpixel
+        if spp not in (1, 3, 4) or (spp > 1 and page.planarconfig != 1):
+            raise ValueError(f"Unsupported TIFF sample layout: {self.path}")
+
+        self._page = page
+        self._samples = spp
+        self.shape: Tuple[int, int] = (int(page.imagelength), int(page.imagewidth))
+        self.source_dtype = np.dtype(page.dtype)
+
+        if page.is_contiguous:
+            self.mode = "memmap"
+            self._raw = tifffile.memmap(self.path, page=0, mode="r")
+        elif page.is_tiled and page.imagedepth == 1:
+            self.mode = "tiled"
+        else:
+            self.mode = "decoded"
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def tile_shape(self) -> Optional[Tuple[int, int]]:
+        """(rows, cols) of the TIFF tiles, or None for strip-based files."""
+        if self._page is not None and self._page.is_tiled:
+            return (int(self._page.tilelength), int(self._page.tilewidth))
+        return None
+
+    def __enter__(self) -> "LazyImage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the file handle, memory map and decoded tiles."""
+        self._raw = None
+        self._tile_cache.clear()
+        if self._tif is not None:
+            self._tif.close()
+            self._tif = None
+
+    def __getitem__(self, key) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 2 or not all(isinstance(k, slice) for k in key):
+            raise IndexError("LazyImage supports 2D slice indexing only")
+        key = key + (slice(None),) * (2 - len(key))
+        (y0, y1, ystep), (x0, x1, xstep) = (
+            key[0].indices(self.shape[0]),
+            key[1].indices(self.shape[1]),
+        )
+        if ystep != 1 or xstep != 1:
+            raise IndexError("LazyImage does not support strided slices")
+        return self.read_region(y0, y1, x0, x1)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        array = self.to_array()
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def read_region(
+        self,
+        y0: int,
+        y1: int,
+        x0: int,
+        x1: int,
+        dtype=None,
+    ) -> np.ndarray:
+        """
+        Read a rectangular region as grayscale float.
+
+        Only the file data overlapping the region is decoded.
+
+        Args:
+            y0, y1: Row range (half-open)
+            x0, x1: Column range (half-open)
+            dtype: Float dtype of the result (None uses the image default)
+
+        Returns:
+            Array of shape (y1 - y0, x1 - x0), range [0, 1]
+        """
+        y0, y1 = max(0, int(y0)), min(self.shape[0], int(y1))
+        x0, x1 = max(0, int(x0)), min(self.shape[1], int(x1))
+        raw = self._read_raw(y0, max(y0, y1), x0, max(x0, x1))
+        return _to_float(self._gray(raw), self.dtype if dtype is None else dtype)
+
+    def to_array(self, dtype=None) -> np.ndarray:
+        """
+        Decode the full image as grayscale float.
+
+        Conversion runs in row blocks so the only full-size allocation is the
+        returned array.
+
+        Args:
+            dtype: Float dtype of the result (None uses the image default)
+
+        Returns:
+            Array of shape ``self.shape``, range [0, 1]
+        """
+        dtype = self.dtype if dtype is None else np.dtype(dtype)
+        height, width = self.shape
+        out = np.empty((height, width), dtype=dtype)
+        for y0 in range(0, height, _ROW_BLOCK):
+            y1 = min(height, y0 + _ROW_BLOCK)
+            out[y0:y1] = self.read_region(y0, y1, 0, width, dtype=dtype)
+        return out
+
+    def _gray(self, raw: np.ndarray) -> np.ndarray:
+        if raw.ndim == 3:
+            return _rgb_to_gray(raw)
+        return raw
+
+    def _read_raw(self, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        if self._tif is None:
+            raise ValueError(f"Image is closed: {self.path}")
+        if self.mode == "memmap":
+            return np.asarray(self._raw[y0:y1, x0:x1])
+        if self.mode == "tiled":
+            return self._read_tiles(y0, y1, x0, x1)
+        if self._raw is None:
+            self._raw = self._page.asarray()
+        return self._raw[y0:y1, x0:x1]
+
+    def _read_tiles(self, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        th, tw = self.tile_shape
+        tiles_across = -(-self.shape[1] // tw)
+        sample_shape = (self._samples,) if self._samples > 1 else ()
+        out = np.empty((y1 - y0, x1 - x0) + sample_shape, dtype=self.source_dtype)
+
+        for ty in range(y0 // th, -(-y1 // th)):
+            for tx in range(x0 // tw, -(-x1 // tw)):
+                tile = self._tile(ty * tiles_across + tx)
+                ty0, tx0 = ty * th, tx * tw
+                ya, yb = max(y0, ty0), min(y1, ty0 + th)
+                xa, xb = max(x0, tx0), min(x1, tx0 + tw)
+                out[ya - y0:yb - y0, xa - x0:xb - x0] = tile[
+                    ya - ty0:yb - ty0, xa - tx0:xb - tx0
+                ]
+        return out
+
+    def _tile(self, index: int) -> np.ndarray:
+        def decode() -> np.ndarray:
+            page = self._page
+            fh = self._tif.filehandle
+            with fh.lock:
+                fh.seek(page.dataoffsets[index])
+                data = fh.read(page.databytecounts[index])
+            segment, _, _ = page.decode(data, index, jpegtables=page.jpegtables)
+            self.tiles_decoded += 1
+            # segment has shape (depth, rows, cols, samples)
+            tile = segment[0]
+            return tile[..., 0] if self._samples == 1 else tile
+
+        return self._tile_cache.get_or_compute(index, decode)
+
+
+def is_tiff(path: Union[str, Path]) -> bool:
+    """Return True if the path has a TIFF file extension."""
+    return Path(path).suffix.lower() in TIFF_SUFFIXES
+
+
+def open_lazy_image(path: Union[str, Path], dtype=np.float64) -> LazyImage:
+    """
+    Open a TIFF image for lazy, region-wise reading.
+
+    Args:
+        path: Path to TIFF file
+        dtype: Default float dtype for returned arrays
+
+    Returns:
+        LazyImage (use as a context manager to release the file)
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is not a TIFF or its layout is unsupported
+    """
+    if not is_tiff(path):
+        raise ValueError(f"Lazy loading requires a TIFF file: {path}")
+    try:
+        return LazyImage(path, dtype=dtype)
+    except tifffile.TiffFileError as e:
+        raise ValueError(f"Cannot read TIFF {path}: {e}") from e
+
+
+def read_image_shape(path: Union[str, Path]) -> Tuple[int, int]:
+    """
+    Read (height, width) of an image without decoding pixel data.
+
+    Args:
+        path: Path to image file
+
+    Returns:
+        (height, width)
+    """
+    path = Path(path)
+    if is_tiff(path):
+        try:
+            with tifffile.TiffFile(path) as tif:
+                page = tif.pages.first
+                return (int(page.imagelength), int(page.imagewidth))
+        except tifffile.TiffFileError:
+            pass
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return (img.height, img.width)
@@ -14,8 +14,18 @@ from ..models import (
     GENUS_REFERENCE_RANGES,
 )
 from .calibration import calibrate_manual, estimate_calibration_700x
-from .preprocessing import load_image, preprocess_pipeline
-from .detection import detect_tubercles
+from .preprocessing import (
+    AUTO_ROI,
+    DEFAULT_ANALYSIS_DTYPE,
+    estimate_foreground_mask,
+    load_image,
+    preprocess_pipeline,
+)
+from .detection import detect_tubercles, sigma_range_for_diameters
+from .lazy_image import LazyImage, is_tiff, open_lazy_image
+from .profiling import StageProfiler, profile_stage
+from .roi import roi_mask
+from .tiling import TileScheduler, preprocess_tiled, roi_preprocess_margin
 
 
 def build_neighbor_graph(tubercles: List[Tubercle]) -> Optional[Delaunay]:
@@ -651,6 +661,13 @@ def process_image(
     max_diameter_um: float = 10.0,
     detection_threshold: float = 0.05,
     min_circularity: float = 0.5,
+    dtype=DEFAULT_ANALYSIS_DTYPE,
+    tile_size: Optional[int] = None,
+    workers: Optional[int] = 1,
+    chunk_size: int = 1,
+    roi=None,
+    profile: bool = False,
+    profile_memory: bool = False,
 ) -> Tuple[MeasurementResult, np.ndarray, dict]:
     """
     Process a single image end-to-end.
@@ -665,33 +682,79 @@ def process_image(
         max_diameter_um: Maximum expected tubercle diameter
         detection_threshold: Blob detection threshold
         min_circularity: Minimum circularity filter
+        dtype: Float dtype used for preprocessing and detection
+        tile_size: If set, preprocess and detect in tiles of this size,
+            reading TIFFs lazily (identical results, bounded memory)
+        workers: Processes used for tiled detection and threads used for
+            blob refinement (None for all cores)
+        chunk_size: Tiles per worker task in tiled detection
+        roi: Optional mask or (x, y) polygon restricting preprocessing and
+            detection (see core.roi), or "auto" to estimate the scale
+            surface once (see estimate_foreground_mask) and use it for both
+        profile: If True, time every stage; the profile is returned as
+            info["profile"] (see core.profiling)
+        profile_memory: Also record each stage's tracemalloc peak (implies
+            profile; slows some stages while tracing)
 
     Returns:
         Tuple of (MeasurementResult, preprocessed_image, processing_info)
     """
     info = {"image_path": str(image_path)}
+    profiler = (
+        StageProfiler(track_memory=profile_memory) if profile or profile_memory else None
+    )
 
-    # Load image
-    image = load_image(image_path)
+    # Load image (tiled mode reads TIFF pixels one tile at a time)
+    with profile_stage(profiler, "load"):
+        if tile_size is not None and is_tiff(image_path):
+            image = open_lazy_image(image_path, dtype=dtype)
+        else:
+            image = load_image(image_path, dtype=dtype)
     info["image_shape"] = image.shape
 
-    # Calibration
-    if scale_bar_um is not None and scale_bar_px is not None:
-        calibration = calibrate_manual(scale_bar_um, scale_bar_px)
-    else:
-        calibration = estimate_calibration_700x(image.shape[1])
-        info["calibration_warning"] = "Using estimated calibration for 700x magnification"
-
-    info["calibration"] = {
-        "um_per_pixel": calibration.um_per_pixel,
-        "method": calibration.method,
-    }
-
-    # Preprocess
-    preprocessed, intermediates = preprocess_pipeline(image)
+    # A lazily opened TIFF is only read until preprocessing is done
+    try:
+        # Calibration
+        if scale_bar_um is not None and scale_bar_px is not None:
+            calibration = calibrate_manual(scale_bar_um, scale_bar_px)
+        else:
+            calibration = estimate_calibration_700x(image.shape[1])
+            info["calibration_warning"] = "Using estimated calibration for 700x magnification"
+
+        info["calibration"] = {
+            "um_per_pixel": calibration.um_per_pixel,
+            "method": calibration.method,
+        }
+
+        # Preprocess (an ROI keeps the context detection reads around it)
+        _, max_sigma = sigma_range_for_diameters(calibration, min_diameter_um, max_diameter_um)
+        roi_margin = roi_preprocess_margin(max_sigma)
+        with profile_stage(profiler, "preprocess"):
+            if tile_size is not None:
+                if isinstance(roi, str) and roi == AUTO_ROI:
+                    roi = estimate_foreground_mask(image)
+                preprocessed = preprocess_tiled(
+                    image, tile_size=tile_size, dtype=dtype, roi=roi, roi_margin=roi_margin
+                )
+                info["tile_size"] = tile_size
+            else:
+                preprocessed, intermediates = preprocess_pipeline(
+                    image,
+                    roi=roi,
+                    roi_margin=roi_margin,
+                    profiler=profiler,
+                    keep_intermediates=False,
+                )
+                roi = intermediates.get("roi")
+    finally:
+        if isinstance(image, LazyImage):
+            image.close()
     info["preprocessing"] = "CLAHE + Gaussian blur"
+    if roi is not None:
+        info["roi_fraction"] = float(roi_mask(roi, preprocessed.shape).mean())
 
     # Detect tubercles
+    scheduler = TileScheduler(workers=workers, chunk_size=chunk_size) if tile_size else None
     tubercles = detect_tubercles(
         preprocessed,
         calibration,
@@ -699,18 +762,28 @@ def process_image(
         max_diameter_um=max_diameter_um,
         threshold=detection_threshold,
         min_circularity=min_circularity,
+        tile_size=tile_size,
+        scheduler=scheduler,
+        refine_workers=workers,
+        roi=roi,
+        profiler=profiler,
     )
     info["n_tubercles_detected"] = len(tubercles)
+    if scheduler is not None:
+        info["tiles"] = scheduler.summary()
 
     # Measure metrics
-    result = measure_metrics(
-        tubercles,
-        calibration,
-        image_path=str(image_path),
-    )
+    with profile_stage(profiler, "measurement"):
+        result = measure_metrics(
+            tubercles,
+            calibration,
+            image_path=str(image_path),
+        )
 
     info["mean_diameter_um"] = result.mean_diameter_um
     info["mean_space_um"] = result.mean_space_um
     info["suggested_genus"] = result.suggested_genus
+    if profiler is not None:
+        info["profile"] = profiler.summary()
 
     return result, preprocessed, info
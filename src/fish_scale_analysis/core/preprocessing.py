@@ -1,30 +1,80 @@
 """Image preprocessing for tubercle detection."""
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 from PIL import Image
+from scipy import ndimage
 from skimage import exposure, filters, morphology
-from skimage.util import img_as_float, img_as_ubyte
+from skimage.util import img_as_float, img_as_float32, img_as_float64, img_as_ubyte
 
+from .cache import ByteLRUCache, image_digest
+from .lazy_image import is_tiff, open_lazy_image
+from .profiling import StageProfiler, profile_stage
+from .roi import ROI_PREPROCESS_MARGIN, RoiLike, roi_bounds, roi_mask
 
-def load_image(path: Union[str, Path]) -> np.ndarray:
+# Process-wide cache of preprocessing stage outputs (see preprocess_staged)
+PREPROCESS_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_preprocess_cache = ByteLRUCache(PREPROCESS_CACHE_MAX_BYTES)
+
+# Float dtype used by the production entry points (CLI, UI extraction).
+# float32 halves memory and bandwidth; library functions default to
+# preserving their input dtype.
+DEFAULT_ANALYSIS_DTYPE = np.float32
+
+
+def as_float(image: np.ndarray, dtype=None) -> np.ndarray:
+    """
+    Convert an image to floating point in range [0, 1].
+
+    Args:
+        image: Input image (integer or float)
+        dtype: Target float dtype (np.float32 or np.float64). None keeps
+            float inputs as they are and converts integers to float64.
+
+    Returns:
+        Float image (input returned unchanged if already of the target dtype)
+    """
+    if dtype is None:
+        return img_as_float(image)
+    dtype = np.dtype(dtype)
+    if dtype == np.float32:
+        return img_as_float32(image)
+    if dtype == np.float64:
+        return img_as_float64(image)
+    raise ValueError(f"Unsupported float dtype: {dtype}")
+
+
+def load_image(path: Union[str, Path], dtype=np.float64) -> np.ndarray:
     """
     Load an image from disk.
 
-    Supports TIFF, PNG, JPG and other PIL-supported formats.
+    Supports TIFF, PNG, JPG and other PIL-supported formats. TIFF files are
+    read through tifffile, which also handles BigTIFF and keeps the full
+    dynamic range of 16-bit scans. The whole image is decoded into the
+    returned array; to read a large TIFF region by region, use
+    core.lazy_image.open_lazy_image (as the tiled pipeline does).
 
     Args:
         path: Path to image file
+        dtype: Float dtype of the returned array (np.float64 or np.float32)
 
     Returns:
-        Image as numpy array (grayscale, float64, range 0-1)
+        Image as numpy array (grayscale, range 0-1)
     """
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(f"Image not found: {path}")
 
+    if is_tiff(path):
+        try:
+            with open_lazy_image(path, dtype=dtype) as lazy:
+                return lazy.to_array()
+        except ValueError:
+            pass  # Layout tifffile path does not handle; fall back to PIL
+
     # Use PIL for broad format support
     with Image.open(path) as img:
         # Convert to grayscale if needed
@@ -33,29 +83,36 @@ def load_image(path: Union[str, Path]) -> np.ndarray:
         image = np.array(img)
 
     # Convert to float in range [0, 1]
-    return img_as_float(image)
+    return as_float(image, dtype)
 
 
-def to_grayscale(image: np.ndarray) -> np.ndarray:
+def to_grayscale(image: np.ndarray, dtype=None) -> np.ndarray:
     """
     Convert image to grayscale if needed.
 
     Args:
         image: Input image (can be RGB or grayscale)
+        dtype: Target float dtype (None keeps float input precision)
 
     Returns:
-        Grayscale image as float64
+        Grayscale float image (float64 unless float32 input or dtype given)
     """
     if image.ndim == 3:
         # RGB to grayscale using luminosity method
-        return np.dot(image[..., :3], [0.2989, 0.5870, 0.1140])
-    return img_as_float(image)
+        if dtype is not None:
+            out_dtype = np.dtype(dtype)
+        else:
+            out_dtype = np.float32 if image.dtype == np.float32 else np.float64
+        weights = np.array([0.2989, 0.5870, 0.1140], dtype=out_dtype)
+        return np.dot(image[..., :3].astype(out_dtype, copy=False), weights)
+    return as_float(image, dtype)
 
 
 def apply_clahe(
     image: np.ndarray,
     clip_limit: float = 0.03,
     kernel_size: int = 8,
+    tile_size: Optional[int] = None,
 ) -> np.ndarray:
     """
     Apply Contrast Limited Adaptive Histogram Equalization (CLAHE).
@@ -66,10 +123,17 @@ def apply_clahe(
         image: Input grayscale image (float, 0-1)
         clip_limit: Clipping limit for contrast (0-1, default 0.03)
         kernel_size: Size of contextual regions (default 8)
+        tile_size: Compute in tiles of this size (see tiling.clahe_tiled),
+            bounding skimage's workspace to a tile; the result is the same
 
     Returns:
         Enhanced image
     """
+    if tile_size is not None:
+        from .tiling import clahe_tiled
+
+        return clahe_tiled(image, clip_limit, kernel_size, tile_size=tile_size)
+
     # skimage's equalize_adapthist expects float image in [0, 1]
     return exposure.equalize_adapthist(
         image,
@@ -78,18 +142,24 @@ def apply_clahe(
     )
 
 
-def apply_gaussian_blur(image: np.ndarray, sigma: float = 1.0) -> np.ndarray:
+def apply_gaussian_blur(
+    image: np.ndarray,
+    sigma: float = 1.0,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
     """
     Apply Gaussian blur for noise reduction.
 
     Args:
         image: Input image
         sigma: Standard deviation for Gaussian kernel
+        out: Optional float array of the image's shape to write the result
+            into; may be image itself to blur in place
 
     Returns:
-        Blurred image
+        Blurred image (out if given)
     """
-    return filters.gaussian(image, sigma=sigma)
+    return filters.gaussian(image, sigma=sigma, out=out)
 
 
 def apply_morphological_opening(
@@ -121,43 +191,365 @@ def apply_morphological_opening(
     return img_as_float(opened)
 
 
-def apply_tophat(image: np.ndarray, disk_radius: int = 10) -> np.ndarray:
+TOPHAT_METHODS = ("auto", "decomposed", "direct")
+
+# method="auto" decomposes the top-hat disk from this radius up; below it
+# skimage's direct filter is faster (see scripts/benchmark_core.py tophat)
+TOPHAT_DECOMPOSE_MIN_RADIUS = 5
+
+
+def disk_rectangles(radius: int) -> List[Tuple[int, int]]:
+    """
+    Decompose morphology.disk(radius) into a union of centered rectangles.
+
+    Each row of the disk is a chord; rows sharing a chord width form one
+    step of the disk's staircase outline, and the rectangle spanning that
+    step's rows and width lies inside the disk. Together the rectangles
+    cover it exactly.
+
+    Args:
+        radius: Disk radius in pixels
+
+    Returns:
+        List of (half_height, half_width) pairs, half_height increasing
+    """
+    half_widths = morphology.disk(radius).sum(axis=1)[radius:] // 2
+    return [
+        (dy, int(half_widths[dy]))
+        for dy in range(radius + 1)
+        if dy == radius or half_widths[dy + 1] != half_widths[dy]
+    ]
+
+
+def _rectangle_union_filter(image: np.ndarray, rectangles, reduce, filter1d) -> np.ndarray:
+    """Grey erosion or dilation by a union of rectangles ('reflect' borders)."""
+    result = None
+    for half_height, half_width in rectangles:
+        rect = filter1d(image, 2 * half_height + 1, axis=0, mode="reflect")
+        rect = filter1d(rect, 2 * half_width + 1, axis=1, mode="reflect")
+        result = rect if result is None else reduce(result, rect, out=result)
+    return result
+
+
+def apply_tophat(
+    image: np.ndarray,
+    disk_radius: int = 10,
+    method: str = "auto",
+) -> np.ndarray:
     """
     Apply white top-hat transform to enhance bright spots.
 
     Top-hat = original - opening
     Enhances bright features smaller than the structuring element.
 
+    The "decomposed" method splits the disk into the rectangles of its
+    staircase outline (see disk_rectangles). Erosion and dilation by a
+    union are the minimum and maximum over its members, and each rectangle
+    is a separable running min/max whose cost does not depend on its size,
+    so the opening costs O(radius) per pixel instead of O(radius^2) and
+    equals skimage's ("direct") exactly.
+
     Args:
         image: Input image
         disk_radius: Radius of disk structuring element
+        method: "decomposed" (fast, exact), "direct" (skimage white_tophat),
+            or "auto" to decompose from TOPHAT_DECOMPOSE_MIN_RADIUS up
 
     Returns:
         Top-hat transformed image
     """
+    if method not in TOPHAT_METHODS:
+        raise ValueError(f"method must be one of {TOPHAT_METHODS}, got {method!r}")
+    if method == "auto":
+        method = "decomposed" if disk_radius >= TOPHAT_DECOMPOSE_MIN_RADIUS else "direct"
     img_uint8 = img_as_ubyte(image)
-    selem = morphology.disk(disk_radius)
-    tophat = morphology.white_tophat(img_uint8, selem)
-    return img_as_float(tophat)
-
-
-def normalize_image(image: np.ndarray) -> np.ndarray:
+    if method == "direct":
+        tophat = morphology.white_tophat(img_uint8, morphology.disk(disk_radius))
+    else:
+        rectangles = disk_rectangles(disk_radius)
+        eroded = _rectangle_union_filter(
+            img_uint8, rectangles, np.minimum, ndimage.minimum_filter1d
+        )
+        opened = _rectangle_union_filter(
+            eroded, rectangles, np.maximum, ndimage.maximum_filter1d
+        )
+        tophat = img_uint8 - opened
+    return as_float(tophat, image.dtype if image.dtype.kind == "f" else None)
+
+
+def normalize_image(image: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Normalize image to full [0, 1] range.
 
     Args:
         image: Input image
+        out: Optional array of the image's shape and dtype to write the
+            result into; may be image itself to normalize in place
 
     Returns:
-        Normalized image with min=0, max=1
+        Normalized image with min=0, max=1 (out if given)
     """
+    if out is not None and (out.shape != image.shape or out.dtype != image.dtype):
+        raise ValueError(
+            f"out must have shape {image.shape} and dtype {image.dtype}, "
+            f"got {out.shape} and {out.dtype}"
+        )
     img_min = image.min()
     img_max = image.max()
 
     if img_max - img_min < 1e-10:
-        return np.zeros_like(image)
+        if out is None:
+            return np.zeros_like(image)
+        out.fill(0)
+        return out
+
+    if out is None:
+        return (image - img_min) / (img_max - img_min)
+    np.subtract(image, img_min, out=out)
+    np.divide(out, img_max - img_min, out=out)
+    return out
+
+
+# Foreground estimation works on an image this many times smaller per axis;
+# tubercles span tens of pixels, so the scale's texture survives while
+# pixel noise averages away
+FOREGROUND_DOWNSCALE = 4
+
+# Side of the local-variance window, in downsampled pixels
+FOREGROUND_WINDOW = 5
+
+# Local standard deviation (in [0, 1] intensity units) below which a region
+# is always treated as flat background
+FOREGROUND_MIN_STD = 0.01
 
-    return (image - img_min) / (img_max - img_min)
+# Regions whose texture is weaker than this fraction of the image's
+# strongest texture (95th percentile) are background
+FOREGROUND_RELATIVE_STD = 0.1
+
+# Rows of downsampled blocks read at a time
+FOREGROUND_STRIP_BLOCKS = 128
+
+# Value of the roi argument that requests estimate_foreground_mask
+AUTO_ROI = "auto"
+
+
+def estimate_foreground_mask(
+    image: np.ndarray,
+    downscale: int = FOREGROUND_DOWNSCALE,
+    window: int = FOREGROUND_WINDOW,
+    min_std: float = FOREGROUND_MIN_STD,
+    relative_std: float = FOREGROUND_RELATIVE_STD,
+) -> np.ndarray:
+    """
+    Estimate where the scale surface is, as opposed to flat background.
+
+    The image is block-averaged by downscale, the local standard deviation
+    is taken over window x window blocks, and blocks with texture above
+    max(min_std, relative_std * 95th percentile) are kept. Holes are filled
+    and the mask is expanded back to full resolution. Cost is a few
+    percent of one preprocessing stage.
+
+    Args:
+        image: Input image (grayscale or RGB array, or LazyImage)
+        downscale: Block size of the downsampling
+        window: Local-variance window in downsampled pixels
+        min_std: Absolute texture floor
+        relative_std: Texture floor relative to the image's textured regions
+
+    Returns:
+        Boolean mask of shape image.shape[:2]; all True if no region
+        stands out as background
+    """
+    if downscale < 1:
+        raise ValueError(f"downscale must be >= 1, got {downscale}")
+    if window < 1:
+        raise ValueError(f"window must be >= 1, got {window}")
+
+    h, w = image.shape[:2]
+    f = int(downscale)
+    # Block-average in strips so a LazyImage is never read whole
+    strips = []
+    for y0 in range(0, h, f * FOREGROUND_STRIP_BLOCKS):
+        strip = to_grayscale(np.asarray(image[y0:y0 + f * FOREGROUND_STRIP_BLOCKS]), np.float32)
+        strip = np.pad(strip, ((0, -strip.shape[0] % f), (0, -w % f)), mode="edge")
+        strips.append(
+            strip.reshape(strip.shape[0] // f, f, strip.shape[1] // f, f).mean(axis=(1, 3))
+        )
+    small = np.concatenate(strips)
+
+    mean = ndimage.uniform_filter(small, window, mode="reflect")
+    mean_sq = ndimage.uniform_filter(small * small, window, mode="reflect")
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+
+    threshold = max(min_std, relative_std * float(np.percentile(std, 95)))
+    foreground = ndimage.binary_fill_holes(std > threshold)
+    if not foreground.any():
+        return np.ones((h, w), dtype=bool)
+
+    full = np.repeat(np.repeat(foreground, f, axis=0), f, axis=1)
+    return full[:h, :w]
+
+
+# Tile size of CLAHE in lean pipeline runs; skimage's workspace is about
+# 16 times its input, so tiling bounds it to a few MB (tiling.clahe_tiled
+# falls back to whole-image equalize_adapthist without skimage internals)
+LEAN_CLAHE_TILE_SIZE = 512
+
+
+@dataclass(frozen=True)
+class PreprocessStage:
+    """One node of the preprocessing stage graph.
+
+    Each stage reads the previous stage's output plus its own parameters,
+    so its output can be memoized on (upstream key, own parameters).
+    """
+
+    name: str
+    params: Tuple[str, ...]  # Pipeline parameters this stage depends on
+    func: Callable[..., np.ndarray]
+    enabled_by: Optional[str] = None  # Boolean parameter gating the stage
+    cacheable: bool = True  # False for cheap stages that may return their input
+    accepts_out: bool = False  # func takes an out= buffer, which may be its input
+    lean_func: Optional[Callable[..., np.ndarray]] = None  # Same result, less memory
+
+    def applies(self, params: dict) -> bool:
+        """Whether the stage runs for these parameters."""
+        return self.enabled_by is None or bool(params[self.enabled_by])
+
+
+# Stages in execution order. Stage names double as intermediate keys.
+PREPROCESS_STAGES = (
+    PreprocessStage(
+        "grayscale",
+        ("dtype",),
+        lambda image, dtype: to_grayscale(image, dtype=dtype),
+        cacheable=False,
+    ),
+    PreprocessStage(
+        "clahe",
+        ("clahe_clip", "clahe_kernel"),
+        lambda image, clahe_clip, clahe_kernel: apply_clahe(
+            image, clip_limit=clahe_clip, kernel_size=clahe_kernel
+        ),
+        lean_func=lambda image, clahe_clip, clahe_kernel: apply_clahe(
+            image,
+            clip_limit=clahe_clip,
+            kernel_size=clahe_kernel,
+            tile_size=LEAN_CLAHE_TILE_SIZE,
+        ),
+    ),
+    PreprocessStage(
+        "blurred",
+        ("blur_sigma",),
+        lambda image, blur_sigma, out=None: apply_gaussian_blur(image, sigma=blur_sigma, out=out),
+        accepts_out=True,
+    ),
+    PreprocessStage(
+        "tophat",
+        ("tophat_radius",),
+        lambda image, tophat_radius: apply_tophat(image, disk_radius=tophat_radius),
+        enabled_by="use_tophat",
+    ),
+    PreprocessStage(
+        "final",
+        (),
+        lambda image, out=None: normalize_image(image, out=out),
+        accepts_out=True,
+    ),
+)
+
+
+@dataclass
+class StagedResult:
+    """Output of a staged preprocessing run."""
+
+    result: np.ndarray  # Final preprocessed image
+    outputs: Dict[str, np.ndarray]  # Stage outputs from the resume point on, by name
+    recomputed: List[str]  # Stages actually computed (the rest were cache hits)
+
+
+def _run_stages(
+    image: np.ndarray,
+    params: dict,
+    cache: Optional[ByteLRUCache] = None,
+    profiler: Optional[StageProfiler] = None,
+    keep_outputs: bool = True,
+    out: Optional[np.ndarray] = None,
+) -> StagedResult:
+    """Run PREPROCESS_STAGES, memoizing each stage output in cache if given.
+
+    Stages that are computed (not served from the cache) are timed as
+    stages of profiler.
+
+    Uncached runs write the last stage's result into out if given. With
+    keep_outputs=False they also keep no stage output once the next stage
+    has consumed it, use each stage's lean_func where it has one, and
+    stages that accept an out= buffer overwrite the previous output in
+    place whenever it is not the caller's image.
+    """
+    if cache is not None and (not keep_outputs or out is not None):
+        raise ValueError("cached runs keep every stage output and allocate their own")
+    stages = [stage for stage in PREPROCESS_STAGES if stage.applies(params)]
+    outputs = {}
+    recomputed = []
+    current = image
+    start = 0
+
+    if cache is not None:
+        # Each stage is keyed on the image plus every parameter up to and
+        # including its own, so a key identifies the whole upstream chain
+        keys = []
+        key = (image_digest(image),)
+        for stage in stages:
+            key = key + (stage.name, tuple(params[name] for name in stage.params))
+            keys.append(key)
+
+        # Resume after the deepest stage whose output is already cached
+        for i in range(len(stages) - 1, -1, -1):
+            if stages[i].cacheable and cache.peek(keys[i]) is not None:
+                cached = cache.get(keys[i])
+                if cached is not None:
+                    current = cached
+                    outputs[stages[i].name] = cached
+                    start = i + 1
+                    break
+
+    for i in range(start, len(stages)):
+        stage = stages[i]
+        stage_args = [params[name] for name in stage.params]
+
+        if cache is None or not stage.cacheable:
+            func = stage.lean_func if not keep_outputs and stage.lean_func else stage.func
+            buffer = None
+            if stage.accepts_out:
+                if i == len(stages) - 1 and out is not None:
+                    buffer = out
+                elif not keep_outputs and not np.may_share_memory(current, image):
+                    buffer = current  # Overwrite the previous stage's output
+            with profile_stage(profiler, stage.name):
+                if buffer is None:
+                    current = func(current, *stage_args)
+                else:
+                    current = func(current, *stage_args, out=buffer)
+            recomputed.append(stage.name)
+        else:
+            computed = []
+
+            def compute(upstream=current, stage=stage, stage_args=stage_args):
+                computed.append(stage.name)
+                with profile_stage(profiler, stage.name):
+                    return stage.func(upstream, *stage_args)
+
+            current = cache.get_or_compute(keys[i], compute)
+            recomputed.extend(computed)
+
+        if keep_outputs:
+            outputs[stage.name] = current
+
+    if out is not None and current is not out:
+        out[...] = current
+        current = out
+    return StagedResult(result=current, outputs=outputs, recomputed=recomputed)
 
 
 def preprocess_pipeline(
@@ -167,10 +559,19 @@ def preprocess_pipeline(
     blur_sigma: float = 1.0,
     use_tophat: bool = False,
     tophat_radius: int = 10,
+    dtype=None,
+    roi: Optional[Union[RoiLike, str]] = None,
+    roi_margin: int = ROI_PREPROCESS_MARGIN,
+    profiler: Optional[StageProfiler] = None,
+    keep_intermediates: bool = True,
+    out: Optional[np.ndarray] = None,
 ) -> Tuple[np.ndarray, dict]:
     """
     Complete preprocessing pipeline for tubercle detection.
 
+    Runs PREPROCESS_STAGES in order: grayscale, CLAHE, Gaussian blur,
+    optional top-hat and final normalization.
+
     Args:
         image: Input grayscale image
         clahe_clip: CLAHE clip limit
@@ -178,36 +579,179 @@ def preprocess_pipeline(
         blur_sigma: Gaussian blur sigma
         use_tophat: Whether to apply top-hat transform
         tophat_radius: Top-hat disk radius
+        dtype: Float dtype for the computation (None keeps the input precision)
+        roi: Optional mask or (x, y) polygon (see core.roi). Only the ROI's
+            bounding box, plus ``roi_margin`` pixels of context, is
+            processed; outputs keep the image's shape and are zero outside
+            that window. AUTO_ROI ("auto") estimates the mask with
+            estimate_foreground_mask. The rasterized mask is returned as
+            intermediates["roi"] so detection can reuse it.
+        roi_margin: Context pixels kept around the ROI's bounding box. ROI
+            detection reads pixels beyond the box too; pass
+            core.tiling.roi_preprocess_margin(max_sigma) when the result
+            feeds detect_tubercles with the same ROI.
+        profiler: Optional StageProfiler timing each stage (see core.profiling)
+        keep_intermediates: Return every stage output and a copy of the
+            input. False runs lean: each stage output is released (or
+            overwritten in place) once the next stage has read it, CLAHE
+            runs in LEAN_CLAHE_TILE_SIZE tiles, and the dict holds only
+            "roi" when an ROI is used. The result is identical.
+        out: Optional preallocated array of the image's 2D shape and the
+            computation's float dtype to write the result into, e.g. a
+            buffer reused across same-sized images
 
     Returns:
         Tuple of (preprocessed image, dict of intermediate results)
     """
-    intermediates = {"original": image.copy()}
+    if out is not None and out.shape != image.shape[:2]:
+        raise ValueError(f"out must have shape {image.shape[:2]}, got {out.shape}")
+    params = {
+        "clahe_clip": clahe_clip,
+        "clahe_kernel": clahe_kernel,
+        "blur_sigma": blur_sigma,
+        "use_tophat": use_tophat,
+        "tophat_radius": tophat_radius,
+        "dtype": dtype,
+    }
 
-    # Step 1: Ensure grayscale float
-    gray = to_grayscale(image)
-    intermediates["grayscale"] = gray
+    intermediates = {"original": image.copy()} if keep_intermediates else {}
+    if roi is None:
+        staged = _run_stages(
+            image, params, profiler=profiler, keep_outputs=keep_intermediates, out=out
+        )
+        intermediates.update(staged.outputs)
+        return staged.result, intermediates
+
+    if isinstance(roi, str):
+        if roi != AUTO_ROI:
+            raise ValueError(f"roi must be a mask, a polygon or {AUTO_ROI!r}, got {roi!r}")
+        with profile_stage(profiler, "roi"):
+            mask = estimate_foreground_mask(image)
+    else:
+        mask = roi_mask(roi, image.shape)
+    intermediates["roi"] = mask
+
+    window = roi_bounds(mask, roi_margin)
+    staged = _run_stages(
+        image[window],
+        params,
+        profiler=profiler,
+        keep_outputs=keep_intermediates,
+        out=out[window] if out is not None else None,
+    )
+    if out is None:
+        result = np.zeros(image.shape[:2], dtype=staged.result.dtype)
+        result[window] = staged.result
+    else:
+        result = out
+        rows, cols = window
+        result[: rows.start] = 0
+        result[rows.stop :] = 0
+        result[rows, : cols.start] = 0
+        result[rows, cols.stop :] = 0
+    for name, output in staged.outputs.items():
+        if name == "final":
+            intermediates[name] = result
+        else:
+            full = np.zeros(image.shape[:2], dtype=output.dtype)
+            full[window] = output
+            intermediates[name] = full
+    return result, intermediates
 
-    # Step 2: Apply CLAHE for contrast enhancement
-    enhanced = apply_clahe(gray, clip_limit=clahe_clip, kernel_size=clahe_kernel)
-    intermediates["clahe"] = enhanced
 
-    # Step 3: Light Gaussian blur for noise reduction
-    blurred = apply_gaussian_blur(enhanced, sigma=blur_sigma)
-    intermediates["blurred"] = blurred
+def preprocess_staged(
+    image: np.ndarray,
+    clahe_clip: float = 0.03,
+    clahe_kernel: int = 8,
+    blur_sigma: float = 1.0,
+    use_tophat: bool = False,
+    tophat_radius: int = 10,
+    dtype=None,
+    cache: Optional[ByteLRUCache] = None,
+    profiler: Optional[StageProfiler] = None,
+) -> StagedResult:
+    """
+    Preprocessing with every stage memoized on its own inputs.
 
-    # Step 4: Optional top-hat to enhance bright spots
-    if use_tophat:
-        result = apply_tophat(blurred, disk_radius=tophat_radius)
-        intermediates["tophat"] = result
-    else:
-        result = blurred
+    A stage is recomputed only if the image or a parameter of that stage or
+    of an upstream stage changed, e.g. changing blur_sigma reuses the cached
+    CLAHE output and only reruns blur, top-hat and normalization.
 
-    # Step 5: Final normalization
-    result = normalize_image(result)
-    intermediates["final"] = result
+    Args:
+        image: Input grayscale image
+        clahe_clip: CLAHE clip limit
+        clahe_kernel: CLAHE kernel size
+        blur_sigma: Gaussian blur sigma
+        use_tophat: Whether to apply top-hat transform
+        tophat_radius: Top-hat disk radius
+        dtype: Float dtype for the computation (None keeps the input precision)
+        cache: Stage cache to use (defaults to the process-wide cache)
+        profiler: Optional StageProfiler timing each recomputed stage
 
-    return result, intermediates
+    Returns:
+        StagedResult with the final image, per-stage outputs (read-only, shared
+        with the cache) and the names of the stages that were recomputed
+    """
+    if cache is None:
+        cache = _preprocess_cache
+
+    params = {
+        "clahe_clip": float(clahe_clip),
+        "clahe_kernel": int(clahe_kernel),
+        "blur_sigma": float(blur_sigma),
+        "use_tophat": bool(use_tophat),
+        "tophat_radius": int(tophat_radius),
+        "dtype": np.dtype(dtype).name if dtype is not None else None,
+    }
+    return _run_stages(image, params, cache=cache, profiler=profiler)
+
+
+def get_preprocess_cache() -> ByteLRUCache:
+    """Return the process-wide preprocessing stage cache (for stats or clearing)."""
+    return _preprocess_cache
+
+
+def preprocess_cached(
+    image: np.ndarray,
+    clahe_clip: float = 0.03,
+    clahe_kernel: int = 8,
+    blur_sigma: float = 1.0,
+    use_tophat: bool = False,
+    tophat_radius: int = 10,
+    dtype=None,
+    cache: Optional[ByteLRUCache] = None,
+) -> np.ndarray:
+    """
+    Memoized version of preprocess_pipeline returning only the final image.
+
+    Results are keyed by the image content hash plus the preprocessing
+    parameters, so repeated extractions that only change detection
+    parameters skip preprocessing entirely. Goes through preprocess_staged,
+    so a changed downstream parameter also reuses the upstream stages.
+
+    Args:
+        image: Input grayscale image
+        clahe_clip: CLAHE clip limit
+        clahe_kernel: CLAHE kernel size
+        blur_sigma: Gaussian blur sigma
+        use_tophat: Whether to apply top-hat transform
+        tophat_radius: Top-hat disk radius
+        dtype: Float dtype for the computation (None keeps the input precision)
+        cache: Cache to use (defaults to the process-wide cache)
+
+    Returns:
+        Preprocessed image (read-only, shared with the cache)
+    """
+    return preprocess_staged(
+        image,
+        clahe_clip=clahe_clip,
+        clahe_kernel=clahe_kernel,
+        blur_sigma=blur_sigma,
+        use_tophat=use_tophat,
+        tophat_radius=tophat_radius,
+        dtype=dtype,
+        cache=cache,
+    ).result
 
 
 def get_image_info(image: np.ndarray) -> dict:
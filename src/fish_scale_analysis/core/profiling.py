@@ -0,0 +1,127 @@
+"""
+Opt-in per-stage timing and memory instrumentation.
+
+The analysis entry points (process_image, preprocess_pipeline,
+detect_tubercles, detect_tubercles_lattice) accept an optional
+StageProfiler and wrap each of their stages in profile_stage. Without a
+profiler the wrappers are no-ops, so runs that do not ask for a profile
+pay nothing.
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import ContextManager, Iterator, List, Optional
+
+
+@dataclass
+class StageTiming:
+    """Wall time and memory of one profiled stage."""
+
+    name: str  # Nested stages are named "outer/inner"
+    seconds: float
+    peak_bytes: Optional[int] = None  # Peak traced memory above the stage's start
+
+
+@dataclass
+class _OpenStage:
+    name: str
+    start_bytes: int
+    peak_bytes: int
+
+
+class StageProfiler:
+    """Records the wall time, and optionally the memory peak, of each stage.
+
+    Stages nest: a stage opened inside another is recorded as
+    "outer/inner", and the outer stage's time and peak include it. Memory
+    is measured with tracemalloc, which numpy reports its buffers to; it is
+    started when the outermost stage opens and stopped when it closes,
+    unless it was already running. Stages must be opened from one thread.
+    """
+
+    def __init__(self, track_memory: bool = False):
+        """
+        Args:
+            track_memory: Also record the tracemalloc peak of each stage.
+                Tracing slows stages that allocate many small Python
+                objects (CLAHE runs about 5x slower), so compare timings
+                only between runs with the same setting.
+        """
+        self.track_memory = track_memory
+        self.timings: List[StageTiming] = []
+        self._open: List[_OpenStage] = []
+        self._owns_tracemalloc = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager timing the enclosed block as stage ``name``."""
+        parent = self._open[-1] if self._open else None
+        if parent is not None:
+            name = f"{parent.name}/{name}"
+
+        start_bytes = 0
+        if self.track_memory:
+            if parent is None and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            start_bytes, peak = tracemalloc.get_traced_memory()
+            # Fold the peak so far into the enclosing stage before resetting
+            if parent is not None:
+                parent.peak_bytes = max(parent.peak_bytes, peak)
+            tracemalloc.reset_peak()
+
+        current = _OpenStage(name, start_bytes, start_bytes)
+        timing = StageTiming(name, 0.0)
+        self.timings.append(timing)  # In start order
+        self._open.append(current)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.seconds = time.perf_counter() - start
+            self._open.pop()
+            if self.track_memory and tracemalloc.is_tracing():
+                current.peak_bytes = max(current.peak_bytes, tracemalloc.get_traced_memory()[1])
+                timing.peak_bytes = current.peak_bytes - current.start_bytes
+                if parent is not None:
+                    parent.peak_bytes = max(parent.peak_bytes, current.peak_bytes)
+                elif self._owns_tracemalloc:
+                    tracemalloc.stop()
+                    self._owns_tracemalloc = False
+
+    def summary(self) -> dict:
+        """
+        JSON-serializable profile.
+
+        Returns:
+            Dict with total_seconds (sum of the outermost stages) and a
+            stages list of {name, seconds, peak_mb} in start order; peak_mb
+            is None when memory is not tracked
+        """
+        return {
+            "total_seconds": sum(t.seconds for t in self.timings if "/" not in t.name),
+            "stages": [
+                {
+                    "name": t.name,
+                    "seconds": t.seconds,
+                    "peak_mb": None if t.peak_bytes is None else t.peak_bytes / 2**20,
+                }
+                for t in self.timings
+            ],
+        }
+
+
+def profile_stage(profiler: Optional[StageProfiler], name: str) -> ContextManager[None]:
+    """
+    Time a block as a stage of profiler, or do nothing without one.
+
+    Args:
+        profiler: Profiler collecting the run's stages, or None
+        name: Stage name
+
+    Returns:
+        Context manager
+    """
+    return profiler.stage(name) if profiler is not None else nullcontext()
@@ -0,0 +1,86 @@
+"""
+Regions of interest for restricting preprocessing and detection.
+
+SEM scale images often include blank borders or mounting medium. An ROI,
+given as a boolean mask or a polygon, limits work to its bounding box and
+lets detections outside it be discarded before they are measured.
+"""
+
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+from skimage.draw import polygon2mask
+
+# A boolean mask of the image's shape, or polygon vertices as (x, y) pixels
+RoiLike = Union[np.ndarray, Sequence[Tuple[float, float]]]
+
+# Context kept around an ROI's bounding box when preprocessing it, so blur,
+# top-hat and CLAHE see real pixels at the ROI's edge
+ROI_PREPROCESS_MARGIN = 32
+
+
+def roi_mask(roi: RoiLike, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Rasterize an ROI.
+
+    Args:
+        roi: Boolean (or 0/1) mask with the image's shape, or a polygon
+            as a sequence of at least three (x, y) vertices
+        shape: Image shape; only the first two dimensions are used
+
+    Returns:
+        Boolean mask of shape shape[:2]
+    """
+    shape = tuple(shape[:2])
+    arr = np.asarray(roi)
+    if arr.shape == shape:
+        return arr.astype(bool, copy=False)
+    if arr.ndim == 2 and arr.shape[1] == 2 and len(arr) >= 3:
+        # polygon2mask takes (row, col) vertices
+        return polygon2mask(shape, arr[:, ::-1].astype(float))
+    raise ValueError(
+        f"roi must be a mask of shape {shape} or a polygon of (x, y) vertices, "
+        f"got array of shape {arr.shape}"
+    )
+
+
+def roi_bounds(mask: np.ndarray, margin: int = 0) -> Tuple[slice, slice]:
+    """
+    Bounding box of a mask, grown by a margin and clipped to the image.
+
+    Args:
+        mask: Boolean ROI mask
+        margin: Pixels added on every side
+
+    Returns:
+        (row slice, column slice)
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0:
+        raise ValueError("roi is empty")
+    h, w = mask.shape
+    return (
+        slice(max(0, rows[0] - margin), min(h, rows[-1] + 1 + margin)),
+        slice(max(0, cols[0] - margin), min(w, cols[-1] + 1 + margin)),
+    )
+
+
+def points_in_roi(mask: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Which points fall inside an ROI.
+
+    Args:
+        mask: Boolean ROI mask
+        points: (n, 2) array of (y, x) positions
+
+    Returns:
+        Boolean array of length n; points off the image are outside
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    idx = np.round(points).astype(np.intp)
+    h, w = mask.shape
+    on_image = (idx[:, 0] >= 0) & (idx[:, 0] < h) & (idx[:, 1] >= 0) & (idx[:, 1] < w)
+    inside = np.zeros(len(points), dtype=bool)
+    inside[on_image] = mask[idx[on_image, 0], idx[on_image, 1]]
+    return inside
@@ -0,0 +1,625 @@
+"""Tiled preprocessing and LoG detection for very large images.
+
+Whole-image preprocessing and LoG detection need several full-size float
+buffers (the LoG scale space alone is ``num_sigma`` times the image), which
+rules out stitched whole-scale mosaics. The functions here process an image
+in tiles, each read together with a halo of surrounding pixels, and keep
+only each tile's core. Halos are sized so every core pixel sees exactly the
+neighbourhood it would see in a whole-image run:
+
+- CLAHE: two contextual regions, with tile cores aligned to the CLAHE grid
+- Gaussian blur and top-hat: the filter footprint
+- LoG detection: the Gaussian support of the largest sigma (from
+  ``max_diameter_um``) plus the 3x3x3 maximum footprint
+
+The global steps of the pipeline (CLAHE input/output intensity rescaling,
+final normalization, overlap pruning of blobs) are applied across all tiles,
+so the tiled results match ``preprocess_pipeline`` and ``detect_blobs_log``.
+
+Tiled detection can run across CPU cores with ``TileScheduler``, which hands
+the image to a process pool through shared memory.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+import numpy as np
+from skimage import exposure, filters
+from skimage.util import img_as_float, img_as_uint
+
+try:
+    # Private skimage API (the version is capped in pyproject); without it
+    # CLAHE falls back to one whole-image equalize_adapthist call
+    from skimage.exposure._adapthist import NR_OF_GRAY, _clahe
+except ImportError:
+    NR_OF_GRAY, _clahe = None, None
+
+from .detection import (
+    _assemble_log_blobs,
+    _cube_local_maxima,
+    _log_scale_space,
+    _log_sigma_list,
+    resolve_scale_space_backend,
+)
+from .lazy_image import LazyImage
+from .preprocessing import apply_clahe, apply_tophat, to_grayscale
+from .roi import ROI_PREPROCESS_MARGIN, RoiLike, roi_bounds, roi_mask
+
+DEFAULT_TILE_SIZE = 1024
+
+# Histogram bins used by skimage's equalize_adapthist
+_CLAHE_NBINS = 256
+
+ImageSource = Union[np.ndarray, LazyImage]
+
+
+@dataclass
+class _LazyWindow:
+    """A rectangular window of a LazyImage, read through the full image."""
+
+    image: LazyImage
+    rows: slice
+    cols: slice
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.rows.stop - self.rows.start, self.cols.stop - self.cols.start)
+
+
+@dataclass
+class Tile:
+    """A tile core and the halo-padded window it is computed from."""
+
+    index: int
+    core: Tuple[slice, slice]  # Rows/cols kept, in image coordinates
+    window: Tuple[slice, slice]  # Rows/cols read, in image coordinates
+
+    @property
+    def inner(self) -> Tuple[slice, slice]:
+        """Core expressed in window coordinates."""
+        return tuple(
+            slice(c.start - w.start, c.stop - w.start)
+            for c, w in zip(self.core, self.window)
+        )
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        """(row, col) of the window's top-left corner."""
+        return (self.window[0].start, self.window[1].start)
+
+
+def plan_tiles(
+    shape: Tuple[int, int],
+    tile_size: int,
+    halo: int,
+    align: int = 1,
+) -> List[Tile]:
+    """
+    Split an image into tiles with overlapping halos.
+
+    Args:
+        shape: (height, width) of the image
+        tile_size: Core size in pixels (rounded up to a multiple of align)
+        halo: Extra pixels read on each side of a core
+        align: Core and window origins are multiples of this
+
+    Returns:
+        Tiles in row-major order; cores partition the image
+    """
+    if tile_size < 1:
+        raise ValueError(f"tile_size must be positive, got {tile_size}")
+    align = max(1, int(align))
+    tile_size = -(-int(tile_size) // align) * align
+    halo = -(-int(halo) // align) * align
+    height, width = shape
+
+    tiles = []
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            y1, x1 = min(height, y0 + tile_size), min(width, x0 + tile_size)
+            tiles.append(Tile(
+                index=len(tiles),
+                core=(slice(y0, y1), slice(x0, x1)),
+                window=(
+                    slice(max(0, y0 - halo), min(height, y1 + halo)),
+                    slice(max(0, x0 - halo), min(width, x1 + halo)),
+                ),
+            ))
+    return tiles
+
+
+@dataclass
+class TileTiming:
+    """Wall-clock time spent on one tile."""
+
+    index: int
+    window_shape: Tuple[int, int]
+    seconds: float
+    worker: int  # Process id that ran the tile
+
+    def to_dict(self) -> dict:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            "index": self.index,
+            "window_shape": list(self.window_shape),
+            "seconds": round(self.seconds, 4),
+            "worker": self.worker,
+        }
+
+
+# Image view attached by pool workers (see _attach_shared_image)
+_worker_image: Optional[np.ndarray] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def _attach_shared_image(name: str, shape: Tuple[int, ...], dtype: str) -> None:
+    """Pool initializer: map the parent's shared image into this worker."""
+    global _worker_image, _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=name)
+    _worker_image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_worker_shm.buf)
+
+
+def _run_tile_chunk(
+    items: List[Tuple[int, Tuple[slice, slice], Tuple[slice, slice]]],
+    func: Callable[..., Any],
+    args: tuple,
+    image: Optional[np.ndarray] = None,
+) -> List[Tuple[int, Any, TileTiming]]:
+    """Run func on a chunk of tiles, timing each one."""
+    image = _worker_image if image is None else image
+    results = []
+    for index, window, inner in items:
+        start = time.perf_counter()
+        result = func(image[window], inner, *args)
+        elapsed = time.perf_counter() - start
+        shape = (window[0].stop - window[0].start, window[1].stop - window[1].start)
+        results.append((index, result, TileTiming(index, shape, elapsed, os.getpid())))
+    return results
+
+
+@dataclass
+class TileScheduler:
+    """Runs per-tile work on a process pool and records per-tile timings.
+
+    The image is copied once into shared memory; workers attach to it when
+    the pool starts, so only tile coordinates and small per-tile results
+    cross process boundaries. With ``workers=1`` tiles run in-process.
+
+    Attributes:
+        workers: Worker processes (None for all CPU cores)
+        chunk_size: Tiles handed to a worker per task; larger chunks cut
+            scheduling overhead, smaller ones balance load better
+        timings: Per-tile timings from the last run, in tile order
+        wall_seconds: Wall-clock time of the last run
+    """
+
+    workers: Optional[int] = None
+    chunk_size: int = 1
+    timings: List[TileTiming] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    def __post_init__(self):
+        if self.workers is None:
+            self.workers = os.cpu_count() or 1
+        if self.workers < 1:
+            raise ValueError(f"workers must be at least 1, got {self.workers}")
+        if self.chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {self.chunk_size}")
+
+    def map_tiles(
+        self,
+        image: np.ndarray,
+        tiles: List[Tile],
+        func: Callable[..., Any],
+        *args,
+    ) -> List[Any]:
+        """
+        Apply func to every tile.
+
+        func is called as ``func(window_pixels, tile.inner, *args)`` and must
+        be a picklable module-level function.
+
+        Args:
+            image: Full image array
+            tiles: Tiles from plan_tiles
+            func: Per-tile function
+            *args: Extra arguments passed to func
+
+        Returns:
+            Per-tile results in tile order (independent of completion order)
+        """
+        items = [(t.index, t.window, t.inner) for t in tiles]
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        n_workers = min(self.workers, len(chunks))
+
+        start = time.perf_counter()
+        if n_workers <= 1:
+            outputs = [_run_tile_chunk(chunk, func, args, image=image) for chunk in chunks]
+        else:
+            outputs = self._run_pool(image, chunks, func, args, n_workers)
+        self.wall_seconds = time.perf_counter() - start
+
+        flat = sorted((entry for chunk in outputs for entry in chunk), key=lambda e: e[0])
+        self.timings = [timing for _, _, timing in flat]
+        return [result for _, result, _ in flat]
+
+    def _run_pool(self, image, chunks, func, args, n_workers):
+        image = np.ascontiguousarray(image)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        shared = None
+        try:
+            shared = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+            shared[...] = image
+            with ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=_attach_shared_image,
+                initargs=(shm.name, image.shape, image.dtype.str),
+            ) as pool:
+                futures = [pool.submit(_run_tile_chunk, chunk, func, args) for chunk in chunks]
+                outputs = [future.result() for future in futures]
+        finally:
+            # The view must go before close(), also when a worker raised
+            shared = None
+            try:
+                shm.close()
+            finally:
+                shm.unlink()
+        return outputs
+
+    def summary(self) -> dict:
+        """Timing summary of the last run as a JSON-serializable dict."""
+        seconds = [t.seconds for t in self.timings]
+        return {
+            "workers": self.workers,
+            "chunk_size": self.chunk_size,
+            "n_tiles": len(self.timings),
+            "wall_seconds": round(self.wall_seconds, 4),
+            "tile_seconds_total": round(sum(seconds), 4),
+            "tile_seconds_max": round(max(seconds), 4) if seconds else 0.0,
+            "tiles": [t.to_dict() for t in self.timings],
+        }
+
+
+def detection_halo(max_sigma: float) -> int:
+    """Halo needed for exact LoG maxima up to max_sigma."""
+    # Gaussian support (truncate=4) plus one pixel for the 3x3x3 maximum
+    return int(4.0 * max_sigma + 0.5) + 1
+
+
+def roi_preprocess_margin(max_sigma: float) -> int:
+    """ROI preprocessing margin for detection up to max_sigma.
+
+    ROI detection reads detection_halo(max_sigma) pixels around the ROI's
+    bounding box, and those pixels need the preprocessing filters' own
+    ROI_PREPROCESS_MARGIN of context.
+    """
+    return ROI_PREPROCESS_MARGIN + detection_halo(max_sigma)
+
+
+def _image_shape(image: ImageSource) -> Tuple[int, int]:
+    return tuple(image.shape[:2])
+
+
+def _read_gray(image: ImageSource, region: Tuple[slice, slice], dtype) -> np.ndarray:
+    """Read a region as grayscale float, like the pipeline's first stage."""
+    if isinstance(image, _LazyWindow):
+        rows, cols = region
+        r0, c0 = image.rows.start, image.cols.start
+        region = (
+            slice(r0 + rows.start, r0 + rows.stop),
+            slice(c0 + cols.start, c0 + cols.stop),
+        )
+        image = image.image
+    if isinstance(image, LazyImage):
+        rows, cols = region
+        window = image.read_region(
+            rows.start, rows.stop, cols.start, cols.stop,
+            dtype=image.dtype if dtype is None else dtype,
+        )
+    else:
+        window = image[region]
+    return to_grayscale(window, dtype=dtype)
+
+
+def _clahe_tile(
+    gray: np.ndarray,
+    in_range: Tuple[int, int],
+    clip_limit: float,
+    kernel_size: int,
+) -> np.ndarray:
+    """CLAHE on one window, with the whole image's input intensity range."""
+    image = img_as_uint(gray)
+    image = np.round(
+        exposure.rescale_intensity(image, in_range=in_range, out_range=(0, NR_OF_GRAY - 1))
+    ).astype(np.min_scalar_type(NR_OF_GRAY))
+    return _clahe(image, [kernel_size] * 2, clip_limit, _CLAHE_NBINS)
+
+
+def _clahe_whole(
+    image: ImageSource,
+    clip_limit: float,
+    kernel_size: int,
+    dtype,
+) -> np.ndarray:
+    """Whole-image CLAHE, used when skimage's tile-level CLAHE is unavailable."""
+    shape = _image_shape(image)
+    gray = _read_gray(image, (slice(0, shape[0]), slice(0, shape[1])), dtype)
+    return apply_clahe(gray, clip_limit, kernel_size).astype(gray.dtype, copy=False)
+
+
+def _clahe_levels(
+    image: ImageSource,
+    clip_limit: float,
+    kernel_size: int,
+    tile_size: int,
+    dtype,
+) -> Tuple[np.ndarray, np.dtype]:
+    """CLAHE gray levels of the whole image, before output rescaling.
+
+    Returns:
+        (levels, float dtype of the grayscale input)
+    """
+    shape = _image_shape(image)
+    k = int(kernel_size)
+
+    # CLAHE rescales its input to the whole image's intensity range
+    cores = plan_tiles(shape, tile_size, halo=0, align=k)
+    in_min, in_max = np.iinfo(np.uint16).max, 0
+    float_dtype = None
+    for tile in cores:
+        gray = _read_gray(image, tile.core, dtype)
+        float_dtype = gray.dtype
+        as_uint = img_as_uint(gray)
+        in_min = min(in_min, int(as_uint.min()))
+        in_max = max(in_max, int(as_uint.max()))
+
+    # A window two contextual regions wider than the core, aligned to the
+    # CLAHE grid, reproduces the core exactly
+    levels = np.empty(shape, dtype=np.min_scalar_type(NR_OF_GRAY))
+    for tile in plan_tiles(shape, tile_size, halo=2 * k, align=k):
+        gray = _read_gray(image, tile.window, dtype)
+        levels[tile.core] = _clahe_tile(gray, (in_min, in_max), clip_limit, k)[tile.inner]
+    return levels, float_dtype
+
+
+def clahe_tiled(
+    image: ImageSource,
+    clip_limit: float = 0.03,
+    kernel_size: int = 8,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    dtype=None,
+) -> np.ndarray:
+    """
+    Run CLAHE tile by tile.
+
+    Produces the same result as ``apply_clahe`` on the grayscale image,
+    while skimage's per-pixel histogram mapping workspace (about 16 times
+    the image for 8-pixel contextual regions) is only allocated per tile.
+    If skimage's private CLAHE kernel cannot be imported, the whole image
+    is equalized at once instead (same result, whole-image memory).
+
+    Args:
+        image: Input image (grayscale or RGB array, or LazyImage)
+        clip_limit: CLAHE clip limit
+        kernel_size: CLAHE kernel size
+        tile_size: Tile core size in pixels
+        dtype: Float dtype for processing (None keeps float input precision)
+
+    Returns:
+        Enhanced image
+    """
+    if _clahe is None:
+        return _clahe_whole(image, clip_limit, kernel_size, dtype)
+    levels, float_dtype = _clahe_levels(image, clip_limit, kernel_size, tile_size, dtype)
+    out_range = (float(levels.min()), float(levels.max()))
+    return exposure.rescale_intensity(levels.astype(float_dtype), in_range=out_range)
+
+
+def preprocess_tiled(
+    image: ImageSource,
+    clahe_clip: float = 0.03,
+    clahe_kernel: int = 8,
+    blur_sigma: float = 1.0,
+    use_tophat: bool = False,
+    tophat_radius: int = 10,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    dtype=None,
+    roi: Optional[RoiLike] = None,
+    roi_margin: int = ROI_PREPROCESS_MARGIN,
+) -> np.ndarray:
+    """
+    Run the preprocessing pipeline tile by tile.
+
+    Produces the same result as ``preprocess_pipeline`` with the same
+    parameters, without whole-image CLAHE or filter temporaries. The
+    input may be an array or a LazyImage, in which case pixels are read
+    one tile at a time.
+
+    Args:
+        image: Input image (grayscale or RGB array, or LazyImage)
+        clahe_clip: CLAHE clip limit
+        clahe_kernel: CLAHE kernel size
+        blur_sigma: Gaussian blur sigma
+        use_tophat: Whether to apply top-hat transform
+        tophat_radius: Radius for top-hat transform
+        tile_size: Tile core size in pixels
+        dtype: Float dtype for processing (None keeps float input precision)
+        roi: Optional mask or (x, y) polygon (see core.roi), e.g. from
+            estimate_foreground_mask. As in preprocess_pipeline, only the
+            ROI's bounding box plus ``roi_margin`` pixels is processed, and
+            the result is zero outside that window; tiles outside it are
+            never read.
+        roi_margin: Context pixels kept around the ROI's bounding box (see
+            roi_preprocess_margin for detection)
+
+    Returns:
+        Preprocessed image
+    """
+    if roi is None:
+        return _preprocess_tiles(
+            image, clahe_clip, clahe_kernel, blur_sigma, use_tophat, tophat_radius,
+            tile_size, dtype,
+        )
+    shape = _image_shape(image)
+    window = roi_bounds(roi_mask(roi, shape), roi_margin)
+    if isinstance(image, LazyImage):
+        source = _LazyWindow(image, *window)
+    else:
+        source = image[window]
+    processed = _preprocess_tiles(
+        source, clahe_clip, clahe_kernel, blur_sigma, use_tophat, tophat_radius,
+        tile_size, dtype,
+    )
+    result = np.zeros(shape, dtype=processed.dtype)
+    result[window] = processed
+    return result
+
+
+def _preprocess_tiles(
+    image: ImageSource,
+    clahe_clip: float,
+    clahe_kernel: int,
+    blur_sigma: float,
+    use_tophat: bool,
+    tophat_radius: int,
+    tile_size: int,
+    dtype,
+) -> np.ndarray:
+    """Tiled preprocessing of a whole image source (see preprocess_tiled)."""
+    shape = _image_shape(image)
+    if _clahe is None:
+        # Already rescaled CLAHE output
+        levels = _clahe_whole(image, clahe_clip, clahe_kernel, dtype)
+        float_dtype, out_range = levels.dtype, None
+    else:
+        levels, float_dtype = _clahe_levels(image, clahe_clip, clahe_kernel, tile_size, dtype)
+        out_range = (float(levels.min()), float(levels.max()))
+
+    # Pass 2: output rescaling (global) and blur
+    result = np.empty(shape, dtype=float_dtype)
+    blur_halo = int(4.0 * blur_sigma + 0.5) + 1
+    for tile in plan_tiles(shape, tile_size, halo=blur_halo):
+        clahe = levels[tile.window]
+        if out_range is not None:
+            clahe = exposure.rescale_intensity(clahe.astype(float_dtype), in_range=out_range)
+        result[tile.core] = filters.gaussian(clahe, sigma=blur_sigma)[tile.inner]
+    del levels
+
+    if use_tophat:
+        tophat = np.empty_like(result)
+        for tile in plan_tiles(shape, tile_size, halo=2 * int(tophat_radius) + 1):
+            tophat[tile.core] = apply_tophat(result[tile.window], tophat_radius)[tile.inner]
+        result = tophat
+
+    # Final normalization to [0, 1] (in place, same arithmetic as normalize_image)
+    img_min, img_max = result.min(), result.max()
+    if img_max - img_min < 1e-10:
+        result[...] = 0
+        return result
+    result -= img_min
+    result /= img_max - img_min
+    return result
+
+
+def detect_blobs_log_tiled(
+    image: np.ndarray,
+    min_sigma: float = 2.0,
+    max_sigma: float = 15.0,
+    num_sigma: int = 10,
+    threshold: float = 0.1,
+    overlap: float = 0.5,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    scheduler: Optional[TileScheduler] = None,
+    backend: str = "direct",
+    mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Detect LoG blobs tile by tile.
+
+    Each tile builds the LoG scale space only for its window, so peak
+    memory is ``num_sigma`` times the window rather than the image.
+    Maxima are kept from tile cores only (halos never produce duplicates)
+    and overlap pruning runs once over all tiles, so the result matches
+    ``detect_blobs_log`` (exactly with the direct backend; with FFTs,
+    blobs whose responses tie exactly may come out in another order).
+
+    Args:
+        image: Preprocessed grayscale image (float, 0-1)
+        min_sigma: Minimum sigma for LoG
+        max_sigma: Maximum sigma for LoG
+        num_sigma: Number of sigma values to try
+        threshold: Detection threshold
+        overlap: Maximum overlap between blobs (0-1)
+        tile_size: Tile core size in pixels
+        scheduler: Runs tiles in parallel and records timings (None runs
+            them sequentially in-process)
+        backend: "direct" (default), "fft" or "auto" scale-space filtering, resolved
+            for the whole image so every tile filters the same way
+        mask: Optional boolean ROI; tiles whose core holds no ROI pixel
+            are skipped
+
+    Returns:
+        Array of shape (n, 3) with columns [y, x, sigma]
+    """
+    image = img_as_float(image)
+    backend = resolve_scale_space_backend(backend, image.shape, max_sigma)
+    sigma_list = _log_sigma_list(min_sigma, max_sigma, num_sigma, image.dtype)
+    if scheduler is None:
+        scheduler = TileScheduler(workers=1)
+
+    tiles = plan_tiles(image.shape, tile_size, halo=detection_halo(max_sigma))
+    if mask is not None:
+        tiles = [tile for tile in tiles if mask[tile.core].any()]
+        if not tiles:
+            return np.empty((0, 3))
+    results = scheduler.map_tiles(image, tiles, _detect_tile, sigma_list, threshold, backend)
+
+    coords, intensities = [], []
+    for tile, (tile_coords, tile_values) in zip(tiles, results):
+        tile_coords[:, :2] += tile.origin
+        coords.append(tile_coords)
+        intensities.append(tile_values)
+
+    return _assemble_log_blobs(
+        np.concatenate(coords),
+        np.concatenate(intensities),
+        sigma_list,
+        overlap,
+        exact_sigmas=np.linspace(min_sigma, max_sigma, num_sigma),
+    )
+
+
+def _detect_tile(
+    window: np.ndarray,
+    inner: Tuple[slice, slice],
+    sigma_list: np.ndarray,
+    threshold: float,
+    backend: str = "direct",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    LoG maxima of one tile that fall inside its core.
+
+    Args:
+        window: Halo-padded tile pixels
+        inner: Core in window coordinates
+        sigma_list: Sigma grid
+        threshold: Detection threshold
+        backend: "direct" or "fft" scale-space filtering
+
+    Returns:
+        Tuple of (coordinates [y, x, sigma_index] in window coordinates,
+        intensities)
+    """
+    coords, values = _cube_local_maxima(
+        _log_scale_space(window, sigma_list, backend), threshold
+    )
+    rows, cols = inner
+    keep = (
+        (coords[:, 0] >= rows.start) & (coords[:, 0] < rows.stop)
+        & (coords[:, 1] >= cols.start) & (coords[:, 1] < cols.stop)
+    )
+    return coords[keep], values[keep]
@@ -468,6 +468,8 @@ def extract():
             neighbor_graph=data.get('neighbor_graph', 'delaunay'),
             cull_long_edges=data.get('cull_long_edges', True),
             cull_factor=float(data.get('cull_factor', 1.8)),
+            profile=bool(data.get('profile', False)),
+            profile_memory=bool(data.get('profile_memory', False)),
         )
 
         # Store extraction results
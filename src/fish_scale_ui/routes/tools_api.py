@@ -767,7 +767,7 @@ def load_image():
     from fish_scale_ui.services.logging import log_event
     from fish_scale_ui.services.recent_images import add_recent_image, init_recent_images
     from fish_scale_ui.routes.api import convert_to_web_format
-    from PIL import Image
+    from fish_scale_analysis.core.lazy_image import read_image_shape
     import shutil
     import uuid
 
@@ -804,9 +804,7 @@ def load_image():
 
         if already_loaded:
             # Image already loaded, just return current state
-            web_path = Path(_current_image['web_path'])
-            with Image.open(web_path) as img:
-                width, height = img.size
+            height, width = read_image_shape(_current_image['web_path'])
 
             log_event('tools_image_already_loaded', {
                 'filename': image_path.name,
@@ -833,8 +831,8 @@ def load_image():
         web_path = convert_to_web_format(save_path, save_path)
         web_name = web_path.name
 
-        with Image.open(web_path) as img:
-            width, height = img.size
+        # Header-only read of the file extraction processes
+        height, width = read_image_shape(web_path)
 
         # Update state
         _current_image['path'] = str(save_path)
@@ -7,8 +7,14 @@ import numpy as np
 from PIL import Image
 
 from fish_scale_analysis.models import CalibrationData, Tubercle, NeighborEdge
-from fish_scale_analysis.core.preprocessing import load_image, preprocess_pipeline
+from fish_scale_analysis.core.preprocessing import (
+    DEFAULT_ANALYSIS_DTYPE,
+    load_image,
+    preprocess_pipeline,
+    preprocess_staged,
+)
 from fish_scale_analysis.core.detection import detect_tubercles
+from fish_scale_analysis.core.profiling import StageProfiler, profile_stage
 from fish_scale_analysis.core.measurement import (
     build_neighbor_graph,
     find_boundary_nodes,
@@ -38,6 +44,9 @@ def run_extraction(
     refine_ellipse: bool = True,
     cull_long_edges: bool = True,
     cull_factor: float = 1.8,
+    dtype=DEFAULT_ANALYSIS_DTYPE,
+    profile: bool = False,
+    profile_memory: bool = False,
 ) -> dict:
     """
     Run tubercle extraction on an image.
@@ -45,7 +54,7 @@ def run_extraction(
     Args:
         image_path: Path to the image file
         um_per_px: Calibration in micrometers per pixel
-        method: Detection method (log, dog, ellipse, lattice)
+        method: Detection method (log, dog, pyramid, template, ellipse, lattice)
         threshold: Detection threshold
         min_diameter_um: Minimum tubercle diameter
         max_diameter_um: Maximum tubercle diameter
@@ -58,10 +67,18 @@ def run_extraction(
         refine_ellipse: Whether to fit ellipses for more accurate measurements
         cull_long_edges: Whether to remove edges longer than cull_factor * average
         cull_factor: Factor for edge length culling (e.g., 1.8 = remove edges > 1.8x average)
+        dtype: Float dtype used for preprocessing and detection
+        profile: Time each stage and return the profile under 'profile'
+        profile_memory: Also record each stage's tracemalloc peak (implies
+            profile)
 
     Returns:
         Dictionary with extraction results
     """
+    profiler = None
+    if profile or profile_memory:
+        profiler = StageProfiler(track_memory=profile_memory)
+
     # Create calibration data
     calibration = CalibrationData(
         um_per_pixel=um_per_px,
@@ -70,14 +87,19 @@ def run_extraction(
         method="manual"
     )
 
-    # Load and preprocess image
-    image = load_image(Path(image_path))
-    preprocessed, _ = preprocess_pipeline(
-        image,
-        clahe_clip=clahe_clip,
-        clahe_kernel=clahe_kernel,
-        blur_sigma=blur_sigma,
-    )
+    # Load and preprocess image (preprocessing is memoized across calls, so
+    # optimizer trials that only change detection parameters skip it)
+    with profile_stage(profiler, "load"):
+        image = load_image(Path(image_path), dtype=dtype)
+    with profile_stage(profiler, "preprocess"):
+        staged = preprocess_staged(
+            image,
+            clahe_clip=clahe_clip,
+            clahe_kernel=clahe_kernel,
+            blur_sigma=blur_sigma,
+            profiler=profiler,
+        )
+    preprocessed = staged.result
 
     # Detect tubercles
     tubercles = detect_tubercles(
@@ -90,21 +112,23 @@ def run_extraction(
         edge_margin_px=edge_margin_px,
         method=method,
         refine_ellipse=refine_ellipse,
+        profiler=profiler,
     )
 
     # Build neighbor graph and get edges
-    triangulation = build_neighbor_graph(tubercles)
-    edges = []
-    boundary_indices = set()
-    if triangulation is not None:
-        edges = get_neighbor_edges(
-            tubercles,
-            triangulation,
-            calibration,
-            graph_type=neighbor_graph,
-        )
-        # Find boundary nodes using Delaunay triangulation
-        boundary_indices = find_boundary_nodes(triangulation)
+    with profile_stage(profiler, "neighbor_graph"):
+        triangulation = build_neighbor_graph(tubercles)
+        edges = []
+        boundary_indices = set()
+        if triangulation is not None:
+            edges = get_neighbor_edges(
+                tubercles,
+                triangulation,
+                calibration,
+                graph_type=neighbor_graph,
+            )
+            # Find boundary nodes using Delaunay triangulation
+            boundary_indices = find_boundary_nodes(triangulation)
 
     # Measure statistics
     diameters, mean_diam, std_diam = measure_diameters(tubercles)
@@ -180,7 +204,7 @@ def run_extraction(
                 'edge_distance_um': e.edge_distance_um,
             })
 
-    return {
+    result = {
         'success': True,
         'tubercles': tubercles_data,
         'edges': edges_data,
@@ -214,8 +238,15 @@ def run_extraction(
             'clahe_kernel': clahe_kernel,
             'blur_sigma': blur_sigma,
             'neighbor_graph': neighbor_graph,
-        }
+        },
+        'preprocessing': {
+            # Stages not listed were served from the stage cache
+            'recomputed_stages': staged.recomputed,
+        },
     }
+    if profiler is not None:
+        result['profile'] = profiler.summary()
+    return result
 
 
 def get_profiles_list() -> list:
@@ -251,6 +282,7 @@ def analyze_point_for_tubercle(
     clahe_kernel: int = 8,
     blur_sigma: float = 1.0,
     region_factor: float = 6.0,
+    dtype=DEFAULT_ANALYSIS_DTYPE,
 ) -> dict:
     """
     Analyze a point in the image to detect if there's a tubercle there.
@@ -263,7 +295,7 @@ def analyze_point_for_tubercle(
         x: X coordinate of the click point (in pixels)
         y: Y coordinate of the click point (in pixels)
         um_per_px: Calibration in micrometers per pixel
-        method: Detection method (log, dog, ellipse, lattice)
+        method: Detection method (log, dog, pyramid, template, ellipse, lattice)
         threshold: Detection threshold
         min_diameter_um: Minimum tubercle diameter in micrometers
         max_diameter_um: Maximum tubercle diameter in micrometers
@@ -271,6 +303,8 @@ def analyze_point_for_tubercle(
         clahe_clip: CLAHE clip limit
         clahe_kernel: CLAHE kernel size
         blur_sigma: Gaussian blur sigma
+        region_factor: Region size as a multiple of max_diameter
+        dtype: Float dtype used for preprocessing and detection
 
     Returns:
         Dictionary with detection results:
@@ -289,7 +323,7 @@ def analyze_point_for_tubercle(
     region_size = max(min_size, min(max_size, region_size))
 
     # Load image
-    image = load_image(Path(image_path))
+    image = load_image(Path(image_path), dtype=dtype)
     h, w = image.shape[:2]
 
     # Calculate region bounds (centered on click point)
@@ -306,6 +340,7 @@ def analyze_point_for_tubercle(
         clahe_clip=clahe_clip,
         clahe_kernel=clahe_kernel,
         blur_sigma=blur_sigma,
+        keep_intermediates=False,
     )
 
     # Create local calibration for the region
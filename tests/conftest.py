@@ -90,11 +90,12 @@ def expected_test_cases():
 def flask_app(tmp_path):
     """Create Flask app with test config."""
     from fish_scale_ui.app import create_app
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['APP_ROOT'] = tmp_path
-    app.config['UPLOAD_FOLDER'] = tmp_path / 'uploads'
-    app.config['UPLOAD_FOLDER'].mkdir(exist_ok=True)
+    # APP_ROOT must be set before create_app starts the session log there
+    app = create_app(config={
+        'TESTING': True,
+        'APP_ROOT': tmp_path,
+        'UPLOAD_FOLDER': tmp_path / 'uploads',
+    })
     return app
 
 
@@ -0,0 +1,78 @@
+"""Tests for overlap pruning against skimage's private implementation."""
+
+import numpy as np
+import pytest
+
+from fish_scale_analysis.core.blob_pruning import blob_overlap, prune_blobs
+
+skimage_blob = pytest.importorskip("skimage.feature.blob")
+if not hasattr(skimage_blob, "_prune_blobs") or not hasattr(skimage_blob, "_blob_overlap"):
+    pytest.skip("skimage has no private pruning helpers to compare against", allow_module_level=True)
+
+
+def _random_blobs(rng, n, extent, sigmas, dtype=np.float64):
+    """Blobs on integer pixels with sigmas from a grid, like LoG maxima."""
+    return np.column_stack([
+        rng.integers(0, extent, size=(n, 2)),
+        rng.choice(sigmas, size=n),
+    ]).astype(dtype)
+
+
+class TestBlobOverlap:
+    """Tests for the scalar overlap fraction."""
+
+    def test_matches_skimage(self):
+        """The overlap fraction equals skimage's, bit for bit."""
+        rng = np.random.default_rng(5)
+        blobs = np.column_stack([
+            rng.uniform(0, 30, size=(400, 2)),
+            rng.choice([0.0, 2.0, 3.5, 5.0], size=400),
+        ])
+        for b1, b2 in zip(blobs[::2], blobs[1::2]):
+            assert blob_overlap(b1, b2) == skimage_blob._blob_overlap(b1, b2, sigma_dim=1)
+
+
+class TestPruneBlobs:
+    """prune_blobs reproduces skimage's _prune_blobs."""
+
+    @pytest.mark.parametrize("overlap", [0.0, 0.3, 0.5, 1.0])
+    @pytest.mark.parametrize("n, extent", [(50, 200), (300, 100), (600, 80)])
+    @pytest.mark.parametrize("dtype", [np.float64, np.float32])
+    def test_matches_skimage(self, overlap, n, extent, dtype):
+        """Survivors and the in-place zeroed sigmas match for sparse and dense blobs."""
+        rng = np.random.default_rng(n + extent)
+        blobs = _random_blobs(rng, n, extent, np.linspace(2, 10, 10), dtype)
+        expected_input = blobs.copy()
+
+        expected = skimage_blob._prune_blobs(expected_input, overlap, sigma_dim=1)
+        result = prune_blobs(blobs, overlap)
+
+        np.testing.assert_array_equal(result, expected)
+        np.testing.assert_array_equal(blobs, expected_input)
+
+    def test_equal_sigmas_and_borderline_pairs(self):
+        """Ties in sigma and overlaps at the limit are decided as in skimage."""
+        sigma = 4.0
+        # Equal disks of radius sqrt(2) * sigma overlapping by exactly half
+        # at a distance found by bisection, plus near misses on either side
+        lo, hi = 0.0, 2 * np.sqrt(2) * sigma
+        for _ in range(200):
+            mid = (lo + hi) / 2
+            if blob_overlap(np.array([0, 0, sigma]), np.array([0, mid, sigma])) > 0.5:
+                lo = mid
+            else:
+                hi = mid
+        rows = []
+        for k, dx in enumerate((lo, hi, np.nextafter(lo, 0), np.nextafter(hi, 100))):
+            rows += [[40.0 * k, 0.0, sigma], [40.0 * k, dx, sigma]]
+        blobs = np.array(rows)
+        expected_input = blobs.copy()
+
+        expected = skimage_blob._prune_blobs(expected_input, 0.5, sigma_dim=1)
+        np.testing.assert_array_equal(prune_blobs(blobs, 0.5), expected)
+        np.testing.assert_array_equal(blobs, expected_input)
+
+    def test_no_pairs(self):
+        """Isolated blobs are returned unchanged."""
+        blobs = np.array([[0.0, 0.0, 2.0], [100.0, 100.0, 2.0]])
+        np.testing.assert_array_equal(prune_blobs(blobs.copy(), 0.5), blobs)
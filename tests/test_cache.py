@@ -0,0 +1,118 @@
+"""Tests for the shared cache module."""
+
+import threading
+
+import numpy as np
+import pytest
+from fish_scale_analysis.core.cache import ByteLRUCache, image_digest
+
+
+class TestImageDigest:
+    """Tests for image content hashing."""
+
+    def test_same_content_same_digest(self):
+        """Test that equal arrays hash identically."""
+        a = np.random.rand(50, 60)
+        assert image_digest(a) == image_digest(a.copy())
+
+    def test_content_changes_digest(self):
+        """Test that a single changed pixel changes the digest."""
+        a = np.random.rand(50, 60)
+        b = a.copy()
+        b[10, 10] += 1e-6
+        assert image_digest(a) != image_digest(b)
+
+    def test_shape_and_dtype_in_digest(self):
+        """Test that shape and dtype are part of the digest."""
+        a = np.zeros((20, 30))
+        assert image_digest(a) != image_digest(a.reshape(30, 20))
+        assert image_digest(a) != image_digest(a.astype(np.float32))
+
+    def test_non_contiguous_input(self):
+        """Test hashing of strided views."""
+        a = np.random.rand(40, 40)
+        assert image_digest(a[:, ::2]) == image_digest(np.ascontiguousarray(a[:, ::2]))
+
+
+class TestByteLRUCache:
+    """Tests for the byte-bounded LRU cache."""
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted."""
+        cache = ByteLRUCache(max_bytes=10_000)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return np.zeros(100)
+
+        cache.get_or_compute("a", compute)
+        cache.get_or_compute("a", compute)
+
+        stats = cache.stats()
+        assert len(calls) == 1
+        assert stats.hits == 1
+        assert stats.misses == 1
+        assert stats.size_bytes == 800
+
+    def test_eviction_by_bytes(self):
+        """Test that least-recently-used entries are evicted when over budget."""
+        cache = ByteLRUCache(max_bytes=2000)
+        cache.put("a", np.zeros(100))  # 800 bytes
+        cache.put("b", np.zeros(100))
+        cache.get("a")  # Make "a" most recently used
+        cache.put("c", np.zeros(100))
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats().evictions == 1
+
+    def test_oversized_value_not_stored(self):
+        """Test that values larger than the budget bypass the cache."""
+        cache = ByteLRUCache(max_bytes=100)
+        value = cache.get_or_compute("big", lambda: np.zeros(1000))
+        assert value.shape == (1000,)
+        assert len(cache) == 0
+
+    def test_cached_arrays_read_only(self):
+        """Test that cached arrays cannot be modified in place."""
+        cache = ByteLRUCache(max_bytes=10_000)
+        value = cache.get_or_compute("a", lambda: np.zeros(10))
+        with pytest.raises(ValueError):
+            value[0] = 1.0
+
+    def test_concurrent_misses_compute_once(self):
+        """Test that parallel misses on one key share a single computation."""
+        cache = ByteLRUCache(max_bytes=10_000)
+        calls = []
+        start = threading.Barrier(4)
+
+        def compute():
+            calls.append(1)
+            return np.ones(10)
+
+        def worker():
+            start.wait()
+            cache.get_or_compute("k", compute)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert cache.stats().hits == 3
+
+    def test_clear(self):
+        """Test that clear drops entries and counters."""
+        cache = ByteLRUCache(max_bytes=10_000)
+        cache.put("a", np.zeros(10))
+        cache.get("a")
+        cache.clear()
+
+        stats = cache.stats()
+        assert stats.n_entries == 0
+        assert stats.hits == 0
+        assert stats.size_bytes == 0
@@ -2,14 +2,33 @@
 
 import numpy as np
 import pytest
+from scipy import ndimage
+from fish_scale_analysis.core import detection
 from fish_scale_analysis.core.calibration import calibrate_manual
 from fish_scale_analysis.core.detection import (
+    FFT_MIN_PIXELS,
+    FFT_MIN_SIGMA,
+    blobs_to_tubercles,
     detect_blobs_log,
     detect_blobs_dog,
+    detect_blobs_pyramid,
+    detect_blobs_template,
     filter_by_size,
     filter_by_edge_distance,
     detect_tubercles,
+    BlobCatalogue,
+    LogScaleSpace,
+    calculate_circularities,
+    calculate_circularity,
+    fit_ellipse_to_blob,
+    fit_ellipses_to_blobs,
+    get_blob_catalogue,
+    get_log_cache,
+    gaussian_blob_template,
+    get_log_scale_space,
+    resolve_scale_space_backend,
 )
+from skimage.feature import blob_log
 
 
 @pytest.fixture
@@ -145,6 +164,117 @@ class TestEdgeFiltering:
         assert filtered[0, 1] == 100  # x
 
 
+class TestBatchCircularity:
+    """Tests for batched circularity."""
+
+    def test_matches_per_blob(self, image_with_blobs):
+        """Batched values match calculate_circularity on each blob."""
+        image, blob_params = image_with_blobs
+        centers = np.array([(cy, cx) for cx, cy, _ in blob_params], dtype=float)
+        radii = np.array([r for _, _, r in blob_params], dtype=float)
+
+        expected = [calculate_circularity(image, tuple(c), r) for c, r in zip(centers, radii)]
+        np.testing.assert_allclose(
+            calculate_circularities(image, centers, radii), expected, rtol=0, atol=1e-12
+        )
+
+    @pytest.mark.parametrize("smoothing", [0, 2])
+    def test_matches_per_blob_on_noise(self, smoothing):
+        """Cluttered windows and edge-clipped windows also match."""
+        rng = np.random.default_rng(smoothing)
+        image = rng.random((120, 150))
+        if smoothing:
+            image = ndimage.gaussian_filter(image, smoothing)
+        centers = rng.uniform(-5, 155, size=(300, 2))
+        radii = rng.uniform(1, 12, size=300)
+
+        expected = [calculate_circularity(image, tuple(c), r) for c, r in zip(centers, radii)]
+        np.testing.assert_allclose(
+            calculate_circularities(image, centers, radii), expected, rtol=0, atol=1e-12
+        )
+
+    def test_empty(self, image_with_blobs):
+        """No blobs give an empty result."""
+        image, _ = image_with_blobs
+        assert calculate_circularities(image, np.empty((0, 2)), np.empty(0)).shape == (0,)
+
+
+class TestBatchEllipseFitting:
+    """Tests for batched ellipse fitting."""
+
+    def _assert_fits_match(self, expected, result):
+        assert [fit is None for fit in result] == [fit is None for fit in expected]
+        for a, b in zip(expected, result):
+            if a is None:
+                continue
+            assert b["area"] == a["area"]
+            assert b["centroid"] == pytest.approx(a["centroid"], abs=1e-12)
+            for key in ("major_axis", "minor_axis", "orientation", "eccentricity"):
+                assert b[key] == pytest.approx(a[key], abs=1e-12)
+
+    def test_matches_per_blob(self, image_with_blobs):
+        """Batched fits match fit_ellipse_to_blob on each blob."""
+        image, blob_params = image_with_blobs
+        centers = np.array([(cy, cx) for cx, cy, _ in blob_params], dtype=float)
+        radii = np.array([r for _, _, r in blob_params], dtype=float)
+
+        expected = [fit_ellipse_to_blob(image, tuple(c), r) for c, r in zip(centers, radii)]
+        result = fit_ellipses_to_blobs(image, centers, radii)
+
+        assert all(fit is not None for fit in result)
+        self._assert_fits_match(expected, result)
+
+    def test_matches_per_blob_on_noise(self):
+        """Rejections (distance, size, eccentricity) match too."""
+        rng = np.random.default_rng(3)
+        image = ndimage.gaussian_filter(rng.random((150, 150)), 2)
+        centers = rng.uniform(-5, 155, size=(300, 2))
+        radii = rng.uniform(2, 12, size=300)
+
+        expected = [
+            fit_ellipse_to_blob(image, tuple(c), r, max_eccentricity=0.8)
+            for c, r in zip(centers, radii)
+        ]
+        result = fit_ellipses_to_blobs(image, centers, radii, max_eccentricity=0.8)
+
+        assert any(fit is None for fit in result)
+        assert any(fit is not None for fit in result)
+        self._assert_fits_match(expected, result)
+
+
+class TestThreadedRefinement:
+    """Tests for thread-parallel blob refinement."""
+
+    @pytest.mark.parametrize("workers,chunk_size", [(2, None), (3, 7), (4, 1)])
+    @pytest.mark.parametrize("refine_ellipse", [False, True])
+    def test_matches_sequential(self, simple_calibration, workers, chunk_size, refine_ellipse):
+        """Threaded refinement gives the same tubercles in the same order."""
+        rng = np.random.default_rng(5)
+        image = ndimage.gaussian_filter(rng.random((150, 150)), 2)
+        blobs = np.column_stack([
+            rng.uniform(10, 140, size=(60, 2)), rng.uniform(2, 6, size=60)
+        ])
+        kwargs = dict(min_circularity=0.0, refine_ellipse=refine_ellipse)
+
+        expected = blobs_to_tubercles(blobs, image, simple_calibration, **kwargs)
+        result = blobs_to_tubercles(
+            blobs, image, simple_calibration,
+            workers=workers, chunk_size=chunk_size, **kwargs,
+        )
+
+        assert len(expected) > 0
+        assert result == expected
+
+    def test_invalid_controls(self, image_with_blobs, simple_calibration):
+        """Worker count and chunk size must be positive."""
+        image, _ = image_with_blobs
+        blobs = np.array([[50.0, 50.0, 5.0]])
+        with pytest.raises(ValueError):
+            blobs_to_tubercles(blobs, image, simple_calibration, workers=0)
+        with pytest.raises(ValueError):
+            blobs_to_tubercles(blobs, image, simple_calibration, chunk_size=0)
+
+
 class TestTubercleDetection:
     """Tests for complete tubercle detection."""
 
@@ -200,3 +330,327 @@ class TestTubercleDetection:
         )
 
         assert len(tubercles) == 0
+
+
+class TestFloat32Mode:
+    """Tests for detection on float32 images."""
+
+    def test_blob_sigmas_are_exact(self, image_with_blobs):
+        """float32 input yields the same float64 sigmas as float64 input."""
+        image, _ = image_with_blobs
+
+        blobs64 = detect_blobs_log(image, min_sigma=2, max_sigma=10, threshold=0.1)
+        blobs32 = detect_blobs_log(
+            image.astype(np.float32), min_sigma=2, max_sigma=10, threshold=0.1
+        )
+
+        assert blobs32.dtype == np.float64
+        np.testing.assert_array_equal(blobs32[:, 2], blobs64[:, 2])
+
+    def test_matches_float64(self, image_with_blobs, simple_calibration):
+        """float32 detection matches float64 detection."""
+        image, _ = image_with_blobs
+        kwargs = dict(min_diameter_um=5.0, max_diameter_um=30.0, threshold=0.1)
+
+        t64 = detect_tubercles(image, simple_calibration, **kwargs)
+        t32 = detect_tubercles(image, simple_calibration, dtype=np.float32, **kwargs)
+
+        assert len(t32) == len(t64)
+        d64 = sorted(t.diameter_um for t in t64)
+        d32 = sorted(t.diameter_um for t in t32)
+        np.testing.assert_allclose(d32, d64, rtol=1e-3)
+
+
+class TestLogScaleSpace:
+    """Tests for the reusable LoG scale space."""
+
+    @pytest.mark.parametrize("threshold", [0.02, 0.1, 0.3])
+    def test_matches_blob_log(self, image_with_blobs, threshold):
+        """Blobs at any threshold match skimage's blob_log."""
+        image, _ = image_with_blobs
+        space = LogScaleSpace(image, min_sigma=2, max_sigma=10)
+
+        expected = blob_log(image, min_sigma=2, max_sigma=10, threshold=threshold)
+        np.testing.assert_allclose(space.blobs(threshold), expected)
+
+    def test_candidates_sorted_by_response(self, image_with_blobs):
+        """Candidates are strongest first, so thresholds select a prefix."""
+        image, _ = image_with_blobs
+        space = LogScaleSpace(image, min_sigma=2, max_sigma=10)
+
+        assert np.all(np.diff(space.responses) <= 0)
+        assert space.n_candidates(0.1) >= space.n_candidates(0.2)
+
+    def test_keeps_only_candidates(self, image_with_blobs):
+        """The LoG stack is dropped; the cache is charged for candidates only."""
+        image, _ = image_with_blobs
+        space = LogScaleSpace(image, min_sigma=2, max_sigma=10)
+
+        assert not hasattr(space, "cube")
+        assert space.nbytes == space.coords.nbytes + space.responses.nbytes
+        assert space.nbytes < image.nbytes
+
+    def test_threshold_below_floor_rejected(self, image_with_blobs):
+        """Thresholds under min_threshold cannot be served."""
+        image, _ = image_with_blobs
+        space = LogScaleSpace(image, min_sigma=2, max_sigma=10, min_threshold=0.05)
+
+        with pytest.raises(ValueError):
+            space.blobs(0.01)
+
+    def test_threshold_sweep_hits_cache(self, image_with_blobs):
+        """Repeated detections on one image reuse the scale space."""
+        image, _ = image_with_blobs
+        cache = get_log_cache()
+        cache.clear()
+
+        first = get_log_scale_space(image, min_sigma=2, max_sigma=10)
+        for threshold in (0.05, 0.1, 0.2):
+            detect_blobs_log(image, min_sigma=2, max_sigma=10, threshold=threshold)
+
+        assert get_log_scale_space(image, min_sigma=2, max_sigma=10) is first
+        assert cache.stats().misses == 1
+        assert cache.stats().hits == 4
+
+
+class TestFFTScaleSpace:
+    """Tests for the FFT scale-space backend."""
+
+    @staticmethod
+    def _sorted(blobs):
+        return blobs[np.lexsort(blobs.T[::-1])]
+
+    def test_log_cube_matches_direct(self, image_with_blobs):
+        """FFT and spatial LoG stacks agree to rounding."""
+        image, _ = image_with_blobs
+        sigma_list = detection._log_sigma_list(2, 10, 10, image.dtype)
+        direct = detection._log_scale_space(image, sigma_list, backend="direct")
+        fft = detection._log_scale_space(image, sigma_list, backend="fft")
+
+        assert LogScaleSpace(image, min_sigma=2, max_sigma=10, backend="fft").backend == "fft"
+        np.testing.assert_allclose(fft, direct, rtol=0, atol=1e-12)
+
+    @pytest.mark.parametrize("threshold", [0.02, 0.05, 0.2])
+    def test_log_blobs_match_direct(self, image_with_blobs, threshold):
+        """detect_blobs_log finds the same blobs with either backend."""
+        image, _ = image_with_blobs
+        kwargs = dict(min_sigma=2, max_sigma=10, threshold=threshold)
+
+        expected = detect_blobs_log(image, backend="direct", **kwargs)
+        result = detect_blobs_log(image, backend="fft", **kwargs)
+
+        assert len(expected) > 0
+        np.testing.assert_array_equal(self._sorted(result), self._sorted(expected))
+
+    def test_negative_threshold(self):
+        """Thresholds below the cached floor work with FFTs too."""
+        image = ndimage.gaussian_filter(np.random.default_rng(2).random((120, 120)), 1)
+        kwargs = dict(min_sigma=2, max_sigma=8, threshold=-0.001)
+
+        expected = detect_blobs_log(image, backend="direct", **kwargs)
+        result = detect_blobs_log(image, backend="fft", **kwargs)
+
+        assert len(expected) > 0
+        np.testing.assert_array_equal(self._sorted(result), self._sorted(expected))
+
+    @pytest.mark.parametrize("dtype", [np.float64, np.float32])
+    def test_dog_blobs_match_direct(self, image_with_blobs, dtype):
+        """detect_blobs_dog finds the same blobs as blob_dog."""
+        image, _ = image_with_blobs
+        image = image.astype(dtype)
+        kwargs = dict(min_sigma=2, max_sigma=10, threshold=0.05)
+
+        expected = detect_blobs_dog(image, backend="direct", **kwargs)
+        result = detect_blobs_dog(image, backend="fft", **kwargs)
+
+        assert len(expected) > 0
+        np.testing.assert_array_equal(self._sorted(result), self._sorted(expected))
+
+    def test_auto_crossover(self):
+        """auto switches to FFTs for large sigmas on large enough images."""
+        side = int(np.ceil(np.sqrt(FFT_MIN_PIXELS)))
+        assert resolve_scale_space_backend("auto", (side, side), FFT_MIN_SIGMA) == "fft"
+        assert resolve_scale_space_backend("auto", (side, side), FFT_MIN_SIGMA / 2) == "direct"
+        assert resolve_scale_space_backend("auto", (8, 8), FFT_MIN_SIGMA * 4) == "direct"
+        assert resolve_scale_space_backend("direct", (side, side), 100.0) == "direct"
+
+    def test_unknown_backend_rejected(self, image_with_blobs):
+        """Backends are validated."""
+        image, _ = image_with_blobs
+        with pytest.raises(ValueError):
+            detect_blobs_log(image, backend="gpu")
+
+
+class TestPyramidDetection:
+    """Tests for coarse-to-fine pyramid detection."""
+
+    @pytest.mark.parametrize("downscale", [1, 2, 3, 4])
+    def test_matches_detect_blobs_log(self, synthetic_tubercle_image, downscale):
+        """Refined blobs land exactly on the full-resolution LoG maxima."""
+        image, _, _ = synthetic_tubercle_image
+        kwargs = dict(min_sigma=3, max_sigma=10, threshold=0.05)
+
+        expected = detect_blobs_log(image, **kwargs)
+        result = detect_blobs_pyramid(image, downscale=downscale, **kwargs)
+
+        assert len(expected) > 0
+        np.testing.assert_array_equal(
+            result[np.lexsort(result.T[::-1])], expected[np.lexsort(expected.T[::-1])]
+        )
+
+    def test_detect_tubercles_method(self, synthetic_tubercle_image):
+        """method="pyramid" finds the LoG tubercles."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        kwargs = dict(min_diameter_um=10.0, max_diameter_um=30.0, threshold=0.05)
+
+        expected = detect_tubercles(image, calibration, **kwargs)
+        result = detect_tubercles(
+            image, calibration, method="pyramid", pyramid_downscale=3, **kwargs
+        )
+
+        assert len(expected) > 0
+        assert sorted(t.centroid for t in result) == sorted(t.centroid for t in expected)
+
+    def test_blank_image(self):
+        """No candidates gives an empty result."""
+        assert detect_blobs_pyramid(np.zeros((64, 64))).shape == (0, 3)
+
+    def test_invalid_downscale(self, image_with_blobs):
+        """The downsampling factor must be positive."""
+        image, _ = image_with_blobs
+        with pytest.raises(ValueError):
+            detect_blobs_pyramid(image, downscale=0)
+
+
+class TestTemplateDetection:
+    """Tests for normalized cross-correlation template detection."""
+
+    @pytest.mark.parametrize("learn_template", [True, False])
+    def test_finds_lattice(self, synthetic_tubercle_image, learn_template):
+        """Every tubercle of the grid is found at its center."""
+        image, positions, _ = synthetic_tubercle_image
+        blobs = detect_blobs_template(
+            image, min_sigma=3, max_sigma=10, learn_template=learn_template
+        )
+
+        assert len(blobs) == len(positions)
+        found = sorted(map(tuple, blobs[:, :2].astype(int)))
+        assert found == sorted((y, x) for x, y in positions)
+
+    def test_sigma_from_log_scale(self, synthetic_tubercle_image):
+        """Each match gets the LoG scale detect_blobs_log assigns it."""
+        image, _, _ = synthetic_tubercle_image
+        expected = detect_blobs_log(image, min_sigma=3, max_sigma=10, threshold=0.05)
+        blobs = detect_blobs_template(image, min_sigma=3, max_sigma=10)
+
+        lookup = {(y, x): s for y, x, s in expected}
+        for y, x, sigma in blobs:
+            assert sigma == pytest.approx(lookup[(y, x)])
+
+    def test_flat_background_ignored(self, image_with_blobs):
+        """Only the blobs match, even at a low score; flat windows never do."""
+        image, blob_params = image_with_blobs
+        blobs = detect_blobs_template(image, 3, 10, min_score=0.3, learn_template=False)
+
+        assert len(blobs) == len(blob_params)
+        assert detect_blobs_template(image, 3, 10, min_score=1.01).shape == (0, 3)
+
+    def test_template_shape(self):
+        """The synthetic template is centered and peaks at its middle."""
+        template = gaussian_blob_template(4.0)
+        assert template.shape == (19, 19)
+        assert template[9, 9] == template.max() == 1.0
+
+    def test_small_image(self):
+        """Images smaller than every template give no blobs."""
+        assert detect_blobs_template(np.zeros((8, 8)), 3, 10).shape == (0, 3)
+
+    def test_detect_tubercles_method(self, synthetic_tubercle_image):
+        """method="template" finds the same tubercles as LoG on a clean grid."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        kwargs = dict(min_diameter_um=10.0, max_diameter_um=30.0)
+
+        expected = detect_tubercles(image, calibration, threshold=0.05, **kwargs)
+        result = detect_tubercles(image, calibration, method="template", **kwargs)
+
+        assert len(expected) > 0
+        assert sorted(t.centroid for t in result) == sorted(t.centroid for t in expected)
+
+
+class TestBlobCatalogue:
+    """Tests for detect-once, filter-many blob queries."""
+
+    @pytest.mark.parametrize("params", [
+        dict(threshold=0.05, min_circularity=0.5),
+        dict(threshold=0.02, min_circularity=0.3, edge_margin_px=30),
+        dict(threshold=0.1, min_circularity=0.0, refine_ellipse=True),
+        dict(threshold=0.05, refine_ellipse=True, max_eccentricity=0.3),
+    ])
+    def test_query_matches_detect_tubercles(self, synthetic_tubercle_image, params):
+        """Queries return the same tubercles as a fresh detection."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        kwargs = dict(min_diameter_um=10.0, max_diameter_um=30.0)
+
+        catalogue = BlobCatalogue(image, calibration, **kwargs)
+        expected = detect_tubercles(image, calibration, **kwargs, **params)
+
+        result = catalogue.query(**params)
+        assert len(expected) > 0
+        assert result == expected
+        assert all(type(c) is float for t in result for c in t.centroid)
+
+    def test_narrower_diameter_query(self, synthetic_tubercle_image):
+        """Diameter bounds inside the build range filter the full-range detection."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        catalogue = BlobCatalogue(image, calibration, 10.0, 30.0)
+
+        expected = [
+            t for t in detect_tubercles(image, calibration, 10.0, 30.0)
+            if 12.0 <= t.diameter_um <= 20.0
+        ]
+        result = catalogue.query(min_diameter_um=12.0, max_diameter_um=20.0)
+        assert [t.centroid for t in result] == [t.centroid for t in expected]
+
+    def test_out_of_range_queries_rejected(self, synthetic_tubercle_image):
+        """Queries the catalogue cannot answer exactly raise ValueError."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        catalogue = BlobCatalogue(
+            image, calibration, 10.0, 30.0, min_threshold=0.05, fit_ellipses=False
+        )
+
+        with pytest.raises(ValueError):
+            catalogue.query(max_diameter_um=40.0)
+        with pytest.raises(ValueError):
+            catalogue.query(threshold=0.01)
+        with pytest.raises(ValueError):
+            catalogue.query(refine_ellipse=True)
+
+    def test_memory_is_bounded(self, synthetic_tubercle_image, monkeypatch):
+        """The catalogue holds no scale space, and its survivor masks are capped."""
+        monkeypatch.setattr(detection, "CATALOGUE_SURVIVOR_MASKS", 2)
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        catalogue = BlobCatalogue(image, calibration, 10.0, 30.0, fit_ellipses=False)
+
+        assert not any(isinstance(v, LogScaleSpace) for v in vars(catalogue).values())
+        # Each candidate response is a threshold with its own candidate count
+        thresholds = np.unique(catalogue.response)[:4]
+        for threshold in thresholds:
+            catalogue.query(threshold=threshold)
+        assert catalogue.query(threshold=thresholds[0]) == detect_tubercles(
+            image, calibration, 10.0, 30.0, threshold=thresholds[0]
+        )
+        assert len(catalogue._survivor_cache) <= 2
+        assert catalogue._survivor_cache.stats().evictions > 0
+        assert catalogue.nbytes < image.nbytes
+
+    def test_get_blob_catalogue_is_cached(self, image_with_blobs, simple_calibration):
+        """The same image and range return the same catalogue."""
+        image, _ = image_with_blobs
+        first = get_blob_catalogue(image, simple_calibration, 5.0, 30.0)
+        assert get_blob_catalogue(image, simple_calibration, 5.0, 30.0) is first
@@ -0,0 +1,40 @@
+"""Tests for FFT Gaussian filtering."""
+
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from fish_scale_analysis.core.fft_filters import fft_gaussian, fft_gaussian_laplace
+
+
+SIGMAS = [0.7, 2.0, 5.5, 16.0]
+
+
+@pytest.fixture
+def noise_image():
+    """Random image with a non power-of-two shape."""
+    return np.random.default_rng(0).random((90, 133))
+
+
+class TestFFTFilters:
+    """FFT filters agree with ndimage's spatial filters."""
+
+    def test_gaussian_matches_ndimage(self, noise_image):
+        """Gaussian blur at every scale, including 'reflect' borders."""
+        for sigma, result in zip(SIGMAS, fft_gaussian(noise_image, SIGMAS)):
+            expected = ndimage.gaussian_filter(noise_image, sigma)
+            np.testing.assert_allclose(result, expected, rtol=0, atol=1e-12)
+
+    def test_gaussian_laplace_matches_ndimage(self, noise_image):
+        """LoG response at every scale."""
+        for sigma, result in zip(SIGMAS, fft_gaussian_laplace(noise_image, SIGMAS)):
+            expected = ndimage.gaussian_laplace(noise_image, sigma)
+            np.testing.assert_allclose(result, expected, rtol=0, atol=1e-12)
+
+    def test_kernel_wider_than_image(self):
+        """Repeated reflection is handled when kernels exceed the image."""
+        image = np.random.default_rng(1).random((6, 9))
+        (result,) = fft_gaussian_laplace(image, [12.0])
+        np.testing.assert_allclose(
+            result, ndimage.gaussian_laplace(image, 12.0), rtol=0, atol=1e-12
+        )
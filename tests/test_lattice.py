@@ -0,0 +1,274 @@
+"""Tests for lattice-aware detection helpers."""
+
+import numpy as np
+import pytest
+
+from scipy.spatial.distance import cdist, pdist
+
+from fish_scale_analysis.core import lattice
+from fish_scale_analysis.core.calibration import calibrate_manual
+from fish_scale_analysis.core.lattice import (
+    LatticeModel,
+    LatticeParams,
+    SpatialHashGrid,
+    compute_circularities_fast,
+    compute_circularity_fast,
+    compute_local_contrast,
+    compute_local_contrasts,
+    detect_seeds,
+    detect_tubercles_lattice,
+    estimate_lattice_fft,
+    estimate_lattice_vectors,
+    lattice_deviations,
+    refine_detections,
+)
+
+
+def _hex_lattice_image(size=320, spacing=30):
+    """Noise-free hexagonal lattice of Gaussian tubercles."""
+    y, x = np.mgrid[:size, :size]
+    image = np.full((size, size), 0.1)
+    row_height = spacing * np.sqrt(3) / 2
+    for row in range(int(size / row_height) + 1):
+        for col in range(int(size / spacing) + 1):
+            cx = col * spacing + (spacing / 2 if row % 2 else 0)
+            cy = row * row_height
+            image += 0.8 * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * 4.0**2))
+    return np.clip(image, 0, 1)
+
+
+def _whole_image_contrast(image, position, radius):
+    """Reference contrast from whole-image distance masks."""
+    x, y = position
+    h, w = image.shape
+    inner_radius = max(1, radius * 0.7)
+    y_coords, x_coords = np.ogrid[:h, :w]
+    dist_sq = (x_coords - x) ** 2 + (y_coords - y) ** 2
+    inner = dist_sq <= inner_radius**2
+    annulus = (dist_sq > inner_radius**2) & (dist_sq <= (radius * 1.5) ** 2)
+    if inner.any() and annulus.any() and image[annulus].mean() > 1e-10:
+        return image[inner].mean() / image[annulus].mean()
+    return 1.0
+
+
+def _looped_circularity(image, position, radius):
+    """Reference radial-profile circularity sampled one point at a time."""
+    x, y = position
+    h, w = image.shape
+    intensities = []
+    for angle in np.linspace(0, 2 * np.pi, 16, endpoint=False):
+        sx = int(round(x + radius * 0.8 * np.cos(angle)))
+        sy = int(round(y + radius * 0.8 * np.sin(angle)))
+        if 0 <= sx < w and 0 <= sy < h:
+            intensities.append(image[sy, sx])
+    if len(intensities) < 8 or np.mean(intensities) <= 1e-10:
+        return 0.0
+    return max(0, 1 - np.std(intensities) / np.mean(intensities))
+
+
+class TestLocalContrast:
+    """Tests for batched inner/annulus contrast."""
+
+    def test_matches_whole_image_masks(self, sample_grayscale_image, monkeypatch):
+        """Batched contrasts match per-candidate masks, across chunks and radii."""
+        monkeypatch.setattr(lattice, "CONTRAST_BATCH_PIXELS", 1000)
+        rng = np.random.default_rng(0)
+        positions = rng.uniform(-5, 260, size=(40, 2))
+        positions[:10] = np.round(positions[:10])
+        radii = rng.choice([1.0, 4.5, 9.9], size=40)
+
+        result = compute_local_contrasts(sample_grayscale_image, positions, radii)
+        expected = [
+            _whole_image_contrast(sample_grayscale_image, p, r)
+            for p, r in zip(positions, radii)
+        ]
+        np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+    def test_single_position_wrapper(self, sample_grayscale_image):
+        """compute_local_contrast scores a bright blob against its surroundings."""
+        contrast = compute_local_contrast(sample_grayscale_image, (100, 100), 10)
+        assert contrast == pytest.approx(
+            _whole_image_contrast(sample_grayscale_image, (100, 100), 10)
+        )
+        assert contrast > 1.5
+
+    def test_empty_and_dark(self):
+        """No candidates give an empty array; a dark annulus gives 1.0."""
+        assert compute_local_contrasts(np.zeros((20, 20)), np.empty((0, 2)), 3.0).shape == (0,)
+        assert compute_local_contrasts(np.zeros((20, 20)), [(10, 10)], 3.0)[0] == 1.0
+
+
+class TestCircularityFast:
+    """Tests for batched radial-profile circularity."""
+
+    def test_matches_looped_sampling(self, sample_grayscale_image):
+        """Batched scores match sampling each candidate in turn, off-image ones included."""
+        rng = np.random.default_rng(1)
+        positions = rng.uniform(-10, 266, size=(50, 2))
+        radii = rng.uniform(1, 12, size=50)
+
+        result = compute_circularities_fast(sample_grayscale_image, positions, radii)
+        expected = [
+            _looped_circularity(sample_grayscale_image, p, r)
+            for p, r in zip(positions, radii)
+        ]
+        np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+
+    def test_scores(self, sample_grayscale_image):
+        """A uniform disk scores near 1; a mostly off-image candidate scores 0."""
+        assert compute_circularity_fast(sample_grayscale_image, (100, 100), 10) > 0.8
+        assert compute_circularity_fast(sample_grayscale_image, (-5, -5), 10) == 0.0
+
+
+class TestSpatialHashGrid:
+    """Tests for the proximity index used by propagation and refinement."""
+
+    def test_queries_match_brute_force(self):
+        """Radius queries agree with distances to every point, for any radius."""
+        rng = np.random.default_rng(2)
+        points = rng.uniform(-50, 150, size=(300, 2))
+        grid = SpatialHashGrid(7.0, points[:200])
+        for point in points[200:]:
+            grid.insert(point)
+        assert len(grid) == 300
+
+        for query in rng.uniform(-60, 160, size=(100, 2)):
+            dists = np.sqrt(((points - query) ** 2).sum(axis=1))
+            for radius in (3.0, 7.0, 20.0):
+                assert grid.count_within(query, radius) == np.sum(dists < radius)
+                assert grid.any_within(query, radius) == np.any(dists < radius)
+
+    def test_strict_radius(self):
+        """A point exactly at the query radius is not within it."""
+        grid = SpatialHashGrid(5.0, [(10.0, 10.0)])
+        assert not grid.any_within((15.0, 10.0), 5.0)
+        assert grid.any_within((14.9, 10.0), 5.0)
+
+    def test_invalid_cell_size(self):
+        """Cells must have a positive size."""
+        with pytest.raises(ValueError):
+            SpatialHashGrid(0.0)
+
+
+class TestLatticeVectors:
+    """Tests for lattice basis estimation."""
+
+    def test_hexagonal_basis(self):
+        """A jittered, rotated hexagonal lattice yields 60-degree vectors of its spacing."""
+        rng = np.random.default_rng(3)
+        # A patch symmetric about a lattice site, which is then its mean
+        rows, cols = np.mgrid[-15:16, -15:16]
+        positions = np.column_stack([
+            (cols * 20 + rows * 10).ravel(),
+            (rows * 20 * np.sqrt(3) / 2).ravel(),
+        ])
+        theta = np.radians(17.5)  # Lattice directions at histogram bin centers
+        rotation = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+        positions = positions @ rotation.T + rng.normal(0, 0.5, positions.shape)
+
+        v1, v2, regularity = estimate_lattice_vectors(positions, 20.0)
+
+        assert np.linalg.norm(v1) == pytest.approx(20, rel=0.05)
+        angle = np.degrees(np.arccos(abs(np.dot(v1, v2)) / np.linalg.norm(v1) ** 2))
+        assert angle == pytest.approx(60, abs=5)
+        assert regularity > 0.9
+
+    def test_deviations(self):
+        """Deviations are distances to the nearest lattice point; degenerate bases give inf."""
+        v1, v2, origin = np.array([10.0, 0.0]), np.array([0.0, 10.0]), np.array([1.0, 1.0])
+        positions = np.array([[1.0, 1.0], [14.0, 5.0], [-8.0, 22.0]])
+        np.testing.assert_allclose(
+            lattice_deviations(positions, v1, v2, origin), [0.0, 5.0, np.sqrt(2)]
+        )
+        assert np.all(np.isinf(lattice_deviations(positions, v1, 2 * v1, origin)))
+
+
+class TestLatticeFFT:
+    """Tests for the autocorrelation lattice estimator."""
+
+    def test_hexagonal_basis(self):
+        """The autocorrelation peaks give the lattice spacing and a 60-degree angle."""
+        image = _hex_lattice_image()
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+
+        model = estimate_lattice_fft(image, calibration, 8.0, 16.0, LatticeParams())
+
+        assert model is not None
+        assert np.linalg.norm(model.v1) == pytest.approx(30, abs=1)
+        assert np.linalg.norm(model.v2) == pytest.approx(30, abs=1)
+        assert np.degrees(model.angle) == pytest.approx(60, abs=3)
+        np.testing.assert_allclose(model.origin, [160, 160])
+
+    def test_no_lattice(self):
+        """Flat and noise images have no lattice."""
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        noise = np.random.default_rng(4).uniform(size=(320, 320))
+        for image in (np.full((320, 320), 0.5), noise):
+            assert estimate_lattice_fft(image, calibration, 8.0, 16.0, LatticeParams()) is None
+
+    def test_small_image(self):
+        """Peaks on the edge of a lag window capped by the image size are not refined."""
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        params = LatticeParams(min_regularity=0.0)
+        for seed in range(30):
+            image = np.random.default_rng(seed).uniform(size=(20, 20))
+            model = estimate_lattice_fft(image, calibration, 3.0, 6.0, params)
+            if model is not None:
+                assert np.linalg.norm(model.v1) < 10
+
+    def test_detection_from_one_seed(self):
+        """The fft estimator ignores min_seeds, which stops the seed estimator."""
+        image = _hex_lattice_image()
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+
+        results = {
+            estimator: detect_tubercles_lattice(
+                image, calibration, 8.0, 16.0,
+                LatticeParams(lattice_estimator=estimator, min_seeds=1000),
+                fallback_to_log=False,
+            )
+            for estimator in ("seeds", "fft")
+        }
+
+        assert results["seeds"][1] is None
+        tubercles, model, info = results["fft"]
+        assert model is not None
+        assert info["lattice_estimator"] == "fft"
+        assert info["lattice_angle_deg"] == pytest.approx(60, abs=3)
+        assert len(tubercles) > info["n_seeds"] / 2
+
+    def test_unknown_estimator(self):
+        """An unknown estimator name is rejected."""
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        with pytest.raises(ValueError):
+            detect_tubercles_lattice(
+                _hex_lattice_image(), calibration, 8.0, 16.0,
+                LatticeParams(lattice_estimator="pca"),
+            )
+
+
+class TestRefineDetections:
+    """Tests for lattice refinement."""
+
+    def test_gap_filling(self):
+        """Dropped detections are refilled, and fills respect each other's separation."""
+        image = _hex_lattice_image()
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        # No re-estimate passes regularity > 1, so the drawn lattice below is
+        # used as is and only gap filling is tested
+        params = LatticeParams(min_regularity=1.01)
+        seeds = detect_seeds(image, calibration, 8.0, 16.0, params)
+        model = LatticeModel(
+            v1=np.array([30.0, 0.0]), v2=np.array([15.0, 15.0 * np.sqrt(3)]),
+            origin=np.zeros(2), spacing=30.0, angle=np.pi / 3, regularity=1.0,
+        )
+
+        kept = seeds[::2]
+        refined = refine_detections(kept, model, image, calibration, 8.0, 16.0, params)
+        positions = np.array([d.position for d in refined])
+        seed_positions = np.array([s.position for s in seeds])
+
+        assert len(refined) > len(kept)
+        assert cdist(positions, seed_positions).min(axis=1).max() <= 2
+        min_separation = 1.5 * (8.0 + 16.0) / 4  # 1.5x the mean radius, at 1 um/px
+        assert pdist(positions).min() >= min_separation
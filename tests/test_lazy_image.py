@@ -0,0 +1,95 @@
+"""Tests for lazy TIFF loading."""
+
+import numpy as np
+import pytest
+import tifffile
+from PIL import Image
+
+from fish_scale_analysis.core.lazy_image import open_lazy_image, read_image_shape
+from fish_scale_analysis.core.preprocessing import as_float, load_image
+
+
+@pytest.fixture
+def rgb_pixels():
+    """Random 8-bit RGB pixels with a non tile-aligned shape."""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(300, 420, 3), dtype=np.uint8)
+
+
+class TestLazyImage:
+    """Tests for LazyImage region reads."""
+
+    def test_contiguous_file_is_memory_mapped(self, tmp_path, rgb_pixels):
+        """Uncompressed TIFFs are memory-mapped."""
+        path = tmp_path / "plain.tif"
+        tifffile.imwrite(path, rgb_pixels)
+
+        with open_lazy_image(path) as img:
+            assert img.mode == "memmap"
+            assert img.shape == (300, 420)
+
+    def test_region_matches_full_decode(self, tmp_path, rgb_pixels):
+        """Region reads match slices of the fully loaded image."""
+        path = tmp_path / "tiled.tif"
+        tifffile.imwrite(path, rgb_pixels, tile=(64, 64), compression="zlib")
+        full = load_image(path)
+
+        with open_lazy_image(path) as img:
+            assert img.mode == "tiled"
+            np.testing.assert_array_equal(img[50:130, 100:250], full[50:130, 100:250])
+            np.testing.assert_array_equal(img.to_array(), full)
+
+    def test_only_needed_tiles_decoded(self, tmp_path, rgb_pixels):
+        """A small region decodes only the tiles it overlaps."""
+        path = tmp_path / "tiled.tif"
+        tifffile.imwrite(path, rgb_pixels, tile=(64, 64), compression="zlib")
+
+        with open_lazy_image(path) as img:
+            img[10:100, 10:100]  # Overlaps a 2x2 block of tiles
+            assert img.tiles_decoded == 4
+            img[20:30, 20:30]  # Served from decoded tiles
+            assert img.tiles_decoded == 4
+
+    def test_float32_output(self, tmp_path, rgb_pixels):
+        """Requested dtype is honored."""
+        path = tmp_path / "plain.tif"
+        tifffile.imwrite(path, rgb_pixels)
+
+        with open_lazy_image(path, dtype=np.float32) as img:
+            assert img[0:10, 0:10].dtype == np.float32
+
+    def test_non_tiff_rejected(self, tmp_path):
+        """Only TIFF files can be opened lazily."""
+        path = tmp_path / "image.png"
+        Image.fromarray(np.zeros((10, 10), dtype=np.uint8)).save(path)
+
+        with pytest.raises(ValueError):
+            open_lazy_image(path)
+
+
+class TestLoadImageTiff:
+    """Tests for load_image on TIFF input."""
+
+    def test_matches_pil_grayscale(self, tmp_path, rgb_pixels):
+        """8-bit RGB TIFFs load exactly as PIL's grayscale conversion."""
+        path = tmp_path / "plain.tif"
+        tifffile.imwrite(path, rgb_pixels)
+        expected = as_float(np.array(Image.fromarray(rgb_pixels).convert("L")))
+
+        np.testing.assert_array_equal(load_image(path), expected)
+
+    def test_16bit_keeps_dynamic_range(self, tmp_path):
+        """16-bit scans are scaled rather than clipped to 8 bits."""
+        path = tmp_path / "scan16.tif"
+        pixels = np.linspace(0, 65535, 100, dtype=np.uint16).reshape(10, 10)
+        tifffile.imwrite(path, pixels)
+
+        image = load_image(path)
+        np.testing.assert_allclose(image, pixels / 65535.0)
+
+    def test_read_image_shape(self, tmp_path, rgb_pixels):
+        """Shape is read from the header."""
+        path = tmp_path / "plain.tif"
+        tifffile.imwrite(path, rgb_pixels)
+
+        assert read_image_shape(path) == (300, 420)
@@ -2,15 +2,25 @@
 
 import numpy as np
 import pytest
+from skimage import morphology
 from fish_scale_analysis.core.preprocessing import (
     to_grayscale,
     apply_clahe,
     apply_gaussian_blur,
     apply_morphological_opening,
+    apply_tophat,
+    disk_rectangles,
     normalize_image,
     preprocess_pipeline,
+    preprocess_cached,
+    preprocess_staged,
     get_image_info,
 )
+from fish_scale_analysis.core import preprocessing, tiling
+from fish_scale_analysis.core.calibration import calibrate_manual
+from fish_scale_analysis.core.detection import detect_tubercles
+from fish_scale_analysis.core.measurement import measure_metrics
+from fish_scale_analysis.core.cache import ByteLRUCache
 
 
 class TestGrayscaleConversion:
@@ -109,6 +119,34 @@ class TestMorphologicalOpening:
         assert result.shape == sample_grayscale_image.shape
 
 
+class TestTopHat:
+    """Tests for the top-hat transform."""
+
+    @pytest.mark.parametrize("radius", [0, 1, 4, 11, 25, 40])
+    def test_rectangles_cover_disk(self, radius):
+        """The rectangle union is exactly the disk footprint."""
+        union = np.zeros((2 * radius + 1,) * 2, dtype=np.uint8)
+        for half_height, half_width in disk_rectangles(radius):
+            union[radius - half_height:radius + half_height + 1,
+                  radius - half_width:radius + half_width + 1] = 1
+        np.testing.assert_array_equal(union, morphology.disk(radius))
+
+    @pytest.mark.parametrize("radius", [1, 6, 15, 30])
+    def test_decomposed_matches_direct(self, radius):
+        """The decomposed opening equals skimage's, borders included."""
+        rng = np.random.default_rng(radius)
+        image = rng.random((90, 130))
+
+        expected = apply_tophat(image, radius, method="direct")
+        result = apply_tophat(image, radius, method="decomposed")
+        np.testing.assert_array_equal(result, expected)
+
+    def test_unknown_method_rejected(self):
+        """Methods are validated."""
+        with pytest.raises(ValueError):
+            apply_tophat(np.zeros((10, 10)), 3, method="rolling_ball")
+
+
 class TestNormalization:
     """Tests for image normalization."""
 
@@ -150,6 +188,205 @@ class TestPreprocessPipeline:
         assert "blurred" in intermediates
         assert "final" in intermediates
 
+    def test_float32_mode(self, sample_grayscale_image):
+        """Test that float32 mode stays float32 and tracks float64."""
+        result64, _ = preprocess_pipeline(sample_grayscale_image)
+        result32, intermediates = preprocess_pipeline(
+            sample_grayscale_image, dtype=np.float32
+        )
+
+        assert result32.dtype == np.float32
+        assert all(v.dtype == np.float32 for k, v in intermediates.items() if k != "original")
+        np.testing.assert_allclose(result32, result64, atol=1e-4)
+
+    def test_float32_metrics(self):
+        """float32 preprocessing and detection give the float64 metrics."""
+        # Jittered hexagonal layout: on a perfect grid the Delaunay diagonals,
+        # and so the spacing, flip with the last bit of a centroid
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[:256, :256]
+        image = np.full((256, 256), 0.2)
+        for row, cy in enumerate(range(20, 246, 26)):
+            for cx in range(20 + 15 * (row % 2), 246, 30):
+                cy_j, cx_j = cy + rng.uniform(-3, 3), cx + rng.uniform(-3, 3)
+                image += 0.6 * np.exp(-((x - cx_j) ** 2 + (y - cy_j) ** 2) / (2 * 5.0**2))
+        image = np.clip(image, 0, 1)
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+
+        results = {}
+        for dtype in (np.float64, np.float32):
+            preprocessed, _ = preprocess_pipeline(image, dtype=dtype)
+            tubercles = detect_tubercles(
+                preprocessed, calibration, min_diameter_um=10.0, max_diameter_um=30.0,
+                dtype=dtype,
+            )
+            results[dtype] = measure_metrics(tubercles, calibration)
+
+        r64, r32 = results[np.float64], results[np.float32]
+        assert r64.n_tubercles > 0
+        assert r32.n_tubercles == r64.n_tubercles
+        assert r32.mean_diameter_um == pytest.approx(r64.mean_diameter_um, rel=1e-3)
+        assert r32.mean_space_um == pytest.approx(r64.mean_space_um, rel=1e-3)
+        assert r32.mean_space_um > 0
+
+
+class TestLeanPipeline:
+    """Tests for preprocessing without intermediates."""
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{}, {"use_tophat": True, "tophat_radius": 6}, {"dtype": np.float32}],
+    )
+    def test_matches_default(self, sample_grayscale_image, monkeypatch, kwargs):
+        """Lean runs, with CLAHE split into several tiles, are bit-identical."""
+        monkeypatch.setattr(preprocessing, "LEAN_CLAHE_TILE_SIZE", 64)
+        expected, _ = preprocess_pipeline(sample_grayscale_image, **kwargs)
+        result, _ = preprocess_pipeline(
+            sample_grayscale_image, keep_intermediates=False, **kwargs
+        )
+        assert result.dtype == expected.dtype
+        np.testing.assert_array_equal(result, expected)
+
+    @pytest.fixture
+    def large_image(self):
+        """Textured image larger than one LEAN_CLAHE_TILE_SIZE tile."""
+        rng = np.random.default_rng(0)
+        yy, xx = np.mgrid[:600, :700]
+        image = 0.4 + 0.2 * np.sin(xx / 7) * np.sin(yy / 9) + 0.2 * (xx > 350)
+        return np.clip(image + rng.normal(0, 0.05, image.shape), 0, 1)
+
+    def test_matches_default_at_lean_tile_size(self, large_image):
+        """Lean CLAHE at the real tile size is bit-identical across tiles."""
+        assert max(large_image.shape) > preprocessing.LEAN_CLAHE_TILE_SIZE
+        expected, _ = preprocess_pipeline(large_image)
+        result, _ = preprocess_pipeline(large_image, keep_intermediates=False)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_without_private_clahe(self, large_image, monkeypatch):
+        """Lean runs fall back to equalize_adapthist without skimage's private kernel."""
+        expected, _ = preprocess_pipeline(large_image)
+        monkeypatch.setattr(tiling, "_clahe", None)
+        result, _ = preprocess_pipeline(large_image, keep_intermediates=False)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_keeps_nothing_and_leaves_input(self, sample_grayscale_image):
+        """No intermediates are returned and the input is not modified."""
+        image = sample_grayscale_image.copy()
+        _, intermediates = preprocess_pipeline(image, keep_intermediates=False)
+
+        assert intermediates == {}
+        np.testing.assert_array_equal(image, sample_grayscale_image)
+
+    def test_out_buffer_with_roi(self, sample_grayscale_image):
+        """The result is written into out, zeroed outside the ROI window."""
+        polygon = [(10, 10), (60, 12), (40, 70)]
+        expected, _ = preprocess_pipeline(sample_grayscale_image, roi=polygon)
+
+        out = np.full(sample_grayscale_image.shape, 7.0)
+        result, intermediates = preprocess_pipeline(
+            sample_grayscale_image, roi=polygon, keep_intermediates=False, out=out
+        )
+
+        assert result is out
+        assert list(intermediates) == ["roi"]
+        np.testing.assert_array_equal(result, expected)
+
+    def test_out_shape_checked(self, sample_grayscale_image):
+        """An out buffer of the wrong shape is rejected."""
+        with pytest.raises(ValueError):
+            preprocess_pipeline(sample_grayscale_image, out=np.zeros((3, 3)))
+
+
+class TestPreprocessCache:
+    """Tests for memoized preprocessing."""
+
+    def test_matches_pipeline(self, sample_grayscale_image):
+        """Test that cached output equals the uncached pipeline output."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        expected, _ = preprocess_pipeline(sample_grayscale_image, blur_sigma=1.5)
+        result = preprocess_cached(sample_grayscale_image, blur_sigma=1.5, cache=cache)
+
+        np.testing.assert_array_equal(result, expected)
+
+    def test_repeat_call_hits(self, sample_grayscale_image):
+        """Test that identical parameters are served from the cache."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        first = preprocess_cached(sample_grayscale_image, cache=cache)
+        hits_before = cache.stats().hits
+        second = preprocess_cached(sample_grayscale_image.copy(), cache=cache)
+
+        assert second is first
+        assert cache.stats().hits == hits_before + 1
+
+    def test_tophat_radius_ignored_without_tophat(self, sample_grayscale_image):
+        """Test that tophat_radius does not affect the key when tophat is off."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        first = preprocess_cached(sample_grayscale_image, tophat_radius=8, cache=cache)
+        second = preprocess_cached(sample_grayscale_image, tophat_radius=12, cache=cache)
+
+        assert second is first
+
+
+class TestStagedPreprocessing:
+    """Tests for the memoized preprocessing stage graph."""
+
+    def test_matches_pipeline_with_tophat(self, sample_grayscale_image):
+        """Test that staged output equals the pipeline, including top-hat."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        expected, intermediates = preprocess_pipeline(
+            sample_grayscale_image, use_tophat=True, tophat_radius=6
+        )
+        staged = preprocess_staged(
+            sample_grayscale_image, use_tophat=True, tophat_radius=6, cache=cache
+        )
+
+        np.testing.assert_array_equal(staged.result, expected)
+        np.testing.assert_array_equal(staged.outputs["tophat"], intermediates["tophat"])
+
+    def test_first_run_computes_all_stages(self, sample_grayscale_image):
+        """Test that a cold run reports every stage as recomputed."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        staged = preprocess_staged(sample_grayscale_image, cache=cache)
+
+        assert staged.recomputed == ["grayscale", "clahe", "blurred", "final"]
+
+    def test_downstream_change_reuses_upstream(self, sample_grayscale_image):
+        """Test that changing blur_sigma only recomputes blur onwards."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        preprocess_staged(sample_grayscale_image, blur_sigma=1.0, cache=cache)
+        staged = preprocess_staged(sample_grayscale_image, blur_sigma=2.0, cache=cache)
+
+        assert "clahe" not in staged.recomputed
+        assert staged.recomputed == ["blurred", "final"]
+
+        expected, _ = preprocess_pipeline(sample_grayscale_image, blur_sigma=2.0)
+        np.testing.assert_array_equal(staged.result, expected)
+
+    def test_upstream_change_recomputes_downstream(self, sample_grayscale_image):
+        """Test that changing CLAHE parameters invalidates later stages."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        preprocess_staged(sample_grayscale_image, clahe_clip=0.03, cache=cache)
+        staged = preprocess_staged(sample_grayscale_image, clahe_clip=0.05, cache=cache)
+
+        assert staged.recomputed == ["grayscale", "clahe", "blurred", "final"]
+
+    def test_full_hit_recomputes_nothing(self, sample_grayscale_image):
+        """Test that a repeated run resumes from the cached final stage."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        preprocess_staged(sample_grayscale_image, cache=cache)
+        staged = preprocess_staged(sample_grayscale_image, cache=cache)
+
+        assert staged.recomputed == []
+        assert list(staged.outputs) == ["final"]
+
+    def test_toggling_tophat(self, sample_grayscale_image):
+        """Test that enabling top-hat reuses the blurred stage."""
+        cache = ByteLRUCache(max_bytes=64 * 1024 * 1024)
+        preprocess_staged(sample_grayscale_image, use_tophat=False, cache=cache)
+        staged = preprocess_staged(sample_grayscale_image, use_tophat=True, cache=cache)
+
+        assert staged.recomputed == ["tophat", "final"]
+
 
 class TestImageInfo:
     """Tests for image info function."""
@@ -0,0 +1,136 @@
+"""Tests for per-stage profiling."""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from fish_scale_analysis.core.calibration import calibrate_manual
+from fish_scale_analysis.core.detection import detect_tubercles
+from fish_scale_analysis.core.lattice import detect_tubercles_lattice
+from fish_scale_analysis.core.measurement import process_image
+from fish_scale_analysis.core.preprocessing import preprocess_pipeline
+from fish_scale_analysis.core.profiling import StageProfiler, profile_stage
+
+
+class TestStageProfiler:
+    """Tests for the profiler itself."""
+
+    def test_nested_stages(self):
+        """Inner stages are prefixed with their parent and listed in start order."""
+        profiler = StageProfiler()
+        with profiler.stage("outer"):
+            with profiler.stage("first"):
+                pass
+            with profiler.stage("second"):
+                pass
+        with profiler.stage("after"):
+            pass
+
+        summary = profiler.summary()
+        names = [stage["name"] for stage in summary["stages"]]
+        assert names == ["outer", "outer/first", "outer/second", "after"]
+        outer, first, second, after = summary["stages"]
+        assert outer["seconds"] >= first["seconds"] + second["seconds"]
+        assert summary["total_seconds"] == pytest.approx(outer["seconds"] + after["seconds"])
+        assert all(stage["peak_mb"] is None for stage in summary["stages"])
+
+    def test_memory_peaks(self):
+        """A stage's peak covers its own and its children's allocations."""
+        profiler = StageProfiler(track_memory=True)
+        with profiler.stage("outer"):
+            with profiler.stage("big"):
+                block = np.ones(4 * 2**20 // 8)  # 4 MB
+                del block
+            with profiler.stage("small"):
+                block = np.ones(1024)
+                del block
+
+        stages = {stage["name"]: stage for stage in profiler.summary()["stages"]}
+        assert stages["outer/big"]["peak_mb"] >= 4.0
+        assert stages["outer/small"]["peak_mb"] < 1.0
+        assert stages["outer"]["peak_mb"] >= 4.0
+
+    def test_tracemalloc_restored(self):
+        """Tracing stops after the run unless it was already on."""
+        profiler = StageProfiler(track_memory=True)
+        with profiler.stage("run"):
+            assert tracemalloc.is_tracing()
+        assert not tracemalloc.is_tracing()
+
+        tracemalloc.start()
+        try:
+            with profiler.stage("run"):
+                pass
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+    def test_exception_still_recorded(self):
+        """A stage that raises is timed and closed."""
+        profiler = StageProfiler()
+        with pytest.raises(RuntimeError):
+            with profiler.stage("failing"):
+                raise RuntimeError("boom")
+        with profiler.stage("next"):
+            pass
+        assert [t.name for t in profiler.timings] == ["failing", "next"]
+
+    def test_profile_stage_without_profiler(self):
+        """profile_stage is a no-op without a profiler."""
+        with profile_stage(None, "anything"):
+            pass
+
+
+class TestInstrumentedPipeline:
+    """Stages reported by the instrumented entry points."""
+
+    def test_preprocess_stages(self, sample_grayscale_image):
+        """Every preprocessing stage is timed."""
+        profiler = StageProfiler()
+        preprocess_pipeline(sample_grayscale_image, use_tophat=True, profiler=profiler)
+        names = [t.name for t in profiler.timings]
+        assert names == ["grayscale", "clahe", "blurred", "tophat", "final"]
+
+    def test_detect_tubercles_stages(self, synthetic_tubercle_image):
+        """Detection and refinement are separate stages."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        profiler = StageProfiler()
+        detect_tubercles(image, calibration, 10.0, 30.0, profiler=profiler)
+        assert [t.name for t in profiler.timings] == ["detection", "refinement"]
+
+    def test_lattice_info_profile(self, synthetic_tubercle_image):
+        """detect_tubercles_lattice returns its phase profile in info."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        _, _, info = detect_tubercles_lattice(
+            image, calibration, 10.0, 30.0, profiler=StageProfiler()
+        )
+        names = [stage["name"] for stage in info["profile"]["stages"]]
+        assert names[0] == "seed_detection"
+        assert len(names) > 1
+
+    def test_process_image_profile(self, synthetic_test_image):
+        """process_image reports every stage, with memory peaks if asked."""
+        _, _, info = process_image(synthetic_test_image, profile_memory=True)
+
+        stages = {stage["name"]: stage for stage in info["profile"]["stages"]}
+        for name in ("load", "preprocess", "preprocess/clahe", "detection", "measurement"):
+            assert name in stages
+            assert stages[name]["peak_mb"] is not None
+
+    def test_process_image_no_profile(self, synthetic_test_image):
+        """Profiling is opt-in."""
+        _, _, info = process_image(synthetic_test_image)
+        assert "profile" not in info
+
+    def test_extraction_response_profile(self, synthetic_test_image):
+        """The UI extraction service returns the profile when asked."""
+        from fish_scale_ui.services.extraction import run_extraction
+
+        result = run_extraction(str(synthetic_test_image), um_per_px=0.5, profile=True)
+        names = [stage["name"] for stage in result["profile"]["stages"]]
+        assert names[:2] == ["load", "preprocess"]
+        assert "neighbor_graph" in names
+        assert "profile" not in run_extraction(str(synthetic_test_image), um_per_px=0.5)
@@ -0,0 +1,227 @@
+"""Tests for ROI-restricted preprocessing and detection."""
+
+import numpy as np
+import pytest
+import tifffile
+
+from fish_scale_analysis.core.calibration import calibrate_manual
+from fish_scale_analysis.core.detection import detect_tubercles
+from fish_scale_analysis.core.measurement import process_image
+from fish_scale_analysis.core.preprocessing import (
+    AUTO_ROI,
+    estimate_foreground_mask,
+    preprocess_pipeline,
+)
+from fish_scale_analysis.core.roi import (
+    ROI_PREPROCESS_MARGIN,
+    points_in_roi,
+    roi_bounds,
+    roi_mask,
+)
+from fish_scale_analysis.core.tiling import detection_halo, roi_preprocess_margin
+
+# Quadrilateral covering the middle of the 512x512 synthetic image, as (x, y)
+POLYGON = [(120, 100), (400, 130), (300, 420), (90, 300)]
+
+
+class TestRoiMask:
+    """Tests for ROI rasterization and lookup."""
+
+    def test_mask_passthrough(self):
+        """A mask of the image's shape is used as is."""
+        mask = np.zeros((20, 30), dtype=np.uint8)
+        mask[5:10, 5:10] = 1
+        result = roi_mask(mask, (20, 30))
+        assert result.dtype == bool
+        assert result.sum() == 25
+
+    def test_polygon_uses_xy(self):
+        """Polygon vertices are (x, y), not (row, col)."""
+        mask = roi_mask([(10, 2), (20, 2), (20, 6), (10, 6)], (40, 30))
+        rows, cols = np.nonzero(mask)
+        assert rows.min() == 2 and rows.max() == 6
+        assert cols.min() == 10 and cols.max() == 20
+
+    def test_invalid_roi_rejected(self):
+        """Masks of the wrong shape and degenerate polygons are rejected."""
+        with pytest.raises(ValueError):
+            roi_mask(np.ones((10, 10), dtype=bool), (20, 20))
+        with pytest.raises(ValueError):
+            roi_mask([(0, 0), (5, 5)], (20, 20))
+
+    def test_bounds_and_points(self):
+        """Bounding boxes grow by the margin and clip to the image."""
+        mask = np.zeros((50, 50), dtype=bool)
+        mask[10:20, 40:45] = True
+        assert roi_bounds(mask, margin=8) == (slice(2, 28), slice(32, 50))
+        np.testing.assert_array_equal(
+            points_in_roi(mask, [(15, 42), (5, 42), (15.4, 44.4), (-3, 40)]),
+            [True, False, True, False],
+        )
+        with pytest.raises(ValueError):
+            roi_bounds(np.zeros((5, 5), dtype=bool))
+
+
+class TestRoiDetection:
+    """Detection restricted to an ROI."""
+
+    @pytest.fixture
+    def detect_kwargs(self):
+        """Detection parameters for the synthetic tubercle image."""
+        return dict(
+            calibration=calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0),
+            min_diameter_um=10.0,
+            max_diameter_um=30.0,
+            threshold=0.05,
+        )
+
+    @pytest.mark.parametrize("method,tile_size", [("log", None), ("log", 64), ("dog", None)])
+    def test_matches_filtered_full_detection(
+        self, synthetic_tubercle_image, detect_kwargs, method, tile_size
+    ):
+        """ROI detection keeps exactly the whole-image tubercles inside it."""
+        image, _, _ = synthetic_tubercle_image
+        mask = roi_mask(POLYGON, image.shape)
+
+        full = detect_tubercles(image, method=method, **detect_kwargs)
+        expected = sorted(
+            t.centroid for t in full
+            if points_in_roi(mask, [(t.centroid[1], t.centroid[0])])[0]
+        )
+        result = detect_tubercles(
+            image, method=method, tile_size=tile_size, roi=POLYGON, **detect_kwargs
+        )
+
+        assert 0 < len(result) < len(full)
+        assert sorted(t.centroid for t in result) == expected
+        assert [t.id for t in result] == list(range(1, len(result) + 1))
+
+    def test_ellipse_method_in_image_coordinates(self, synthetic_tubercle_image, detect_kwargs):
+        """Window-relative methods are moved back to image coordinates."""
+        image, _, _ = synthetic_tubercle_image
+        mask = roi_mask(POLYGON, image.shape)
+
+        result = detect_tubercles(image, method="ellipse", roi=mask, **detect_kwargs)
+
+        assert len(result) > 0
+        assert points_in_roi(mask, [(t.centroid[1], t.centroid[0]) for t in result]).all()
+
+
+class TestRoiPreprocessing:
+    """Preprocessing restricted to an ROI."""
+
+    def test_only_window_processed(self, sample_grayscale_image):
+        """Outputs keep the image shape and are zero outside the ROI window."""
+        mask = np.zeros(sample_grayscale_image.shape, dtype=bool)
+        mask[100:150, 60:120] = True
+
+        result, intermediates = preprocess_pipeline(sample_grayscale_image, roi=mask)
+
+        window = roi_bounds(mask, ROI_PREPROCESS_MARGIN)
+        expected, _ = preprocess_pipeline(sample_grayscale_image[window])
+        assert result.shape == sample_grayscale_image.shape
+        assert intermediates["clahe"].shape == sample_grayscale_image.shape
+        np.testing.assert_array_equal(result[window], expected)
+        outside = np.ones(result.shape, dtype=bool)
+        outside[window] = False
+        assert not result[outside].any()
+
+    def test_margin_covers_detection_window(self, synthetic_tubercle_image):
+        """roi_preprocess_margin preprocesses every pixel ROI detection reads."""
+        image, _, _ = synthetic_tubercle_image
+        mask = roi_mask(POLYGON, image.shape)
+        max_sigma = 15.0
+
+        result, _ = preprocess_pipeline(
+            image, roi=mask, roi_margin=roi_preprocess_margin(max_sigma)
+        )
+
+        window = roi_bounds(mask, roi_preprocess_margin(max_sigma))
+        expected, _ = preprocess_pipeline(image[window])
+        np.testing.assert_array_equal(result[window], expected)
+        read = roi_bounds(mask, detection_halo(max_sigma))
+        for w, r, size in zip(window, read, image.shape):
+            assert w.start in (0, r.start - ROI_PREPROCESS_MARGIN)
+            assert w.stop in (size, r.stop + ROI_PREPROCESS_MARGIN)
+
+    def test_tiled_process_image(self, tmp_path, synthetic_tubercle_image):
+        """Tiled process_image preprocesses a user ROI like the untiled path."""
+        image, _, _ = synthetic_tubercle_image
+        path = tmp_path / "scan.tif"
+        tifffile.imwrite(path, (image * 255).astype(np.uint8), tile=(64, 64))
+        kwargs = dict(
+            scale_bar_um=100.0,
+            scale_bar_px=100.0,
+            min_diameter_um=10.0,
+            max_diameter_um=30.0,
+            roi=POLYGON,
+        )
+
+        expected, expected_image, _ = process_image(path, **kwargs)
+        result, preprocessed, _ = process_image(path, tile_size=128, **kwargs)
+
+        np.testing.assert_array_equal(preprocessed, expected_image)
+        assert result.n_tubercles == expected.n_tubercles > 0
+
+
+def _half_textured(shape=(256, 256)):
+    """Textured left half, flat noisy background on the right."""
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[:shape[0], :shape[1]]
+    image = 0.3 + 0.3 * np.sin(xx / 4) * np.sin(yy / 4) * (xx < shape[1] // 2)
+    return np.clip(image + rng.normal(0, 0.03, shape), 0, 1)
+
+
+class TestForegroundMask:
+    """Automatic scale-surface estimation."""
+
+    def test_separates_background(self):
+        """Textured pixels are kept and flat background dropped."""
+        image = _half_textured()
+        mask = estimate_foreground_mask(image)
+
+        assert mask.shape == image.shape
+        assert mask.dtype == bool
+        assert mask[:, :128].all()
+        assert mask[:, 150:].mean() < 0.05
+
+    def test_blobs_kept(self, sample_grayscale_image):
+        """Every blob of the sample image lies inside the mask."""
+        mask = estimate_foreground_mask(sample_grayscale_image)
+        centers = [(50, 50), (100, 100), (150, 150), (150, 50), (50, 150)]
+        assert points_in_roi(mask, np.array(centers)).all()
+        assert not mask.all()
+
+    def test_lattice_kept(self, synthetic_tubercle_image):
+        """The tubercle grid is foreground, the empty border is not."""
+        image, positions, _ = synthetic_tubercle_image
+        mask = estimate_foreground_mask(image)
+        assert points_in_roi(mask, np.array(positions)[:, ::-1]).all()
+        assert not mask[:100].any()
+
+    def test_flat_image_all_foreground(self):
+        """With nothing to tell apart, no pixel is excluded."""
+        assert estimate_foreground_mask(np.full((50, 70), 0.5)).all()
+
+    def test_invalid_controls(self):
+        """Downscale and window must be positive."""
+        image = np.zeros((32, 32))
+        with pytest.raises(ValueError):
+            estimate_foreground_mask(image, downscale=0)
+        with pytest.raises(ValueError):
+            estimate_foreground_mask(image, window=0)
+
+    def test_auto_roi_pipeline(self):
+        """roi="auto" preprocesses the estimated window and returns its mask."""
+        image = _half_textured()
+        result, intermediates = preprocess_pipeline(image, roi=AUTO_ROI)
+
+        mask = estimate_foreground_mask(image)
+        np.testing.assert_array_equal(intermediates["roi"], mask)
+        expected, _ = preprocess_pipeline(image, roi=mask)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_unknown_roi_string(self, sample_grayscale_image):
+        """Strings other than "auto" are rejected."""
+        with pytest.raises(ValueError):
+            preprocess_pipeline(sample_grayscale_image, roi="everything")
@@ -0,0 +1,245 @@
+"""Tests for tiled preprocessing and detection."""
+
+import numpy as np
+import pytest
+import tifffile
+
+from fish_scale_analysis.core.calibration import calibrate_manual
+from fish_scale_analysis.core.detection import detect_blobs_log, detect_tubercles
+from fish_scale_analysis.core.lazy_image import open_lazy_image
+from fish_scale_analysis.core.preprocessing import (
+    AUTO_ROI,
+    apply_clahe,
+    estimate_foreground_mask,
+    preprocess_pipeline,
+)
+from fish_scale_analysis.core import tiling
+from fish_scale_analysis.core.tiling import (
+    TileScheduler,
+    clahe_tiled,
+    detect_blobs_log_tiled,
+    plan_tiles,
+    preprocess_tiled,
+)
+
+
+def _failing_tile(window, inner):
+    """Per-tile function that always raises."""
+    raise ValueError("tile failed")
+
+
+class TestPlanTiles:
+    """Tests for tile layout."""
+
+    def test_cores_partition_image(self):
+        """Every pixel belongs to exactly one core."""
+        coverage = np.zeros((230, 170), dtype=int)
+        for tile in plan_tiles(coverage.shape, tile_size=64, halo=10):
+            coverage[tile.core] += 1
+        assert np.all(coverage == 1)
+
+    def test_windows_clipped_to_image(self):
+        """Halos extend past cores but stay inside the image."""
+        for tile in plan_tiles((100, 100), tile_size=40, halo=15):
+            for core, window in zip(tile.core, tile.window):
+                assert 0 <= window.start <= core.start
+                assert core.stop <= window.stop <= 100
+
+    def test_alignment(self):
+        """Core and window origins respect the alignment."""
+        for tile in plan_tiles((300, 300), tile_size=50, halo=12, align=8):
+            assert tile.core[0].start % 8 == 0
+            assert tile.window[0].start % 8 == 0
+            assert tile.window[1].start % 8 == 0
+
+
+class TestPreprocessTiled:
+    """Tiled preprocessing matches the whole-image pipeline."""
+
+    @pytest.mark.parametrize("tile_size", [64, 100])
+    def test_matches_pipeline(self, sample_grayscale_image, tile_size):
+        """Default parameters give bit-identical output."""
+        expected, _ = preprocess_pipeline(sample_grayscale_image)
+        result = preprocess_tiled(sample_grayscale_image, tile_size=tile_size)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_matches_pipeline_with_tophat(self, sample_grayscale_image):
+        """Larger CLAHE kernel, blur and top-hat halos are handled."""
+        kwargs = dict(clahe_kernel=13, blur_sigma=2.0, use_tophat=True, tophat_radius=6)
+        expected, _ = preprocess_pipeline(sample_grayscale_image, **kwargs)
+        result = preprocess_tiled(sample_grayscale_image, tile_size=80, **kwargs)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_float32(self, sample_grayscale_image):
+        """float32 processing matches the float32 pipeline."""
+        expected, _ = preprocess_pipeline(sample_grayscale_image, dtype=np.float32)
+        result = preprocess_tiled(sample_grayscale_image, tile_size=64, dtype=np.float32)
+        assert result.dtype == np.float32
+        np.testing.assert_array_equal(result, expected)
+
+    def test_clahe_tiled(self, sample_grayscale_image):
+        """Tiled CLAHE alone matches apply_clahe."""
+        expected = apply_clahe(sample_grayscale_image, clip_limit=0.02, kernel_size=10)
+        result = clahe_tiled(sample_grayscale_image, 0.02, 10, tile_size=50)
+        np.testing.assert_array_equal(result, expected)
+
+    @pytest.mark.parametrize("dtype", [np.float64, np.float32])
+    def test_without_private_clahe(self, sample_grayscale_image, monkeypatch, dtype):
+        """Without skimage's private CLAHE kernel, results are unchanged."""
+        expected, _ = preprocess_pipeline(sample_grayscale_image, dtype=dtype)
+        expected_clahe = clahe_tiled(sample_grayscale_image, tile_size=64, dtype=dtype)
+        monkeypatch.setattr(tiling, "_clahe", None)
+
+        result = preprocess_tiled(sample_grayscale_image, tile_size=64, dtype=dtype)
+        assert result.dtype == expected.dtype
+        np.testing.assert_array_equal(result, expected)
+        np.testing.assert_array_equal(
+            clahe_tiled(sample_grayscale_image, tile_size=64, dtype=dtype), expected_clahe
+        )
+
+    def test_lazy_input(self, tmp_path, sample_grayscale_image):
+        """Tiles can be read straight from a TIFF."""
+        pixels = (sample_grayscale_image * 255).astype(np.uint8)
+        path = tmp_path / "scan.tif"
+        tifffile.imwrite(path, pixels, tile=(64, 64), compression="zlib")
+
+        expected, _ = preprocess_pipeline(pixels)
+        with open_lazy_image(path) as lazy:
+            result = preprocess_tiled(lazy, tile_size=96)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_roi(self, tmp_path, sample_grayscale_image):
+        """An ROI restricts tiled preprocessing exactly as in the pipeline."""
+        pixels = (sample_grayscale_image * 255).astype(np.uint8)
+        path = tmp_path / "scan.tif"
+        tifffile.imwrite(path, pixels, tile=(64, 64), compression="zlib")
+        polygon = [(60, 50), (170, 70), (140, 160)]
+
+        expected, _ = preprocess_pipeline(pixels, roi=polygon, roi_margin=20)
+        result = preprocess_tiled(pixels, tile_size=64, roi=polygon, roi_margin=20)
+        np.testing.assert_array_equal(result, expected)
+        with open_lazy_image(path) as lazy:
+            result = preprocess_tiled(lazy, tile_size=64, roi=polygon, roi_margin=20)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_foreground_mask_skips_tiles(self, tmp_path):
+        """Background tiles outside the auto ROI's window are never decoded."""
+        rng = np.random.default_rng(0)
+        yy, xx = np.mgrid[:256, :256]
+        image = 0.3 + 0.3 * np.sin(xx / 4) * np.sin(yy / 4) * (xx < 96)
+        pixels = (np.clip(image + rng.normal(0, 0.03, image.shape), 0, 1) * 255).astype(np.uint8)
+        path = tmp_path / "scan.tif"
+        tifffile.imwrite(path, pixels, tile=(64, 64))
+        mask = estimate_foreground_mask(pixels)
+
+        expected, _ = preprocess_pipeline(pixels, roi=AUTO_ROI)
+        with open_lazy_image(path) as lazy:
+            result = preprocess_tiled(lazy, tile_size=64, roi=mask)
+            decoded = lazy.tiles_decoded
+        np.testing.assert_array_equal(result, expected)
+        assert 0 < decoded < 16
+
+
+class TestDetectTiled:
+    """Tiled LoG detection matches whole-image detection."""
+
+    @pytest.mark.parametrize("tile_size", [50, 128, 1000])
+    def test_matches_detect_blobs_log(self, synthetic_tubercle_image, tile_size):
+        """Blobs, order included, match for any tile size."""
+        image, _, _ = synthetic_tubercle_image
+        kwargs = dict(min_sigma=3, max_sigma=10, threshold=0.05)
+
+        expected = detect_blobs_log(image, **kwargs)
+        result = detect_blobs_log_tiled(image, tile_size=tile_size, **kwargs)
+
+        assert len(expected) > 0
+        np.testing.assert_array_equal(result, expected)
+
+    @pytest.mark.parametrize("tile_size", [50, 128])
+    def test_fft_matches_detect_blobs_log(self, synthetic_tubercle_image, tile_size):
+        """FFT tiles find the same blobs; exact response ties may reorder."""
+        image, _, _ = synthetic_tubercle_image
+        kwargs = dict(min_sigma=3, max_sigma=10, threshold=0.05, backend="fft")
+
+        expected = detect_blobs_log(image, **kwargs)
+        result = detect_blobs_log_tiled(image, tile_size=tile_size, **kwargs)
+
+        assert len(expected) > 0
+        np.testing.assert_array_equal(
+            result[np.lexsort(result.T[::-1])], expected[np.lexsort(expected.T[::-1])]
+        )
+
+    def test_detect_tubercles_tile_size(self, synthetic_tubercle_image):
+        """detect_tubercles gives the same tubercles when tiled."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        kwargs = dict(min_diameter_um=10.0, max_diameter_um=30.0, threshold=0.05)
+
+        expected = detect_tubercles(image, calibration, **kwargs)
+        result = detect_tubercles(image, calibration, tile_size=100, **kwargs)
+
+        assert len(expected) > 0
+        assert sorted(t.centroid for t in result) == sorted(t.centroid for t in expected)
+
+    def test_tiling_requires_log(self, synthetic_tubercle_image):
+        """Other detection methods reject tile_size."""
+        image, _, _ = synthetic_tubercle_image
+        calibration = calibrate_manual(scale_bar_um=100.0, scale_bar_px=100.0)
+        with pytest.raises(ValueError):
+            detect_tubercles(image, calibration, method="dog", tile_size=100)
+
+
+class TestTileScheduler:
+    """Tests for the multi-process tile scheduler."""
+
+    def test_pool_matches_sequential(self, synthetic_tubercle_image):
+        """Shared-memory workers give the same blobs as a single process."""
+        image, _, _ = synthetic_tubercle_image
+        kwargs = dict(min_sigma=3, max_sigma=10, threshold=0.05, tile_size=128)
+
+        expected = detect_blobs_log_tiled(image, **kwargs)
+        scheduler = TileScheduler(workers=2, chunk_size=3)
+        result = detect_blobs_log_tiled(image, scheduler=scheduler, **kwargs)
+
+        np.testing.assert_array_equal(result, expected)
+
+    def test_per_tile_timings(self, synthetic_tubercle_image):
+        """Every tile gets a timing entry, in tile order."""
+        image, _, _ = synthetic_tubercle_image
+        scheduler = TileScheduler(workers=1)
+        detect_blobs_log_tiled(
+            image, min_sigma=3, max_sigma=10, threshold=0.05,
+            tile_size=128, scheduler=scheduler,
+        )
+
+        summary = scheduler.summary()
+        assert summary["n_tiles"] == 16
+        assert [t["index"] for t in summary["tiles"]] == list(range(16))
+        assert all(t.seconds >= 0 for t in scheduler.timings)
+
+    def test_worker_error_releases_memory(self, monkeypatch):
+        """A worker's error propagates and the shared segment is unlinked."""
+        created = []
+
+        class RecordingSharedMemory(tiling.shared_memory.SharedMemory):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                created.append(self.name)
+
+        monkeypatch.setattr(tiling.shared_memory, "SharedMemory", RecordingSharedMemory)
+        image = np.zeros((64, 64))
+        tiles = plan_tiles(image.shape, tile_size=32, halo=0)
+
+        with pytest.raises(ValueError, match="tile failed"):
+            TileScheduler(workers=2).map_tiles(image, tiles, _failing_tile)
+
+        assert len(created) == 1
+        with pytest.raises(FileNotFoundError):
+            tiling.shared_memory.SharedMemory(name=created[0])
+
+    def test_invalid_controls(self):
+        """Worker count and chunk size must be positive."""
+        with pytest.raises(ValueError):
+            TileScheduler(workers=0)
+        with pytest.raises(ValueError):
+            TileScheduler(chunk_size=0)